@@ -1,7 +1,6 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
 import time
-import threading
 import requests
 import datetime
 import math # Needed for wind speed calculation helper
@@ -11,11 +10,14 @@ import os
 # --- MODEL IMPORT ---
 # Ensure 'irrigation_model.py' is in the same directory!
 try:
-    from irrigation_model import get_daily_irrigation_recommendation, get_location_data
+    from irrigation_model import get_daily_irrigation_recommendation, get_batch_irrigation_recommendations, get_location_data
 except ImportError:
     print("FATAL ERROR: Could not import 'irrigation_model.py'. Ensure the model file is present.")
     sys.exit(1)
 
+from plant_state import PlantStateStore
+from status_stream import StatusBroadcaster
+
 app = Flask(__name__)
 CORS(app) 
 
@@ -46,38 +48,13 @@ CROP_AGRONOMY = {
 
 
 # --- In-Memory Plant State (Simulates Database/Hardware State) ---
-plant_states = {
+# Water levels evolve lazily: each read derives the current level from the last
+# (level, pump state, timestamp), so no background thread is needed.
+plant_states = PlantStateStore({
     'tomato-101': {'waterLevel': 75.0, 'isPumpOn': False}, # Sufficient water (Will likely get 'OFF' recommendation)
     'mint-202': {'waterLevel': 45.0, 'isPumpOn': True},    # Watering in progress (Moisture increasing)
     'onion-303': {'waterLevel': 15.0, 'isPumpOn': False},  # Critically low water (Will likely get 'ON' recommendation)
-}
-
-# --- Polling Simulation Logic (Runs in a separate thread) ---
-
-def run_simulation():
-    """Simulates water consumption/filling over time."""
-    while True:
-        # Simulate data change for all plants
-        for plant_id in plant_states:
-            state = plant_states[plant_id]
-            
-            # Water level change logic (consumption vs. filling)
-            if state['isPumpOn']:
-                # If pump is ON, water level increases slowly (filling)
-                state['waterLevel'] = min(100.0, state['waterLevel'] + 0.5)
-            else:
-                # If pump is OFF, water level decreases slowly (consumption)
-                state['waterLevel'] = max(0.0, state['waterLevel'] - 0.25)
-            
-            # Round to one decimal place
-            state['waterLevel'] = round(state['waterLevel'], 1)
-            
-        time.sleep(2) # Update simulation every 2 seconds
-
-# Start the simulation thread in the background
-simulation_thread = threading.Thread(target=run_simulation)
-simulation_thread.daemon = True 
-simulation_thread.start()
+})
 
 
 # --- API Endpoints (Prefix: /api/v1) ---
@@ -92,43 +69,160 @@ def get_plant_status(plant_id):
     if not state:
         return jsonify({'error': f'Plant ID {plant_id} not found.'}), 404
 
-    # 1. Get current sensor data
-    current_water_level = state['waterLevel']
-    
-    # 2. Get agronomy parameters for the plant
+    # 1-3. Get sensor data + agronomy parameters and call the sophisticated AI model
+    ai_report = get_daily_irrigation_recommendation(**plant_model_inputs(plant_id, state['waterLevel']))
+
+    return jsonify(plant_status_payload(plant_id, state, ai_report))
+
+
+def plant_model_inputs(plant_id, water_level):
+    """Keyword arguments of the irrigation model for one plant at the given water level."""
     agronomy = CROP_AGRONOMY.get(plant_id)
     if not agronomy:
         # Fallback if plant is not defined in agronomy settings
         agronomy = CROP_AGRONOMY['tomato-101'] # Default to Tomato settings
 
-    # 3. Call the sophisticated AI model
-    ai_report = get_daily_irrigation_recommendation(
-        lat=LOCATION_DATA['latitude'],
-        lon=LOCATION_DATA['longitude'],
-        z=LOCATION_DATA['elevation'],
-        Kc=agronomy['Kc'],
-        soil_moisture_percent=current_water_level,
-        field_capacity=agronomy['field_capacity'],
-        wilting_point=agronomy['wilting_point'],
-        root_depth_mm=agronomy['root_depth_mm']
-    )
+    return {
+        'lat': LOCATION_DATA['latitude'],
+        'lon': LOCATION_DATA['longitude'],
+        'z': LOCATION_DATA['elevation'],
+        'Kc': agronomy['Kc'],
+        'soil_moisture_percent': water_level,
+        'field_capacity': agronomy['field_capacity'],
+        'wilting_point': agronomy['wilting_point'],
+        'root_depth_mm': agronomy['root_depth_mm']
+    }
 
+
+def plant_status_payload(plant_id, state, ai_report):
+    """Response body of the single-plant status endpoint."""
     # 4. Determine Simple Alert based on the AI's recommendation
     # An alert is active if the AI says the pump should be ON.
     is_alert_active = ai_report.get('recommended_pump_state', False)
     
     # Log the request
-    print(f"[GET] Status requested for {plant_id}. Water={current_water_level}%. AI Rec: {'ON' if is_alert_active else 'OFF'}")
+    print(f"[GET] Status requested for {plant_id}. Water={state['waterLevel']}%. AI Rec: {'ON' if is_alert_active else 'OFF'}")
 
     # Return the current state + AI report
-    return jsonify({
+    return {
         'plantId': plant_id,
-        'waterLevel': current_water_level,
+        'waterLevel': state['waterLevel'],
         'isPumpOn': state['isPumpOn'],
         'alertActive': is_alert_active, # Alert is triggered by AI recommendation
         'lastUpdated': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
         'aiReport': ai_report # Full, detailed AI recommendation report
-    })
+    }
+
+
+def build_plant_reports(plant_ids, states):
+    """
+    AI status for every plant in plant_ids (all present in states) in one vectorized pass.
+    Returns (date, plants) where date is shared by every per-plant report.
+    """
+    fields = [plant_model_inputs(pid, states[pid]['waterLevel']) for pid in plant_ids]
+
+    # One weather fetch per location, one vectorized model pass for all plants
+    reports = get_batch_irrigation_recommendations(fields)
+    return assemble_plant_reports(plant_ids, states, reports)
+
+
+def assemble_plant_reports(plant_ids, states, reports):
+    """Pairs each plant's state with its AI report; returns (date, plants)."""
+    plants = []
+    date = datetime.date.today().isoformat()
+    for pid, ai_report in zip(plant_ids, reports):
+        date = ai_report.pop('date')  # Shared by every plant; sent once at the top level
+        plants.append({
+            'plantId': pid,
+            'waterLevel': states[pid]['waterLevel'],
+            'isPumpOn': states[pid]['isPumpOn'],
+            'alertActive': ai_report.get('recommended_pump_state', False),
+            'aiReport': ai_report
+        })
+    return date, plants
+
+
+@app.route('/api/v1/plants/status:batch', methods=['POST'])
+def get_plants_status_batch():
+    """
+    Endpoint 3: POST Batch Status - AI recommendations for many plants in one request.
+    Body: {"plantIds": ["tomato-101", ...]} (omit or leave empty for all plants).
+    """
+    body = request.get_json(silent=True) or {}
+    plant_ids, error = parse_batch_plant_ids(body)
+    if error:
+        return jsonify({'error': error}), 400
+
+    # Snapshot sensor data (one instant for all plants)
+    states = plant_states.snapshot(plant_ids)
+    found = [pid for pid in plant_ids if pid in states]
+    date, plants = build_plant_reports(found, states)
+    return jsonify(batch_status_payload(plant_ids, states, date, plants))
+
+
+def parse_batch_plant_ids(body):
+    """Returns (plant_ids, error) for a batch status body; all plants when none are given."""
+    if not isinstance(body, dict):  # e.g. a bare JSON array of IDs
+        return None, 'plantIds must be a list of plant ID strings.'
+    plant_ids = body.get('plantIds') or list(plant_states)
+    if not isinstance(plant_ids, list) or not all(isinstance(pid, str) for pid in plant_ids):
+        return None, 'plantIds must be a list of plant ID strings.'
+    return plant_ids, None
+
+
+def batch_status_payload(plant_ids, states, date, plants):
+    """Response body of the batch status endpoint."""
+    not_found = [pid for pid in plant_ids if pid not in states]
+    print(f"[POST] Batch status requested for {len(plant_ids)} plants ({len(not_found)} not found).")
+
+    return {
+        'date': date,
+        'lastUpdated': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'plants': plants,
+        'notFound': not_found
+    }
+
+
+# --- Streaming Status Feed (Server-Sent Events) ---
+
+def _stream_payloads(changed_ids, states):
+    date, plants = build_plant_reports(changed_ids, states)
+    meta = {'date': date, 'lastUpdated': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}
+    return {plant['plantId']: plant for plant in plants}, meta
+
+# The water level moves continuously while a pump runs or the soil drains, so it
+# only counts as a change once it crosses a STREAM_LEVEL_STEP (%) boundary
+STREAM_LEVEL_STEP = float(os.environ.get('STREAM_LEVEL_STEP', 1.0))
+
+def _stream_change_key(state):
+    return (math.floor(state['waterLevel'] / STREAM_LEVEL_STEP), state['isPumpOn'], state['version'])
+
+status_broadcaster = StatusBroadcaster(
+    read_states=plant_states.snapshot,
+    build_payloads=_stream_payloads,
+    change_key=_stream_change_key,
+    coalesce_seconds=float(os.environ.get('STREAM_COALESCE_SECONDS', 1.0)),
+    heartbeat_seconds=float(os.environ.get('STREAM_HEARTBEAT_SECONDS', 15.0)),
+    max_subscribers=int(os.environ.get('STREAM_MAX_SUBSCRIBERS', 1000))
+)
+
+
+@app.route('/api/v1/plants/stream', methods=['GET'])
+def stream_plant_status():
+    """
+    Endpoint 4: GET Status Stream (SSE) - pushes only the plants whose state changed.
+    Each 'status' event carries {date, lastUpdated, plants: [...]} (same plant shape as the batch endpoint).
+    """
+    sub = status_broadcaster.subscribe()
+    if sub is None:
+        return jsonify({'error': 'Too many stream subscribers, try again later.'}), 503
+
+    print(f"[SSE] Stream subscriber connected ({len(status_broadcaster)} active).")
+    return Response(
+        stream_with_context(status_broadcaster.events(sub)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 
 @app.route('/api/v1/plants/<plant_id>/pump', methods=['PUT'])
@@ -139,16 +233,14 @@ def update_pump_state(plant_id):
     state_data = request.get_json()
     new_state = state_data.get('state')
 
-    plant = plant_states.get(plant_id)
-
-    if not plant:
+    if plant_id not in plant_states:
         return jsonify({'error': f'Plant ID {plant_id} not found.'}), 404
 
     if not isinstance(new_state, bool):
         return jsonify({'error': 'Invalid state value. Must be true or false.'}), 400
 
-    # Update the in-memory state:
-    plant['isPumpOn'] = new_state
+    # Update the in-memory state (the water level is re-anchored at this instant):
+    plant_states.set_pump(plant_id, new_state)
 
     # Log the command
     print(f"[PUT] Pump control received for {plant_id}. New state: {new_state}")
@@ -164,7 +256,7 @@ def update_pump_state(plant_id):
 if __name__ == '__main__':
     print('--- SMART GARDEN MOCK BACKEND (Flask) ---')
     print(f"Location configured for: {LOCATION_DATA.get('name', LOCATION_NAME)} ({LOCATION_DATA['latitude']:.2f}, {LOCATION_DATA['longitude']:.2f})")
-    print('Starting background water simulation and AI integration...')
+    print('Starting lazy water simulation and AI integration...')
     print('-------------------------------------------')
     # Use 0.0.0.0 to make it accessible from other devices/containers if needed
     app.run(host='0.0.0.0', port=5000, debug=False)
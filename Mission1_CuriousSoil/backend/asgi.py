@@ -0,0 +1,151 @@
+# asgi.py
+"""
+Asyncio (ASGI) serving mode for the Mission1 backend.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+The weather-bound endpoints (single and batch plant status) run natively on the
+event loop and fetch Open-Meteo through the httpx-based AsyncHttpClient, so one
+worker keeps many slow upstream calls in flight instead of one per thread. The
+SSE stream is native too (one coroutine per subscriber, unsubscribed as soon as
+the client disconnects). Every other route is the unchanged Flask app served
+through asgiref's WsgiToAsgi. `python app.py` still starts the plain Flask server.
+"""
+
+import asyncio
+import json
+import re
+
+from asgiref.wsgi import WsgiToAsgi
+
+import app as flask_backend
+from irrigation_model import (
+    get_async_http_client,
+    get_batch_irrigation_recommendations_async,
+    get_daily_irrigation_recommendation_async,
+)
+
+STATUS_PATH = re.compile(r"^/api/v1/plants/(?P<plant_id>[^/]+)/status$")
+BATCH_PATH = "/api/v1/plants/status:batch"
+STREAM_PATH = "/api/v1/plants/stream"
+
+flask_asgi = WsgiToAsgi(flask_backend.app)
+
+
+async def send_json(send, payload, status=200):
+    # Same encoding as Flask's jsonify (sorted keys, compact, trailing newline)
+    body = (json.dumps(payload, sort_keys=True, separators=(",", ":")) + "\n").encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"access-control-allow-origin", b"*"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def plant_status(plant_id, send):
+    """Async GET /api/v1/plants/<plant_id>/status (same response as the Flask route)."""
+    state = flask_backend.plant_states.get(plant_id)
+    if not state:
+        return await send_json(send, {'error': f'Plant ID {plant_id} not found.'}, 404)
+
+    inputs = flask_backend.plant_model_inputs(plant_id, state['waterLevel'])
+    ai_report = await get_daily_irrigation_recommendation_async(**inputs)
+    await send_json(send, flask_backend.plant_status_payload(plant_id, state, ai_report))
+
+
+async def plants_status_batch(receive, send):
+    """Async POST /api/v1/plants/status:batch (same response as the Flask route)."""
+    try:
+        body = json.loads(await read_body(receive) or b"{}") or {}  # Same as get_json(silent=True) or {}
+    except ValueError:
+        body = {}
+    plant_ids, error = flask_backend.parse_batch_plant_ids(body)
+    if error:
+        return await send_json(send, {'error': error}, 400)
+
+    states = flask_backend.plant_states.snapshot(plant_ids)
+    found = [pid for pid in plant_ids if pid in states]
+    fields = [flask_backend.plant_model_inputs(pid, states[pid]['waterLevel']) for pid in found]
+    reports = await get_batch_irrigation_recommendations_async(fields)
+    date, plants = flask_backend.assemble_plant_reports(found, states, reports)
+    await send_json(send, flask_backend.batch_status_payload(plant_ids, states, date, plants))
+
+
+async def plant_stream(receive, send):
+    """Async GET /api/v1/plants/stream: one coroutine per subscriber, no thread held open."""
+    broadcaster = flask_backend.status_broadcaster
+    sub = broadcaster.subscribe()
+    if sub is None:
+        return await send_json(send, {'error': 'Too many stream subscribers, try again later.'}, 503)
+
+    print(f"[SSE] Stream subscriber connected ({len(broadcaster)} active).")
+    await send({
+        "type": "http.response.start",
+        "status": 200,
+        "headers": [
+            (b"content-type", b"text/event-stream; charset=utf-8"),
+            (b"cache-control", b"no-cache"),
+            (b"x-accel-buffering", b"no"),
+            (b"access-control-allow-origin", b"*"),
+        ],
+    })
+
+    async def watch_disconnect():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        broadcaster.unsubscribe(sub)  # Wakes aevents(), which then finishes
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    try:
+        async for frame in broadcaster.aevents(sub):
+            await send({"type": "http.response.body", "body": frame.encode("utf-8"), "more_body": True})
+        if not watcher.done():
+            await send({"type": "http.response.body", "body": b""})
+    finally:
+        watcher.cancel()
+
+
+async def lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await get_async_http_client().aclose()
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+
+    if scope["type"] == "http":
+        method, path = scope["method"], scope["path"]
+        try:
+            match = STATUS_PATH.match(path)
+            if method == "GET" and match:
+                return await plant_status(match.group("plant_id"), send)
+            if method == "POST" and path == BATCH_PATH:
+                return await plants_status_batch(receive, send)
+            if method == "GET" and path == STREAM_PATH:
+                return await plant_stream(receive, send)
+        except Exception as e:
+            print(f"[ASGI] {method} {path} failed: {e}")
+            return await send_json(send, {'error': str(e)}, 500)
+
+    await flask_asgi(scope, receive, send)
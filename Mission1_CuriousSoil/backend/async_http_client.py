@@ -0,0 +1,121 @@
+# async_http_client.py
+"""
+Non-blocking counterpart of http_client.HttpClient for the ASGI serving mode.
+
+Same timeouts, full-jitter retry policy, per-call deadline and circuit breaker,
+but built on httpx.AsyncClient so a worker can keep many slow Open-Meteo calls
+in flight on one event loop instead of parking one thread per call.
+"""
+
+import asyncio
+import os
+import random
+import time
+
+import httpx
+
+from http_client import RETRY_STATUSES, CircuitBreaker, CircuitOpenError
+
+# What get_json raises when the upstream cannot be reached (for stale-cache fallbacks)
+UPSTREAM_ERRORS = (httpx.HTTPError, CircuitOpenError)
+
+
+class AsyncHttpClient:
+    """
+    Pooled async JSON-over-HTTP client (see HttpClient for the parameters).
+
+    Errors are raised as httpx.HTTPError (a body that is not JSON as httpx.DecodingError),
+    or CircuitOpenError while the circuit is open.
+    """
+
+    def __init__(self, pool_maxsize: int = 100, connect_timeout: float = 3.05, read_timeout: float = 10.0,
+                 max_retries: int = 2, backoff_base: float = 0.25, backoff_max: float = 2.0,
+                 deadline: float = 15.0, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.pool_maxsize = pool_maxsize
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.deadline = deadline
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.stats = {"requests": 0, "retries": 0, "failures": 0, "circuit_rejections": 0}
+        self._client = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        # Created on first use so it binds to the serving event loop
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=self.pool_maxsize, max_keepalive_connections=self.pool_maxsize)
+            )
+        return self._client
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def get_json(self, url: str, params: dict = None) -> dict:
+        """GETs url and returns the decoded JSON body (same retry/deadline rules as HttpClient.get_json)."""
+        permit = self.breaker.acquire()
+        if permit is None:
+            self.stats["circuit_rejections"] += 1
+            raise CircuitOpenError(f"Circuit open for upstream calls; skipping {url}")
+
+        try:
+            return await self._get_json_with_retries(url, params, time.monotonic() + self.deadline)
+        finally:
+            if permit == "trial":
+                # A cancelled trial (client gone) records no outcome; let the next call try again
+                self.breaker.release_trial()
+
+    async def _get_json_with_retries(self, url: str, params: dict, deadline_at: float) -> dict:
+        client = self._get_client()
+        attempt = 0
+        while True:
+            remaining = max(0.001, deadline_at - time.monotonic())
+            self.stats["requests"] += 1
+            try:
+                resp = await client.get(
+                    url, params=params,
+                    timeout=httpx.Timeout(min(self.read_timeout, remaining), connect=min(self.connect_timeout, remaining))
+                )
+                resp.raise_for_status()
+                try:
+                    data = resp.json()
+                except ValueError as err:
+                    raise httpx.DecodingError(f"Invalid JSON body from {url}: {err}", request=resp.request) from err
+                self.breaker.record_success()
+                return data
+            except httpx.HTTPError as err:
+                retryable = isinstance(err, httpx.TransportError) or (
+                    isinstance(err, httpx.HTTPStatusError) and err.response.status_code in RETRY_STATUSES
+                )
+                delay = self._backoff(attempt)
+                if not retryable or attempt >= self.max_retries or time.monotonic() + delay >= deadline_at:
+                    self.stats["failures"] += 1
+                    if retryable:
+                        self.breaker.record_failure()
+                    else:
+                        self.breaker.record_success()  # The upstream answered; the request itself was bad
+                    raise
+                attempt += 1
+                self.stats["retries"] += 1
+                await asyncio.sleep(delay)
+
+    async def aclose(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+def async_http_client_from_env() -> AsyncHttpClient:
+    """Same environment variables as http_client_from_env (HTTP_POOL_SIZE defaults to 100 here)."""
+    env = os.environ.get
+    return AsyncHttpClient(
+        pool_maxsize=int(env("HTTP_POOL_SIZE", 100)),
+        connect_timeout=float(env("HTTP_CONNECT_TIMEOUT", 3.05)),
+        read_timeout=float(env("HTTP_READ_TIMEOUT", 10.0)),
+        max_retries=int(env("HTTP_MAX_RETRIES", 2)),
+        deadline=float(env("HTTP_DEADLINE", 15.0)),
+        failure_threshold=int(env("HTTP_BREAKER_THRESHOLD", 5)),
+        reset_timeout=float(env("HTTP_BREAKER_RESET", 30.0)),
+    )
@@ -0,0 +1,62 @@
+# bench_etc.py
+"""
+Benchmark: scalar calculate_ETc loop vs. calculate_ETc_vectorized.
+
+Usage:
+    python bench_etc.py            # 1e3, 1e5 and 1e6 elements
+    python bench_etc.py 1000 50000
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from irrigation_model import calculate_ETc, calculate_ETc_vectorized
+
+
+def make_inputs(n: int, seed: int = 0) -> dict:
+    """Random but physically plausible FAO-56 inputs for n field-days."""
+    rng = np.random.default_rng(seed)
+    T_min = rng.uniform(5.0, 22.0, n)
+    return {
+        "T_max": T_min + rng.uniform(5.0, 15.0, n),
+        "T_min": T_min,
+        "RH_max": rng.uniform(60.0, 100.0, n),
+        "RH_min": rng.uniform(15.0, 60.0, n),
+        "Rs": rng.uniform(8.0, 30.0, n),
+        "u2": rng.uniform(0.5, 6.0, n),
+        "z": rng.uniform(0.0, 1200.0, n),
+        "latitude": rng.uniform(30.0, 38.0, n),
+        "J": rng.integers(1, 366, n).astype(np.float64),
+        "Kc": rng.uniform(0.3, 1.2, n),
+    }
+
+
+def run_scalar(inputs: dict) -> np.ndarray:
+    cols = [inputs[k].tolist() for k in ("T_max", "T_min", "RH_max", "RH_min", "Rs", "u2", "z", "latitude", "J", "Kc")]
+    return np.array([calculate_ETc(*row) for row in zip(*cols)])
+
+
+def best_of(fn, repeat: int) -> tuple:
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main(sizes):
+    print(f"{'n':>10} {'scalar (s)':>12} {'vectorized (s)':>15} {'speedup':>9} {'max |diff|':>11}")
+    for n in sizes:
+        inputs = make_inputs(n)
+        t_scalar, ref = best_of(lambda: run_scalar(inputs), repeat=1 if n >= 100_000 else 3)
+        t_vec, out = best_of(lambda: calculate_ETc_vectorized(**inputs), repeat=5)
+        max_diff = float(np.max(np.abs(out - ref)))
+        print(f"{n:>10} {t_scalar:>12.4f} {t_vec:>15.5f} {t_scalar / t_vec:>8.1f}x {max_diff:>11.2e}")
+
+
+if __name__ == "__main__":
+    sizes = [int(float(a)) for a in sys.argv[1:]] or [1_000, 100_000, 1_000_000]
+    main(sizes)
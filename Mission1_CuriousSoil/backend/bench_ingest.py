@@ -0,0 +1,69 @@
+# bench_ingest.py
+"""
+Benchmark: readings/second through POST /update (one reading per request)
+versus POST /update:batch (JSON array, NDJSON and CSV bodies).
+
+Runs against an in-process Flask test client, so the numbers measure the
+backend's own cost (routing, parsing, validation, storage) without network.
+
+Usage:
+    python bench_ingest.py            # 2,000 single requests, batches of 5,000
+    python bench_ingest.py 500 20000
+"""
+
+import json
+import random
+import sys
+import time
+
+from flask import Flask
+
+from sensor_routes import sensor_bp
+
+
+def make_readings(n: int, seed: int = 0) -> list:
+    rng = random.Random(seed)
+    start = time.time() - n
+    return [
+        {
+            "timestamp": start + i,
+            "temperature": round(rng.uniform(10, 35), 2),
+            "humidity": round(rng.uniform(20, 90), 1),
+            "soil_moisture": round(rng.uniform(5, 60), 1),
+        }
+        for i in range(n)
+    ]
+
+
+def main(n_single: int, n_batch: int):
+    app = Flask(__name__)
+    app.register_blueprint(sensor_bp)
+    client = app.test_client()
+
+    readings = make_readings(n_single)
+    start = time.perf_counter()
+    for r in readings:
+        client.post("/update", json=r)
+    single_rate = n_single / (time.perf_counter() - start)
+    print(f"{'POST /update (1 per request)':34} {single_rate:>12,.0f} readings/s")
+
+    batch = make_readings(n_batch, seed=1)
+    header = list(batch[0])
+    bodies = {
+        "JSON array": ("application/json", json.dumps(batch)),
+        "NDJSON": ("application/x-ndjson", "\n".join(json.dumps(r) for r in batch)),
+        "CSV": ("text/csv", "\n".join([",".join(header)] + [",".join(str(r[h]) for h in header) for r in batch])),
+    }
+    for label, (content_type, body) in bodies.items():
+        start = time.perf_counter()
+        resp = client.post("/update:batch", data=body, content_type=content_type)
+        elapsed = time.perf_counter() - start
+        result = resp.get_json()
+        assert result["accepted"] == n_batch, result
+        rate = n_batch / elapsed
+        print(f"{'POST /update:batch (' + label + ')':34} {rate:>12,.0f} readings/s  ({rate / single_rate:.0f}x)")
+
+
+if __name__ == "__main__":
+    args = [int(float(a)) for a in sys.argv[1:]]
+    main(*(args + [2_000, 5_000][len(args):]))
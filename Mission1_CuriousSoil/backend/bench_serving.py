@@ -0,0 +1,208 @@
+# bench_serving.py
+"""
+Benchmark: threaded Flask (WSGI) versus the asyncio serving mode (asgi.py under
+uvicorn) when every request waits on a slow Open-Meteo upstream.
+
+A local stub plays Open-Meteo with a fixed latency and the weather cache TTL is
+set to 0, so every status request goes upstream (concurrent misses for the same
+key still share one call, in both modes). Each mode runs in its own server
+process and is driven by the same closed-loop load generator (raw asyncio
+sockets, so the client itself is not the bottleneck).
+
+Usage:
+    python bench_serving.py                                  # 200 ms upstream, 64 clients, 10 s per mode
+    python bench_serving.py --latency 0.5 --concurrency 256 --threads 16
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import requests
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def start_upstream_stub(latency: float) -> str:
+    """Minimal Open-Meteo forecast stub answering after `latency` seconds."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(latency)
+            q = parse_qs(urlparse(self.path).query)
+            start = datetime.date.fromisoformat(q["start_date"][0])
+            n = (datetime.date.fromisoformat(q["end_date"][0]) - start).days + 1
+            body = json.dumps({
+                "daily": {
+                    "time": [(start + datetime.timedelta(days=i)).isoformat() for i in range(n)],
+                    "temperature_2m_max": [31.0] * n, "temperature_2m_min": [16.0] * n,
+                    "shortwave_radiation_sum": [22.0] * n, "wind_speed_10m_max": [12.0] * n,
+                },
+                "hourly": {"relative_humidity_2m": [40 + h % 24 for h in range(24 * n)]},
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def serve_flask(port: int, threads: int):
+    """Flask behind a fixed-size thread pool (like gunicorn --threads), the sync baseline."""
+    import logging
+    from werkzeug.serving import BaseWSGIServer
+    import app as backend
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    class PooledWSGIServer(BaseWSGIServer):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            self.pool = ThreadPoolExecutor(threads)
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self._handle, request, client_address)
+
+        def _handle(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+
+    PooledWSGIServer("127.0.0.1", port, backend.app).serve_forever()
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_backend(mode: str, upstream: str, threads: int):
+    port = free_port()
+    env = dict(os.environ, OPEN_METEO_FORECAST_URL=f"{upstream}/v1/forecast", WEATHER_CACHE_TTL="0")
+    if mode == "flask":
+        cmd = [sys.executable, __file__, "--serve-flask", str(port), "--threads", str(threads)]
+    else:
+        cmd = [sys.executable, "-m", "uvicorn", "asgi:app", "--port", str(port), "--log-level", "warning"]
+    proc = subprocess.Popen(cmd, cwd=HERE, env=env, stdout=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.get(f"{url}/api/v1/plants/_ready/status", timeout=1)  # 404, no upstream call
+            return proc, url
+        except requests.exceptions.RequestException:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f"{mode} backend did not start")
+
+
+async def fetch(conn, host: str, path: str):
+    """One GET over a raw keep-alive connection; reconnects when the server closes it."""
+    if conn["writer"] is None:
+        conn["reader"], conn["writer"] = await asyncio.open_connection(host, conn["port"])
+    reader, writer = conn["reader"], conn["writer"]
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: keep-alive\r\n\r\n".encode())
+    await writer.drain()
+
+    head = await reader.readuntil(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    version, status = lines[0].split(" ")[:2]
+    headers = dict(line.lower().split(": ", 1) for line in lines[1:] if ": " in line)
+    if "content-length" in headers:
+        await reader.readexactly(int(headers["content-length"]))
+    else:
+        await reader.read()  # HTTP/1.0 style: body runs until close
+    if version == "HTTP/1.0" or headers.get("connection") == "close" or "content-length" not in headers:
+        writer.close()
+        conn["writer"] = None
+    return int(status)
+
+
+async def drive(url: str, path: str, concurrency: int, seconds: float):
+    """Closed loop: `concurrency` clients issue requests back to back for `seconds`."""
+    parsed = urlparse(url)
+    latencies, errors = [], 0
+    await fetch({"port": parsed.port, "writer": None}, parsed.hostname, path)  # Warm-up
+    deadline = time.perf_counter() + seconds
+
+    async def worker():
+        nonlocal errors
+        conn = {"port": parsed.port, "writer": None}
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                status = await fetch(conn, parsed.hostname, path)
+                if status == 200:
+                    latencies.append(time.perf_counter() - start)
+                else:
+                    errors += 1
+            except (OSError, asyncio.IncompleteReadError):
+                errors += 1
+                conn["writer"] = None
+        if conn["writer"] is not None:
+            conn["writer"].close()
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": 1000 * latencies[len(latencies) // 2] if latencies else float("nan"),
+        "p99_ms": 1000 * latencies[int(len(latencies) * 0.99)] if latencies else float("nan"),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Flask vs ASGI serving benchmark under slow upstream.")
+    ap.add_argument("--latency", type=float, default=0.2, help="Simulated Open-Meteo latency (s).")
+    ap.add_argument("--concurrency", type=int, default=64, help="Concurrent clients.")
+    ap.add_argument("--seconds", type=float, default=10.0, help="Duration per mode.")
+    ap.add_argument("--threads", type=int, default=8, help="Worker threads for the Flask baseline.")
+    ap.add_argument("--path", default="/api/v1/plants/tomato-101/status")
+    ap.add_argument("--serve-flask", type=int, metavar="PORT", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.serve_flask:
+        return serve_flask(args.serve_flask, args.threads)
+
+    upstream = start_upstream_stub(args.latency)
+    print(f"upstream latency {args.latency * 1000:.0f} ms, {args.concurrency} clients, {args.seconds:.0f} s per mode, GET {args.path}")
+    print(f"{'mode':24} {'requests':>9} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9}")
+    for mode, label in (("flask", f"flask ({args.threads} threads)"), ("asgi", "asgi (uvicorn, 1 loop)")):
+        proc, url = start_backend(mode, upstream, args.threads)
+        try:
+            r = asyncio.run(drive(url, args.path, args.concurrency, args.seconds))
+        finally:
+            proc.terminate()
+            proc.wait()
+        print(f"{label:24} {r['requests']:>9} {r['errors']:>7} {r['rps']:>9.1f} {r['p50_ms']:>9.1f} {r['p99_ms']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+# geocoding_index.py
+"""
+Local place-name index consulted before the Open-Meteo Geocoding API.
+
+The index is a small tab-separated file (name, latitude, longitude, elevation,
+country, timezone). Lookups are case- and accent-insensitive and support
+prefix search. The bundled file is read-only seed data; successful network
+lookups are appended to a separate cache file so the next start needs no
+network at all.
+"""
+
+import bisect
+import os
+import threading
+import unicodedata
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "geocoding_index.tsv")
+DEFAULT_CACHE_PATH = os.path.join(
+    os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"),
+    "curious_soil", "geocoding_cache.tsv"
+)
+FIELDS = ("name", "latitude", "longitude", "elevation", "country", "timezone")
+
+
+def normalize_name(name: str) -> str:
+    """Lower-cases, strips accents and collapses whitespace ("  Béja " → "beja")."""
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
+
+
+def _parse_float(value: str):
+    return float(value) if value else None
+
+
+def _read_tsv(path: str) -> dict:
+    """{normalized name: location} of the entries in one index file."""
+    entries = {}
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#") or not line.strip():
+                continue
+            cols = line.rstrip("\n").split("\t")
+            if len(cols) != len(FIELDS):
+                continue  # Skip malformed or half-written lines
+            row = dict(zip(FIELDS, cols))
+            for key in ("latitude", "longitude", "elevation"):
+                row[key] = _parse_float(row[key])
+            row["country"] = row["country"] or None
+            row["timezone"] = row["timezone"] or None
+            entries[normalize_name(row["name"])] = row
+    return entries
+
+
+class GeocodingIndex:
+    """
+    Sorted in-memory view of the on-disk index, loaded lazily on first use.
+
+    Parameters:
+    - path: TSV file holding the seed entries (never written).
+    - cache_path: TSV file learned entries are appended to (created on the first
+      add() if missing); None keeps them in memory only.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH, cache_path: str = DEFAULT_CACHE_PATH):
+        self.path = path
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+        self._keys = None       # Sorted normalized names
+        self._entries = {}      # normalized name -> location dict
+
+    def _load(self):
+        if self._keys is not None:
+            return
+        entries = {}
+        for path in (self.path, self.cache_path):  # Learned entries override seeds
+            if path and os.path.exists(path):
+                entries.update(_read_tsv(path))
+        self._entries = entries
+        self._keys = sorted(entries)
+
+    def lookup(self, name: str):
+        """Returns a copy of the exact (case-insensitive) match for name, or None."""
+        with self._lock:
+            self._load()
+            entry = self._entries.get(normalize_name(name))
+            return dict(entry) if entry else None
+
+    def search(self, prefix: str, limit: int = 10) -> list:
+        """Returns up to limit entries whose name starts with prefix, shortest names first."""
+        key = normalize_name(prefix)
+        with self._lock:
+            self._load()
+            start = bisect.bisect_left(self._keys, key)
+            matches = []
+            for i in range(start, len(self._keys)):
+                if not self._keys[i].startswith(key):
+                    break
+                matches.append(self._keys[i])
+            matches.sort(key=len)
+            return [dict(self._entries[k]) for k in matches[:limit]]
+
+    def add(self, location: dict):
+        """Records a location (as returned by get_location_data) in memory and in the cache file."""
+        key = normalize_name(location["name"])
+        line = "\t".join("" if location.get(k) is None else str(location[k]).replace("\t", " ") for k in FIELDS)
+
+        with self._lock:
+            self._load()
+            if self.cache_path:
+                try:
+                    os.makedirs(os.path.dirname(os.path.abspath(self.cache_path)), exist_ok=True)
+                    new_file = not os.path.exists(self.cache_path)
+                    with open(self.cache_path, "a", encoding="utf-8") as f:
+                        if new_file:
+                            f.write("# " + "\t".join(FIELDS) + "\n")
+                        f.write(line + "\n")
+                except OSError as err:  # Read-only home or container: keep the entry in memory
+                    print(f"Could not write geocoding cache {self.cache_path}: {err}")
+            if key not in self._entries:
+                bisect.insort(self._keys, key)
+            self._entries[key] = {k: location.get(k) for k in FIELDS}
+
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return len(self._keys)
+
+
+def geocoding_index_from_env() -> GeocodingIndex:
+    """
+    Builds the model's index; GEOCODING_INDEX_PATH overrides the bundled seed file
+    and GEOCODING_CACHE_PATH the file learned entries go to ("" disables it).
+    """
+    cache_path = os.environ.get("GEOCODING_CACHE_PATH", DEFAULT_CACHE_PATH)
+    return GeocodingIndex(os.environ.get("GEOCODING_INDEX_PATH") or DEFAULT_INDEX_PATH, cache_path or None)
@@ -0,0 +1,246 @@
+# http_client.py
+"""
+Shared HTTP client for the Open-Meteo calls made by the irrigation model.
+
+One pooled keep-alive requests.Session with connect/read timeouts, jittered
+exponential backoff bounded by a per-request deadline, and a circuit breaker
+that fails fast while the upstream is down.
+"""
+
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# HTTP statuses worth retrying (throttling and transient server errors)
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised without touching the network while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Classic closed → open → half-open breaker.
+
+    After failure_threshold consecutive failures the circuit opens and every call
+    is rejected for reset_timeout seconds; then a single trial call is let through
+    and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_in_flight = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Returns True if a call may go to the network right now."""
+        return self.acquire() is not None
+
+    def acquire(self):
+        """
+        Like allow(), but tells which kind of call is let through: "call" (circuit
+        closed), "trial" (the single half-open trial) or None (rejected).
+        A "trial" must be ended with release_trial() whatever its outcome.
+        """
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return "call"
+            if state == "half-open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return "trial"
+            return None
+
+    def release_trial(self):
+        """Lets another trial through if the current one ended without recording an outcome."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                self._opened_at = self._clock()
+
+
+class _CountingAdapter(HTTPAdapter):
+    """HTTPAdapter whose connection pools report every new TCP connection they open."""
+
+    def __init__(self, on_new_connection, **kwargs):
+        self._on_new_connection = on_new_connection
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        on_new_connection = self._on_new_connection
+
+        class _HTTPPool(HTTPConnectionPool):
+            def _new_conn(self):
+                on_new_connection()
+                return super()._new_conn()
+
+        class _HTTPSPool(HTTPSConnectionPool):
+            def _new_conn(self):
+                on_new_connection()
+                return super()._new_conn()
+
+        self.poolmanager.pool_classes_by_scheme = {"http": _HTTPPool, "https": _HTTPSPool}
+
+
+class HttpClient:
+    """
+    Pooled JSON-over-HTTP client.
+
+    Parameters:
+    - pool_maxsize: Max keep-alive connections per host (callers block when all are busy).
+    - connect_timeout / read_timeout: Socket timeouts in seconds for each attempt.
+    - max_retries: Extra attempts after the first one, for connection errors,
+      timeouts and RETRY_STATUSES.
+    - backoff_base / backoff_max: Full-jitter exponential backoff bounds (seconds).
+    - deadline: Total time budget per get_json call, retries and backoff included.
+    - failure_threshold / reset_timeout: Circuit breaker settings.
+    """
+
+    def __init__(self, pool_maxsize: int = 10, connect_timeout: float = 3.05, read_timeout: float = 10.0,
+                 max_retries: int = 2, backoff_base: float = 0.25, backoff_max: float = 2.0,
+                 deadline: float = 15.0, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.deadline = deadline
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "requests": 0,              # Attempts sent to the network
+            "connections_opened": 0,    # New TCP (+TLS) connections
+            "retries": 0,
+            "failures": 0,              # get_json calls that ended in an error
+            "circuit_rejections": 0,    # Calls refused while the circuit was open
+        }
+
+        self.session = requests.Session()
+        adapter = _CountingAdapter(
+            lambda: self._count("connections_opened"),
+            pool_connections=4, pool_maxsize=pool_maxsize, pool_block=True, max_retries=0
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _count(self, name: str, n: int = 1):
+        with self._stats_lock:
+            self._stats[name] += n
+
+    @property
+    def stats(self) -> dict:
+        """Snapshot of the counters, including how many requests reused a pooled connection."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["connections_reused"] = max(0, stats["requests"] - stats["connections_opened"])
+        stats["circuit_state"] = self.breaker.state
+        return stats
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def get_json(self, url: str, params: dict = None) -> dict:
+        """
+        GETs url and returns the decoded JSON body.
+
+        Raises CircuitOpenError immediately while the circuit is open, otherwise the
+        last requests exception once retries or the deadline are exhausted.
+        """
+        permit = self.breaker.acquire()
+        if permit is None:
+            self._count("circuit_rejections")
+            raise CircuitOpenError(f"Circuit open for upstream calls; skipping {url}")
+
+        try:
+            return self._get_json_with_retries(url, params, time.monotonic() + self.deadline)
+        finally:
+            if permit == "trial":
+                # A trial ending in a non-requests error (e.g. a bug while decoding) must not
+                # leave the breaker waiting forever for its outcome
+                self.breaker.release_trial()
+
+    def _get_json_with_retries(self, url: str, params: dict, deadline_at: float) -> dict:
+        attempt = 0
+        while True:
+            try:
+                remaining = deadline_at - time.monotonic()
+                if remaining <= 0:
+                    # Non-positive timeouts are a ValueError in urllib3; report a plain timeout instead
+                    raise requests.exceptions.Timeout(f"Deadline of {self.deadline}s exceeded before calling {url}")
+                self._count("requests")
+                resp = self.session.get(
+                    url, params=params,
+                    timeout=(min(self.connect_timeout, remaining), min(self.read_timeout, remaining))
+                )
+                resp.raise_for_status()
+                data = resp.json()
+                self.breaker.record_success()
+                return data
+            except requests.exceptions.RequestException as err:
+                retryable = isinstance(err, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)) or (
+                    err.response is not None and err.response.status_code in RETRY_STATUSES
+                )
+                delay = self._backoff(attempt)
+                if not retryable or attempt >= self.max_retries or time.monotonic() + delay >= deadline_at:
+                    self._count("failures")
+                    if retryable:
+                        self.breaker.record_failure()
+                    else:
+                        self.breaker.record_success()  # The upstream answered; the request itself was bad
+                    raise
+                attempt += 1
+                self._count("retries")
+                time.sleep(delay)
+
+
+def http_client_from_env() -> HttpClient:
+    """
+    Builds the model's shared client from environment variables:
+    HTTP_POOL_SIZE, HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_MAX_RETRIES,
+    HTTP_DEADLINE, HTTP_BREAKER_THRESHOLD, HTTP_BREAKER_RESET (seconds).
+    """
+    env = os.environ.get
+    return HttpClient(
+        pool_maxsize=int(env("HTTP_POOL_SIZE", 10)),
+        connect_timeout=float(env("HTTP_CONNECT_TIMEOUT", 3.05)),
+        read_timeout=float(env("HTTP_READ_TIMEOUT", 10.0)),
+        max_retries=int(env("HTTP_MAX_RETRIES", 2)),
+        deadline=float(env("HTTP_DEADLINE", 15.0)),
+        failure_threshold=int(env("HTTP_BREAKER_THRESHOLD", 5)),
+        reset_timeout=float(env("HTTP_BREAKER_RESET", 30.0)),
+    )
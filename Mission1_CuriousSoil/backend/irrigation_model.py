@@ -7,17 +7,51 @@ Original file is located at
     https://colab.research.google.com/drive/1OrqFmtbm83O17__utZ_aHy2ryigflvnT
 """
 
+import asyncio
 import math
+import os
 import requests
 import datetime
 
+import numpy as np
+
+from geocoding_index import geocoding_index_from_env
+from http_client import http_client_from_env
+from weather_cache import make_weather_key, weather_cache_from_env
+
+# Open-Meteo forecast/archive endpoints (overridable, e.g. to point at a local stub server)
+FORECAST_URL = os.environ.get("OPEN_METEO_FORECAST_URL", "https://api.open-meteo.com/v1/forecast")
+ARCHIVE_URL = os.environ.get("OPEN_METEO_ARCHIVE_URL", "https://archive-api.open-meteo.com/v1/archive")
+FORECAST_HORIZON_DAYS = 16  # Forecast API limit (today included)
+
+# Daily weather variables returned by fetch_weather / fetch_weather_range
+WEATHER_VARIABLES = ("T_max", "T_min", "RH_max", "RH_min", "Rs", "u2")
+
+
+class MissingWeatherError(ValueError):
+    """The upstream answered, but without complete weather for the requested day."""
+
+
+# Shared pooled HTTP client (configured through HTTP_* environment variables)
+HTTP_CLIENT = http_client_from_env()
+
+# Local place-name index consulted before the Geocoding API
+GEOCODING_INDEX = geocoding_index_from_env()
+
+# Shared daily-weather cache (configured through WEATHER_CACHE_* environment variables)
+WEATHER_CACHE = weather_cache_from_env()
+
+# Async client for the ASGI serving mode (see get_async_http_client)
+ASYNC_HTTP_CLIENT = None
+
 # =============================================
 # 1. WEATHER DATA FROM API (Open-Meteo)
 # =============================================
 def get_location_data(location_name: str):
     """
     Fetches latitude, longitude, and elevation for a given location name
-    using the Open-Meteo Geocoding API.
+    using the Open-Meteo Geocoding API. The local GEOCODING_INDEX is consulted
+    first, and successful API lookups are added to it.
 
     Parameters:
     - location_name: The name of the location to search (e.g., "Paris", "Mount Everest")
@@ -25,6 +59,11 @@ def get_location_data(location_name: str):
     Returns:
     - A dictionary with location data if successful, None otherwise.
     """
+    # Known places are answered locally, without any network call
+    cached = GEOCODING_INDEX.lookup(location_name)
+    if cached:
+        return cached
+
     # Base URL for the Open-Meteo Geocoding API
     base_url = "https://geocoding-api.open-meteo.com/v1/search"
 
@@ -36,14 +75,9 @@ def get_location_data(location_name: str):
     }
 
     try:
-        # Make the GET request to the API
-        response = requests.get(base_url, params=params)
-
-        # Raise an HTTPError if the HTTP request returned an unsuccessful status code
-        response.raise_for_status()
-
-        # Parse the JSON response
-        data = response.json()
+        # Make the GET request to the API (pooled session, timeouts, retries);
+        # raises an HTTPError if the HTTP request returned an unsuccessful status code
+        data = HTTP_CLIENT.get_json(base_url, params=params)
 
         # Check if the 'results' key exists and has data
         if "results" in data and len(data["results"]) > 0:
@@ -59,6 +93,8 @@ def get_location_data(location_name: str):
                 "country": location_info.get("country"),
                 "timezone": location_info.get("timezone")
             }
+            if result["name"]:
+                GEOCODING_INDEX.add(result)
             return result
         else:
             print(f"Error: Location '{location_name}' not found.")
@@ -76,37 +112,171 @@ def get_location_data(location_name: str):
     return None
 
 def fetch_weather(lat: float, lon: float, z: float, date: str = None) -> dict:
+    """
+    Returns the daily weather inputs for the FAO-56 model at (lat, lon) on date.
+    Served from WEATHER_CACHE when possible; concurrent misses share one upstream call.
+    """
     if date is None:
         date = datetime.date.today().isoformat()
 
-    url = "https://api.open-meteo.com/v1/forecast"
-    params = {
+    key = make_weather_key(lat, lon, date)
+    try:
+        return WEATHER_CACHE.get_or_fetch(key, lambda: _fetch_weather_upstream(lat, lon, date))
+    except (requests.exceptions.RequestException, MissingWeatherError) as err:
+        # Upstream down (or circuit open): fall back to the last known weather for this day
+        stale = WEATHER_CACHE.get(key, allow_stale=True)
+        if stale is None:
+            raise
+        print(f"Weather upstream unavailable ({err}); serving cached weather for {date}.")
+        return stale
+
+def _fetch_weather_upstream(lat: float, lon: float, date: str) -> dict:
+    return _weather_day(_fetch_weather_range_upstream(lat, lon, date, date, FORECAST_URL), date)
+
+def _weather_day(weather: dict, date: str) -> dict:
+    if date not in weather:
+        raise MissingWeatherError(f"Upstream returned incomplete weather for {date}.")
+    return weather[date]
+
+def _weather_params(lat: float, lon: float, start_date: str, end_date: str) -> dict:
+    return {
         "latitude": lat,
         "longitude": lon,
         "daily": "temperature_2m_max,temperature_2m_min,shortwave_radiation_sum,wind_speed_10m_max",
         "hourly": "relative_humidity_2m",
-        "start_date": date,
-        "end_date": date,
+        "start_date": start_date,
+        "end_date": end_date,
         "timezone": "auto"
     }
-    resp = requests.get(url, params=params)
-    data = resp.json()
 
+def _fetch_weather_range_upstream(lat: float, lon: float, start_date: str, end_date: str, url: str) -> dict:
+    """Fetches [start_date, end_date] in one request; returns {date: daily weather dict}."""
+    data = HTTP_CLIENT.get_json(url, params=_weather_params(lat, lon, start_date, end_date))
+    return _parse_weather_range(data, start_date)
+
+def _parse_weather_range(data: dict, start_date: str) -> dict:
+    """
+    Turns an Open-Meteo daily/hourly response into {date: daily weather dict}.
+    Days with a missing (null) variable are left out rather than filled with NaN.
+    """
     daily = data['daily']
-    hourly_rh = data['hourly']['relative_humidity_2m']
+    hourly = data['hourly']
+    n_days = len(daily['temperature_2m_max'])
+    dates = daily.get('time') or [
+        (datetime.date.fromisoformat(start_date) + datetime.timedelta(days=i)).isoformat() for i in range(n_days)
+    ]
+
+    # Group hourly humidity by local day
+    rh_by_day = {d: [] for d in dates}
+    hourly_times = hourly.get('time')
+    hours_per_day = max(1, len(hourly['relative_humidity_2m']) // n_days)
+    for i, rh in enumerate(hourly['relative_humidity_2m']):
+        day = hourly_times[i][:10] if hourly_times else dates[min(i // hours_per_day, n_days - 1)]
+        if rh is not None and day in rh_by_day:
+            rh_by_day[day].append(rh)
+
+    weather = {}
+    for i, day in enumerate(dates):
+        u10 = daily['wind_speed_10m_max'][i]
+        rh = rh_by_day[day]
+        values = [daily[name][i] for name in ('temperature_2m_max', 'temperature_2m_min', 'shortwave_radiation_sum')]
+        if u10 is None or not rh or any(v is None for v in values):
+            continue
+
+        # Wind speed at 10m → convert to 2m
+        u2 = u10 * (4.87 / math.log(67.8 * 10 - 5.42))
+        weather[day] = {
+            "T_max": values[0],
+            "T_min": values[1],
+            "RH_max": max(rh),
+            "RH_min": min(rh),
+            "Rs": values[2],  # MJ/m²/day
+            "u2": u2
+        }
+    return weather
+
+def fetch_weather_range(lat: float, lon: float, start_date: str, end_date: str, archive: bool = False) -> dict:
+    """
+    Fetches daily weather for a whole date window in one upstream request.
 
-    # Wind speed at 10m → convert to 2m
-    u10 = daily['wind_speed_10m_max'][0]
-    u2 = u10 * (4.87 / math.log(67.8 * 10 - 5.42))
+    Parameters:
+    - start_date / end_date: Inclusive ISO dates.
+    - archive: Use the historical archive API (past seasons) instead of the forecast API,
+      which only reaches FORECAST_HORIZON_DAYS ahead.
 
-    return {
-        "T_max": daily['temperature_2m_max'][0],
-        "T_min": daily['temperature_2m_min'][0],
-        "RH_max": max(hourly_rh),
-        "RH_min": min(hourly_rh),
-        "Rs": daily['shortwave_radiation_sum'][0],  # MJ/m²/day
-        "u2": u2
-    }
+    Returns:
+    - A columnar dict: "date" (list of ISO strings), "J" (day-of-year array) and one
+      NumPy array per WEATHER_VARIABLES entry, ready for calculate_ETc_vectorized.
+      "valid" is a boolean mask of the days with complete weather; the others hold
+      NaN (so does their ETc) and should be skipped.
+
+    Every day is also stored in WEATHER_CACHE, and a window already fully cached
+    is served without any network call. Days the range response leaves incomplete
+    are retried alone through fetch_weather (forecast mode), then masked.
+    """
+    start = datetime.date.fromisoformat(start_date)
+    end = datetime.date.fromisoformat(end_date)
+    if end < start:
+        raise ValueError(f"end_date ({end_date}) is before start_date ({start_date}).")
+    if not archive:
+        horizon = datetime.date.today() + datetime.timedelta(days=FORECAST_HORIZON_DAYS - 1)
+        if end > horizon:
+            raise ValueError(f"end_date ({end_date}) is beyond the {FORECAST_HORIZON_DAYS}-day forecast horizon.")
+
+    dates = [(start + datetime.timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+    days = [WEATHER_CACHE.get(make_weather_key(lat, lon, d)) for d in dates]
+
+    if any(day is None for day in days):
+        fetched = _fetch_weather_range_upstream(lat, lon, start_date, end_date, ARCHIVE_URL if archive else FORECAST_URL)
+        for i, d in enumerate(dates):
+            if d in fetched:
+                days[i] = fetched[d]
+                WEATHER_CACHE.put(make_weather_key(lat, lon, d), fetched[d])
+        for i, d in enumerate(dates):
+            if days[i] is None and not archive:
+                try:
+                    days[i] = fetch_weather(lat, lon, None, d)
+                except (requests.exceptions.RequestException, MissingWeatherError) as err:
+                    print(f"No complete weather for {d} ({err}); day masked.")
+
+    nan_day = dict.fromkeys(WEATHER_VARIABLES, float('nan'))
+    columns = {name: np.array([(day or nan_day)[name] for day in days], dtype=np.float64) for name in WEATHER_VARIABLES}
+    columns["valid"] = np.array([day is not None for day in days])
+    columns["date"] = dates
+    columns["J"] = np.array([datetime.date.fromisoformat(d).timetuple().tm_yday for d in dates], dtype=np.float64)
+    return columns
+
+async def fetch_weather_async(lat: float, lon: float, z: float, date: str = None) -> dict:
+    """
+    Non-blocking fetch_weather for the ASGI serving mode: same cache and stale
+    fallback, with concurrent misses sharing one in-flight httpx request.
+    """
+    from async_http_client import UPSTREAM_ERRORS
+
+    if date is None:
+        date = datetime.date.today().isoformat()
+
+    key = make_weather_key(lat, lon, date)
+    try:
+        return await WEATHER_CACHE.get_or_fetch_async(key, lambda: _fetch_weather_upstream_async(lat, lon, date))
+    except UPSTREAM_ERRORS + (MissingWeatherError,) as err:
+        stale = WEATHER_CACHE.get(key, allow_stale=True)
+        if stale is None:
+            raise
+        print(f"Weather upstream unavailable ({err}); serving cached weather for {date}.")
+        return stale
+
+async def _fetch_weather_upstream_async(lat: float, lon: float, date: str) -> dict:
+    data = await get_async_http_client().get_json(FORECAST_URL, params=_weather_params(lat, lon, date, date))
+    return _weather_day(_parse_weather_range(data, date), date)
+
+def get_async_http_client():
+    """Shared AsyncHttpClient, imported and built on first use so the Flask path never loads httpx."""
+    global ASYNC_HTTP_CLIENT
+    if ASYNC_HTTP_CLIENT is None:
+        from async_http_client import async_http_client_from_env
+        ASYNC_HTTP_CLIENT = async_http_client_from_env()
+    return ASYNC_HTTP_CLIENT
 
 # =============================================
 # 2. ETc CALCULATION (FAO-56 Penman-Monteith)
@@ -139,6 +309,56 @@ def calculate_ETc(T_max, T_min, RH_max, RH_min, Rs, u2, z, latitude, J, Kc):
           (Delta + gamma * (1 + 0.34 * u2))
     return Kc * ET0  # ETc in mm/day
 
+def calculate_ETc_vectorized(T_max, T_min, RH_max, RH_min, Rs, u2, z, latitude, J, Kc):
+    """
+    Array version of calculate_ETc for many fields and/or days in one call.
+
+    Every argument may be a NumPy array or a scalar; they are broadcast together,
+    so e.g. per-parcel Kc/latitude can be combined with per-day weather columns.
+    Follows the same FAO-56 steps as calculate_ETc and returns an ETc array (mm/day).
+    """
+    T_max, T_min, RH_max, RH_min, Rs, u2, z, latitude, J, Kc = (
+        np.asarray(a, dtype=np.float64) for a in (T_max, T_min, RH_max, RH_min, Rs, u2, z, latitude, J, Kc)
+    )
+    T = (T_max + T_min) / 2
+
+    es_max = 0.6108 * np.exp(17.27 * T_max / (T_max + 237.3))
+    es_min = 0.6108 * np.exp(17.27 * T_min / (T_min + 237.3))
+    es = (es_max + es_min) / 2
+    ea = (es_min * (RH_max / 100) + es_max * (RH_min / 100)) / 2
+    Delta = 4098 * es / ((T + 237.3) ** 2)
+    P = 101.3 * ((293 - 0.0065 * z) / 293) ** 5.26
+    gamma = 0.000665 * P
+    dr = 1 + 0.033 * np.cos(2 * np.pi * J / 365)
+    delta_solar = 0.409 * np.sin(2 * np.pi * J / 365 - 1.39)
+    phi = latitude * np.pi / 180
+    omega_s = np.arccos(-np.tan(phi) * np.tan(delta_solar))
+    Ra = (24 * 60 / np.pi) * 0.082 * dr * (
+        omega_s * np.sin(phi) * np.sin(delta_solar) +
+        np.cos(phi) * np.cos(delta_solar) * np.sin(omega_s)
+    )
+    Rso = (0.75 + 2e-5 * z) * Ra
+    Rns = (1 - 0.23) * Rs
+    sigma = 4.903e-9
+    Rnl = sigma * ((T_max + 273.16)**4 + (T_min + 273.16)**4) / 2 * \
+          (0.34 - 0.14 * np.sqrt(ea)) * (1.35 * (Rs / Rso) - 0.35)
+    Rn = Rns - Rnl
+    G = 0  # Daily → negligible
+    ET0 = (0.408 * Delta * (Rn - G) + gamma * (900 / (T + 273)) * u2 * (es - ea)) / \
+          (Delta + gamma * (1 + 0.34 * u2))
+    return Kc * ET0  # ETc in mm/day
+
+def calculate_ETc_range(weather: dict, z, latitude, Kc) -> np.ndarray:
+    """
+    ETc for every day of a fetch_weather_range result.
+    Kc/z/latitude broadcast against the day axis, e.g. Kc of shape (n_plants, 1)
+    yields an (n_plants, n_days) matrix.
+    """
+    return calculate_ETc_vectorized(
+        **{name: weather[name] for name in WEATHER_VARIABLES},
+        z=z, latitude=latitude, J=weather["J"], Kc=Kc
+    )
+
 # =============================================
 # 3. SOIL WATER BALANCE & IRRIGATION NEED
 # =============================================
@@ -175,6 +395,28 @@ def calculate_irrigation_need(
 
     return round(irrigation_needed, 2)
 
+def calculate_irrigation_need_vectorized(
+    soil_moisture_percent,
+    field_capacity,
+    wilting_point,
+    root_depth_mm,
+    ETc,
+    MAD=0.50
+) -> np.ndarray:
+    """
+    Array version of calculate_irrigation_need (inputs are broadcast together).
+    Returns unrounded mm of water to apply today for every field.
+    """
+    soil_moisture_percent, field_capacity, wilting_point, root_depth_mm, ETc, MAD = (
+        np.asarray(a, dtype=np.float64) for a in (soil_moisture_percent, field_capacity, wilting_point, root_depth_mm, ETc, MAD)
+    )
+    TAW = (field_capacity - wilting_point) * root_depth_mm
+    RAW = MAD * TAW
+    current_water = soil_moisture_percent * root_depth_mm
+    target_water = wilting_point * root_depth_mm + RAW
+    deficit = np.maximum(0, target_water - current_water)
+    return np.minimum(deficit, ETc * 1.1)
+
 # =============================================
 # 4. MAIN FUNCTION: FULLY AUTOMATED
 # =============================================
@@ -192,6 +434,24 @@ def get_daily_irrigation_recommendation(
     """
     # 1. Get weather
     weather = fetch_weather(lat, lon, z, date)
+    return _daily_report(weather, lat, z, Kc, soil_moisture_percent, field_capacity, wilting_point, root_depth_mm, MAD, date)
+
+
+async def get_daily_irrigation_recommendation_async(
+    lat: float, lon: float, z: float, Kc: float,
+    soil_moisture_percent: float,
+    field_capacity: float = 35.0,
+    wilting_point: float = 15.0,
+    root_depth_mm: float = 400,
+    MAD: float = 0.5,
+    date: str = None
+) -> dict:
+    """Async twin of get_daily_irrigation_recommendation (weather via fetch_weather_async)."""
+    weather = await fetch_weather_async(lat, lon, z, date)
+    return _daily_report(weather, lat, z, Kc, soil_moisture_percent, field_capacity, wilting_point, root_depth_mm, MAD, date)
+
+
+def _daily_report(weather, lat, z, Kc, soil_moisture_percent, field_capacity, wilting_point, root_depth_mm, MAD, date):
     J = datetime.date.fromisoformat(date or datetime.date.today().isoformat()).timetuple().tm_yday
 
     # 2. Calculate ETc
@@ -208,6 +468,10 @@ def get_daily_irrigation_recommendation(
         Kc=Kc
     )
 
+    if not math.isfinite(ETc):
+        # Incomplete weather (e.g. an entry cached before missing days were skipped)
+        return _no_weather_report(date or datetime.date.today().isoformat(), soil_moisture_percent)
+
     # 3. Calculate irrigation
     irrigation_mm = calculate_irrigation_need(
         soil_moisture_percent=soil_moisture_percent,
@@ -229,6 +493,115 @@ def get_daily_irrigation_recommendation(
     }
 
 
+def _no_weather_report(date, soil_moisture_percent):
+    """Report for a day without complete weather: no ETc, hence no irrigation amount (null in JSON)."""
+    return {
+        "date": date,
+        "ETc_mm_per_day": None,
+        "soil_moisture_percent": soil_moisture_percent,
+        "irrigation_needed_mm": None,
+        "status": "Weather data unavailable",
+        "recommendation": "Irrigation need could not be computed: weather data for this day is incomplete."
+    }
+
+
+def get_batch_irrigation_recommendations(fields: list, date: str = None) -> list:
+    """
+    Batch version of get_daily_irrigation_recommendation.
+
+    Parameters:
+    - fields: List of dicts with the keyword arguments of get_daily_irrigation_recommendation
+      (lat, lon, z, Kc, soil_moisture_percent and optionally field_capacity,
+      wilting_point, root_depth_mm, MAD).
+    - date: ISO date shared by all fields (defaults to today).
+
+    Weather is fetched once per distinct (location, date) and ETc / irrigation
+    need are computed for all fields in one vectorized pass.
+
+    Returns:
+    - A list of reports (same keys as get_daily_irrigation_recommendation), in input order.
+    """
+    date = date or datetime.date.today().isoformat()
+    if not fields:
+        return []
+
+    # 1. Get weather once per distinct location
+    weather_by_key = {}
+    rows = []
+    for f in fields:
+        key = make_weather_key(f['lat'], f['lon'], date)
+        if key not in weather_by_key:
+            weather_by_key[key] = fetch_weather(f['lat'], f['lon'], f['z'], date)
+        rows.append(weather_by_key[key])
+    return _batch_reports(fields, rows, date)
+
+
+async def get_batch_irrigation_recommendations_async(fields: list, date: str = None) -> list:
+    """Async twin of get_batch_irrigation_recommendations; distinct locations are fetched concurrently."""
+    date = date or datetime.date.today().isoformat()
+    if not fields:
+        return []
+
+    first_field = {}
+    for f in fields:
+        first_field.setdefault(make_weather_key(f['lat'], f['lon'], date), f)
+    weather = await asyncio.gather(*(fetch_weather_async(f['lat'], f['lon'], f['z'], date) for f in first_field.values()))
+    weather_by_key = dict(zip(first_field, weather))
+    rows = [weather_by_key[make_weather_key(f['lat'], f['lon'], date)] for f in fields]
+    return _batch_reports(fields, rows, date)
+
+
+def _batch_reports(fields: list, rows: list, date: str) -> list:
+    """Vectorized ETc / irrigation pass over fields, rows[i] being the weather of fields[i]."""
+    J = datetime.date.fromisoformat(date).timetuple().tm_yday
+
+    def column(source, name, default=None):
+        return np.array([item.get(name, default) for item in source], dtype=np.float64)
+
+    # 2. Calculate ETc for every field at once
+    ETc = calculate_ETc_vectorized(
+        T_max=column(rows, 'T_max'),
+        T_min=column(rows, 'T_min'),
+        RH_max=column(rows, 'RH_max'),
+        RH_min=column(rows, 'RH_min'),
+        Rs=column(rows, 'Rs'),
+        u2=column(rows, 'u2'),
+        z=column(fields, 'z'),
+        latitude=column(fields, 'lat'),
+        J=J,
+        Kc=column(fields, 'Kc')
+    )
+
+    # 3. Calculate irrigation for every field at once
+    irrigation = calculate_irrigation_need_vectorized(
+        soil_moisture_percent=column(fields, 'soil_moisture_percent'),
+        field_capacity=column(fields, 'field_capacity', 35.0),
+        wilting_point=column(fields, 'wilting_point', 15.0),
+        root_depth_mm=column(fields, 'root_depth_mm', 400),
+        ETc=ETc,
+        MAD=column(fields, 'MAD', 0.5)
+    )
+
+    # 4. Return one report per field
+    reports = []
+    for f, etc_mm, irrigation_mm in zip(fields, ETc.tolist(), irrigation.tolist()):
+        if not math.isfinite(etc_mm):
+            reports.append(_no_weather_report(date, f['soil_moisture_percent']))
+            continue
+        # calculate_irrigation_need returns the int 0 (from max(0, deficit)) when no water is needed;
+        # keep the same JSON (0, not 0.0) as the single-plant report
+        irrigation_mm = 0 if irrigation_mm == 0 else round(irrigation_mm, 2)
+        reports.append({
+            "date": date,
+            "ETc_mm_per_day": round(etc_mm, 2),
+            "soil_moisture_percent": f['soil_moisture_percent'],
+            "irrigation_needed_mm": irrigation_mm,
+            "status": "Irrigate now" if irrigation_mm > 0 else "No irrigation needed",
+            "recommendation": f"Apply {irrigation_mm} mm of water today." if irrigation_mm > 0 else "Soil is sufficiently moist."
+        })
+    return reports
+
+
 # =============================================
 # EXAMPLE USAGE
 # =============================================
@@ -237,9 +610,8 @@ def get_daily_irrigation_recommendation(
 
 # --- Example Usage ---
 
-# 1. Search for a city
-location1 = "Zaghouan"
-data1 =get_location_data(location1)
+# 1. Search for a city: done under __main__ below, so importing this module
+#    stays free of network calls.
 # if data1:
 #     print(f"\n--- Data for {location1} ---")
 #     print(f"  Name: {data1['name']}, {data1['country']}")
@@ -250,6 +622,9 @@ data1 =get_location_data(location1)
 
 
 if __name__ == "__main__":
+    location1 = "Zaghouan"
+    data1 = get_location_data(location1)
+
     result = get_daily_irrigation_recommendation(
         lat=data1['latitude'],
         lon=data1['longitude'],      #Location data for Zaghouan
@@ -0,0 +1,125 @@
+# loadtest_stream.py
+"""
+Load test for GET /api/v1/plants/stream.
+
+Opens a few hundred concurrent SSE subscribers (a few of them deliberately slow
+readers), toggles pumps while they listen, and reports how many frames each
+client received versus how many model computations the server performed.
+
+Usage:
+    python loadtest_stream.py                       # in-process server, 300 subscribers, 10 s
+    python loadtest_stream.py --subscribers 500 --seconds 20
+    python loadtest_stream.py --url http://localhost:5000   # against a running backend
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+
+
+def subscriber(host, port, stop, results, slow=False):
+    counts = {"slow": slow, "status": 0, "heartbeat": 0, "first_event_s": None}
+    started = time.perf_counter()
+    buf = b""
+    try:
+        sock = socket.create_connection((host, port), timeout=30)
+        sock.sendall(f"GET /api/v1/plants/stream HTTP/1.1\r\nHost: {host}\r\nAccept: text/event-stream\r\n\r\n".encode())
+        sock.settimeout(0.5)
+        while not stop.is_set():
+            try:
+                chunk = sock.recv(65536)
+            except socket.timeout:
+                continue
+            if not chunk:
+                break
+            buf += chunk
+            *lines, buf = buf.split(b"\n")
+            for line in lines:
+                if line.startswith(b"event: status"):
+                    counts["status"] += 1
+                    if counts["first_event_s"] is None:
+                        counts["first_event_s"] = time.perf_counter() - started
+                elif line.startswith(b": heartbeat"):
+                    counts["heartbeat"] += 1
+            if slow:
+                time.sleep(2.0)  # Slow reader: the server must coalesce, not buffer
+        sock.close()
+    except OSError as e:
+        counts["error"] = str(e)
+    results.append(counts)
+
+
+def start_local_server(coalesce, heartbeat):
+    os.environ["STREAM_COALESCE_SECONDS"] = str(coalesce)
+    os.environ["STREAM_HEARTBEAT_SECONDS"] = str(heartbeat)
+    from werkzeug.serving import make_server
+    import app as backend
+
+    server = make_server("127.0.0.1", 0, backend.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}", backend
+
+
+def main():
+    ap = argparse.ArgumentParser(description="SSE status stream load test.")
+    ap.add_argument("--url", default=None, help="Backend base URL (default: start an in-process server).")
+    ap.add_argument("--subscribers", type=int, default=300)
+    ap.add_argument("--slow", type=int, default=5, help="How many of the subscribers read slowly.")
+    ap.add_argument("--seconds", type=float, default=10.0)
+    ap.add_argument("--coalesce", type=float, default=0.5, help="Coalescing window for the in-process server.")
+    ap.add_argument("--heartbeat", type=float, default=2.0, help="Heartbeat interval for the in-process server.")
+    args = ap.parse_args()
+
+    backend = None
+    url = args.url
+    if url is None:
+        url, backend = start_local_server(args.coalesce, args.heartbeat)
+    parsed = urlparse(url)
+
+    stop = threading.Event()
+    results = []
+    threads = [
+        threading.Thread(target=subscriber, args=(parsed.hostname, parsed.port, stop, results, i < args.slow), daemon=True)
+        for i in range(args.subscribers)
+    ]
+    for t in threads:
+        t.start()
+
+    # Flip pumps during the run so there are state changes to push
+    deadline = time.monotonic() + args.seconds
+    toggle = True
+    while time.monotonic() < deadline:
+        for plant_id in ("tomato-101", "onion-303"):
+            requests.put(f"{url}/api/v1/plants/{plant_id}/pump", json={"state": toggle}, timeout=5)
+        toggle = not toggle
+        time.sleep(1.0)
+
+    stop.set()
+    join_deadline = time.monotonic() + 10
+    for t in threads:
+        t.join(timeout=max(0.0, join_deadline - time.monotonic()))
+
+    ok = [r for r in results if "error" not in r]
+    fast = [r for r in ok if not r["slow"]]
+    slow = [r for r in ok if r["slow"]]
+    print(f"subscribers connected : {len(ok)}/{args.subscribers}")
+    print(f"status frames/client  : mean {statistics.mean(r['status'] for r in fast) if fast else 0:.1f} (fast readers), "
+          f"{statistics.mean(r['status'] for r in slow) if slow else 0:.1f} (slow readers)")
+    print(f"heartbeats/client     : mean {statistics.mean(r['heartbeat'] for r in ok):.1f}")
+    first = sorted(r["first_event_s"] for r in ok if r["first_event_s"] is not None)
+    if first:
+        print(f"time to first event   : p50 {first[len(first) // 2]:.3f}s, max {first[-1]:.3f}s")
+    if backend is not None:
+        stats = backend.status_broadcaster.stats
+        print(f"server publications   : {stats['publications']} "
+              f"({stats['computed_plants']} plant recomputations for {len(ok)} subscribers)")
+
+
+if __name__ == "__main__":
+    main()
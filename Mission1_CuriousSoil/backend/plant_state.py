@@ -0,0 +1,96 @@
+# plant_state.py
+"""
+Lazily evaluated plant water-level model (replaces the 2-second simulation thread).
+
+Each plant only stores (level, pump state, timestamp) from its last change; the
+current waterLevel is derived analytically when read, so idle plants cost nothing.
+"""
+
+import threading
+import time
+
+# Same rates as the former simulation loop: +0.5 / -0.25 per 2-second tick
+FILL_RATE_PER_SECOND = 0.5 / 2
+DRAIN_RATE_PER_SECOND = 0.25 / 2
+MIN_LEVEL = 0.0
+MAX_LEVEL = 100.0
+
+
+def water_level_at(level: float, is_pump_on: bool, elapsed_seconds: float) -> float:
+    """Water level after elapsed_seconds of filling (pump ON) or consumption (pump OFF)."""
+    if is_pump_on:
+        return min(MAX_LEVEL, level + FILL_RATE_PER_SECOND * elapsed_seconds)
+    return max(MIN_LEVEL, level - DRAIN_RATE_PER_SECOND * elapsed_seconds)
+
+
+class PlantStateStore:
+    """
+    Thread-safe store of plant states.
+
+    Every plant maps to an immutable (level, is_pump_on, since, version) tuple.
+    Writers replace the tuple under a lock; readers grab the current tuple in one
+    atomic dict lookup and never block, so concurrent reads always see a
+    consistent (level, pump, timestamp) triple.
+    """
+
+    def __init__(self, initial_states: dict = None, clock=time.monotonic):
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._states = {}
+        for plant_id, state in (initial_states or {}).items():
+            self.add(plant_id, state['waterLevel'], state['isPumpOn'])
+
+    def add(self, plant_id: str, water_level: float, is_pump_on: bool):
+        with self._lock:
+            self._states[plant_id] = (float(water_level), bool(is_pump_on), self._clock(), 0)
+
+    def _view(self, entry: tuple, now: float) -> dict:
+        level, is_pump_on, since, version = entry
+        return {
+            'waterLevel': round(water_level_at(level, is_pump_on, now - since), 1),
+            'isPumpOn': is_pump_on,
+            'version': version
+        }
+
+    def get(self, plant_id: str):
+        """Returns {'waterLevel', 'isPumpOn', 'version'} for plant_id right now, or None."""
+        entry = self._states.get(plant_id)
+        if entry is None:
+            return None
+        return self._view(entry, self._clock())
+
+    def snapshot(self, plant_ids=None) -> dict:
+        """Returns {plant_id: state} for plant_ids (default: all plants), all at the same instant."""
+        now = self._clock()
+        states = self._states
+        if plant_ids is None:
+            plant_ids = list(states)
+        views = {}
+        for plant_id in plant_ids:
+            entry = states.get(plant_id)
+            if entry is not None:
+                views[plant_id] = self._view(entry, now)
+        return views
+
+    def set_pump(self, plant_id: str, is_pump_on: bool) -> bool:
+        """
+        Switches the pump, re-anchoring the level at the current instant.
+        Returns False if the plant does not exist.
+        """
+        with self._lock:
+            entry = self._states.get(plant_id)
+            if entry is None:
+                return False
+            level, was_on, since, version = entry
+            now = self._clock()
+            self._states[plant_id] = (water_level_at(level, was_on, now - since), bool(is_pump_on), now, version + 1)
+            return True
+
+    def __contains__(self, plant_id):
+        return plant_id in self._states
+
+    def __iter__(self):
+        return iter(list(self._states))
+
+    def __len__(self):
+        return len(self._states)
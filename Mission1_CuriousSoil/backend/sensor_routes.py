@@ -1,6 +1,14 @@
 # sensor_routes.py
+import csv
+import io
+import json
+import math
+import time
+
 from flask import Blueprint, jsonify, request
 
+from timeseries_store import timeseries_store_from_env
+
 sensor_bp = Blueprint("sensor_bp", __name__)
 
 # Example simulated data
@@ -10,6 +18,144 @@ sensor_data = {
     "soil_moisture": 47
 }
 
+# History of every numeric reading (bounded ring buffers with 1 min / 1 h rollups)
+sensor_store = timeseries_store_from_env()
+
+
+# Schema of one reading: known fields with their valid range; any other field must be numeric too.
+READING_SCHEMA = {
+    "fields": {
+        "timestamp": (0.0, float("inf")),     # Epoch seconds (optional, defaults to arrival time; see max_clock_skew)
+        "temperature": (-60.0, 80.0),         # °C
+        "humidity": (0.0, 100.0),             # %
+        "soil_moisture": (0.0, 100.0),        # %
+    },
+    "allow_extra_numeric": True,
+    "max_fields": 32,
+    "max_clock_skew": 300.0,                  # Seconds a timestamp may lie ahead of the server clock
+}
+
+
+def compile_reading_schema(schema: dict):
+    """
+    Turns READING_SCHEMA into a validator function, once, at import time.
+    The validator returns None for a valid reading or an error message.
+    """
+    ranges = dict(schema["fields"])
+    allow_extra = schema["allow_extra_numeric"]
+    max_fields = schema["max_fields"]
+    max_clock_skew = schema["max_clock_skew"]
+    isfinite = math.isfinite
+
+    def validate(item):
+        if type(item) is not dict:
+            return "Reading must be a JSON object."
+        if not item or len(item) > max_fields:
+            return f"Reading must have between 1 and {max_fields} fields."
+        for name, value in item.items():
+            if type(value) not in (int, float) or not isfinite(value):
+                return f"Field '{name}' must be a finite number."
+            bounds = ranges.get(name)
+            if bounds is None:
+                if not allow_extra:
+                    return f"Unknown field '{name}'."
+            elif not bounds[0] <= value <= bounds[1]:
+                return f"Field '{name}' out of range [{bounds[0]}, {bounds[1]}]."
+        # A far-future timestamp would advance the open rollup buckets past every real reading
+        if item.get("timestamp", 0.0) > time.time() + max_clock_skew:
+            return f"Field 'timestamp' is more than {max_clock_skew:g} s ahead of the server clock."
+        return None
+
+    return validate
+
+
+validate_reading = compile_reading_schema(READING_SCHEMA)
+
+
+def parse_readings(body: bytes, content_type: str):
+    """
+    Decodes a bulk body into (readings, errors).
+    Supports a JSON array, NDJSON (one object per line) and CSV with a header row.
+    Items that cannot be decoded are reported as errors and kept as None placeholders.
+    """
+    text = body.decode("utf-8")
+    errors = []
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        readings = []
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                readings.append(json.loads(line))
+            except ValueError as e:
+                errors.append({"index": len(readings), "error": f"Invalid JSON: {e}"})
+                readings.append(None)
+        return readings, errors
+
+    if "csv" in content_type:
+        rows = csv.reader(io.StringIO(text))
+        header = next(rows, None)
+        if not header:
+            raise ValueError("CSV body must start with a header row.")
+        header = [h.strip() for h in header]
+        readings = []
+        for row in rows:
+            if not any(cell.strip() for cell in row):
+                continue
+            try:
+                readings.append({h: float(c) for h, c in zip(header, row) if c.strip() != ""})
+            except ValueError as e:
+                errors.append({"index": len(readings), "error": f"Invalid number: {e}"})
+                readings.append(None)
+        return readings, errors
+
+    data = json.loads(text)
+    if not isinstance(data, list):
+        raise ValueError("JSON body must be an array of readings.")
+    return data, errors
+
+
+def ingest_readings(readings: list, arrival_time: float = None):
+    """
+    Stores many validated readings in one pass: values are grouped per sensor and
+    written with one vectorized ingest per sensor. Returns the number stored.
+    """
+    arrival_time = time.time() if arrival_time is None else arrival_time
+    columns = {}   # sensor -> ([timestamps], [values])
+    latest = {}    # sensor -> (timestamp, value) for sensor_data
+    for item in readings:
+        ts = item.get("timestamp", arrival_time)
+        for name, value in item.items():
+            if name == "timestamp":
+                continue
+            col = columns.get(name)
+            if col is None:
+                col = columns[name] = ([], [])
+            col[0].append(ts)
+            col[1].append(value)
+            if name not in latest or ts >= latest[name][0]:
+                latest[name] = (ts, value)
+
+    for name, (ts, values) in columns.items():
+        try:
+            sensor_store.ingest_many(name, ts, values)
+        except ValueError as e:
+            print(f"[SENSOR] {e}")
+    sensor_data.update({name: value for name, (_, value) in latest.items()})
+    return len(readings)
+
+
+def record_readings(readings: dict, timestamp: float = None):
+    """Stores the numeric fields of one reading (other than 'timestamp') in the time-series store."""
+    timestamp = time.time() if timestamp is None else timestamp
+    for name, value in readings.items():
+        if name != "timestamp" and isinstance(value, (int, float)) and not isinstance(value, bool):
+            try:
+                sensor_store.ingest(name, timestamp, value)
+            except ValueError as e:
+                print(f"[SENSOR] {e}")
+
+
 @sensor_bp.route("/data", methods=["GET"])
 def get_sensor_data():
     return jsonify(sensor_data)
@@ -18,4 +164,68 @@ def get_sensor_data():
 def update_sensor_data():
     new_data = request.json
     sensor_data.update(new_data)
+    record_readings(new_data)
     return jsonify({"message": "Data updated", "new_data": sensor_data})
+
+@sensor_bp.route("/history", methods=["GET"])
+def get_sensor_history():
+    """
+    Range query: /history?sensor=soil_moisture&start=<epoch s>&end=<epoch s>&max_points=500
+    Defaults to the last hour. Served from the finest resolution (raw, 1m, 1h)
+    that covers the window within max_points.
+    """
+    sensor = request.args.get("sensor")
+    if not sensor:
+        return jsonify({"error": "Missing 'sensor' parameter.", "sensors": sensor_store.sensors()}), 400
+    try:
+        end = float(request.args.get("end", time.time()))
+        start = float(request.args.get("start", end - 3600))
+        max_points = int(request.args.get("max_points", 500))
+    except ValueError:
+        return jsonify({"error": "start, end and max_points must be numbers."}), 400
+    if start > end or max_points <= 0:
+        return jsonify({"error": "Expected start <= end and max_points > 0."}), 400
+
+    result = sensor_store.query(sensor, start, end, max_points)
+    if result is None:
+        return jsonify({"error": f"No history for sensor '{sensor}'."}), 404
+
+    resolution, columns = result
+    return jsonify({
+        "sensor": sensor,
+        "resolution": resolution,
+        "start": start,
+        "end": end,
+        "t": columns["t"].tolist(),
+        "min": columns["min"].tolist(),
+        "max": columns["max"].tolist(),
+        "mean": columns["mean"].tolist()
+    })
+
+@sensor_bp.route("/update:batch", methods=["POST"])
+def update_sensor_data_batch():
+    """
+    Bulk ingestion for gateways: a JSON array, NDJSON (application/x-ndjson)
+    or CSV (text/csv, header row) of readings, each like the /update body plus
+    an optional epoch 'timestamp'. Valid readings are stored; invalid ones are
+    reported per item and skipped.
+    """
+    try:
+        readings, errors = parse_readings(request.get_data(), request.content_type or "")
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({"error": f"Could not parse body: {e}"}), 400
+
+    valid = []
+    failed = {err["index"] for err in errors}
+    for i, item in enumerate(readings):
+        if i in failed:
+            continue
+        error = validate_reading(item)
+        if error:
+            errors.append({"index": i, "error": error})
+        else:
+            valid.append(item)
+
+    accepted = ingest_readings(valid)
+    errors.sort(key=lambda err: err["index"])
+    return jsonify({"accepted": accepted, "rejected": len(errors), "errors": errors}), (200 if accepted or not errors else 400)
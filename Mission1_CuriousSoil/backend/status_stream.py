@@ -0,0 +1,202 @@
+# status_stream.py
+"""
+Server-Sent Events fan-out for plant status.
+
+One publisher thread (alive only while someone is subscribed) snapshots the
+plant states once per coalescing window, recomputes recommendations only for
+plants whose state changed, and hands the result to every subscriber. Each
+subscriber keeps at most one pending update per plant (latest wins), so a
+slow client never makes the server buffer more than one frame's worth of data.
+"""
+
+import asyncio
+import json
+import math
+import threading
+import time
+
+
+def _without_nan(value):
+    """Copy of a JSON-like value with NaN / infinite floats replaced by None."""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {k: _without_nan(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_without_nan(v) for v in value]
+    return value
+
+
+def format_sse(data: dict, event: str = None) -> str:
+    """Encodes one SSE frame; NaN / infinite values are sent as null (bare NaN is not JSON)."""
+    frame = f"event: {event}\n" if event else ""
+    try:
+        body = json.dumps(data, separators=(',', ':'), allow_nan=False)
+    except ValueError:
+        body = json.dumps(_without_nan(data), separators=(',', ':'), allow_nan=False)
+    return frame + f"data: {body}\n\n"
+
+
+HEARTBEAT_FRAME = ": heartbeat\n\n"
+
+
+class Subscriber:
+    """One connected client: a coalescing mailbox of plant updates."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._pending = {}  # plant_id -> latest payload
+        self._meta = {}
+        self.closed = False
+        self.dropped_updates = 0  # Updates overwritten before the client read them
+        self.on_change = None     # Optional callback on offer/close (wakes async readers)
+
+    def offer(self, payloads: dict, meta: dict):
+        with self._cond:
+            self.dropped_updates += len(self._pending.keys() & payloads.keys())
+            self._pending.update(payloads)
+            self._meta = meta
+            self._cond.notify()
+        if self.on_change:
+            self.on_change()
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify()
+        if self.on_change:
+            self.on_change()
+
+    def take(self, timeout: float):
+        """Waits up to timeout for updates; returns (payloads, meta) or (None, None)."""
+        with self._cond:
+            if not self._pending and not self.closed:
+                self._cond.wait(timeout)
+            if not self._pending:
+                return None, None
+            payloads, self._pending = self._pending, {}
+            return payloads, self._meta
+
+
+class StatusBroadcaster:
+    """
+    Parameters:
+    - read_states: fn() → {plant_id: state dict}.
+    - build_payloads: fn(plant_ids, states) → ({plant_id: payload}, meta) for the changed plants.
+    - change_key: fn(state) → the part of a state that decides whether it changed
+      (default: the whole state). Continuous fields should be quantized here, or
+      every plant counts as changed in every window.
+    - coalesce_seconds: Minimum spacing between two publications.
+    - heartbeat_seconds: Idle time after which a comment frame keeps the connection alive.
+    - max_subscribers: Connections beyond this are refused.
+    """
+
+    def __init__(self, read_states, build_payloads, change_key=None, coalesce_seconds: float = 1.0,
+                 heartbeat_seconds: float = 15.0, max_subscribers: int = 1000):
+        self.read_states = read_states
+        self.build_payloads = build_payloads
+        self.change_key = change_key or (lambda state: state)
+        self.coalesce_seconds = coalesce_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.max_subscribers = max_subscribers
+
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._publisher = None
+        self._last_keys = {}
+        self._last_payloads = {}
+        self._last_meta = {}
+        self.stats = {"publications": 0, "computed_plants": 0}
+
+    def subscribe(self):
+        """Registers a new client; returns None when max_subscribers is reached."""
+        sub = Subscriber()
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                return None
+            self._subscribers.add(sub)
+            if self._last_payloads:
+                sub.offer(dict(self._last_payloads), self._last_meta)  # Full state first
+            if self._publisher is None:
+                self._publisher = threading.Thread(target=self._run, name="status-publisher", daemon=True)
+                self._publisher.start()
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        sub.close()
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def publish_changes(self):
+        """Computes and fans out updates for plants whose state changed since the last call."""
+        states = self.read_states()
+        keys = {pid: self.change_key(state) for pid, state in states.items()}
+        changed = [pid for pid, key in keys.items() if self._last_keys.get(pid) != key]
+        if not changed:
+            return 0
+        payloads, meta = self.build_payloads(changed, states)
+        with self._lock:
+            self._last_keys.update({pid: keys[pid] for pid in changed})
+            self._last_payloads.update(payloads)
+            self._last_meta = meta
+            subscribers = list(self._subscribers)
+            self.stats["publications"] += 1
+            self.stats["computed_plants"] += len(changed)
+        for sub in subscribers:
+            sub.offer(payloads, meta)
+        return len(changed)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self._publisher = None
+                    return
+            started = time.monotonic()
+            try:
+                self.publish_changes()
+            except Exception as e:
+                print(f"[STREAM] Failed to publish status update: {e}")
+            # Coalescing window: every change within it goes out in one publication
+            time.sleep(max(0.0, self.coalesce_seconds - (time.monotonic() - started)))
+
+    def events(self, sub: Subscriber):
+        """Generator of SSE frames for one subscriber; unsubscribes when the client goes away."""
+        try:
+            yield "retry: 3000\n\n"
+            while not sub.closed:
+                payloads, meta = sub.take(self.heartbeat_seconds)
+                if payloads is None:
+                    yield HEARTBEAT_FRAME
+                    continue
+                yield format_sse(dict(meta, plants=list(payloads.values())), event="status")
+        finally:
+            self.unsubscribe(sub)
+
+    async def aevents(self, sub: Subscriber):
+        """
+        Async twin of events() for the ASGI serving mode: waits on the event loop
+        (woken through sub.on_change) instead of blocking a thread per client.
+        """
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+        sub.on_change = lambda: loop.call_soon_threadsafe(wake.set)
+        try:
+            yield "retry: 3000\n\n"
+            while not sub.closed:
+                wake.clear()  # Before take(), so an offer arriving in between is not missed
+                payloads, meta = sub.take(0)
+                if payloads is not None:
+                    yield format_sse(dict(meta, plants=list(payloads.values())), event="status")
+                    continue
+                try:
+                    await asyncio.wait_for(wake.wait(), self.heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield HEARTBEAT_FRAME
+        finally:
+            sub.on_change = None
+            self.unsubscribe(sub)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._subscribers)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Backend modules import each other by flat name (e.g. `from weather_cache import ...`)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,93 @@
+import asyncio
+
+import httpx
+import pytest
+
+import irrigation_model
+from async_http_client import AsyncHttpClient
+from http_client import CircuitBreaker
+from weather_cache import WeatherCache, make_weather_key
+
+DAY = {"T_max": 30.0, "T_min": 18.0, "RH_max": 80.0, "RH_min": 40.0, "Rs": 22.0, "u2": 2.1}
+URL = "http://upstream.test/v1/forecast"
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def make_client(handler, clock=None):
+    client = AsyncHttpClient(max_retries=0, backoff_base=0.0, deadline=5.0)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    if clock is not None:
+        client.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30.0, clock=clock)
+    return client
+
+
+def half_open(client, clock):
+    client.breaker.record_failure()
+    clock.now += 30.0
+    assert client.breaker.state == "half-open"
+
+
+def test_non_json_body_is_an_upstream_error_and_ends_the_trial():
+    clock = FakeClock()
+    client = make_client(lambda request: httpx.Response(200, text="<html>maintenance</html>"), clock)
+    half_open(client, clock)
+
+    async def scenario():
+        with pytest.raises(httpx.DecodingError):
+            await client.get_json(URL)
+        await client.aclose()
+
+    asyncio.run(scenario())
+    assert client.breaker.state == "closed"  # Not stuck waiting for the trial's outcome
+
+
+def test_cancelled_trial_is_released():
+    clock = FakeClock()
+    calls = []
+
+    async def handler(request):
+        calls.append(request)
+        if len(calls) == 1:
+            await asyncio.sleep(60)
+        return httpx.Response(200, json={"ok": True})
+
+    client = make_client(handler, clock)
+    half_open(client, clock)
+
+    async def scenario():
+        task = asyncio.create_task(client.get_json(URL))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        assert client.breaker.state == "half-open"
+        assert await client.get_json(URL) == {"ok": True}
+        await client.aclose()
+
+    asyncio.run(scenario())
+    assert client.breaker.state == "closed"
+
+
+def test_fetch_weather_async_serves_stale_on_a_non_json_body(monkeypatch):
+    clock = FakeClock()
+    cache = WeatherCache(ttl_seconds=60, clock=clock)
+    cache.put(make_weather_key(36.4, 10.14, "2024-06-01"), dict(DAY))
+    clock.now += 3600  # Expired, still usable as a fallback
+    monkeypatch.setattr(irrigation_model, "WEATHER_CACHE", cache)
+    client = make_client(lambda request: httpx.Response(200, text="not json"))
+    monkeypatch.setattr(irrigation_model, "ASYNC_HTTP_CLIENT", client)
+
+    async def scenario():
+        try:
+            return await irrigation_model.fetch_weather_async(36.4, 10.14, 420, "2024-06-01")
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(scenario()) == DAY
@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+import irrigation_model
+
+WEATHER = {'T_max': 31.0, 'T_min': 18.0, 'RH_max': 80.0, 'RH_min': 35.0, 'Rs': 24.0, 'u2': 2.1}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(irrigation_model, 'fetch_weather', lambda lat, lon, z, date=None: dict(WEATHER))
+    import app
+    return app.app.test_client()
+
+
+@pytest.mark.parametrize('plant_ids', [[{'a': 1}], [1, 2], 'tomato-101'])
+def test_batch_rejects_non_string_plant_ids(client, plant_ids):
+    response = client.post('/api/v1/plants/status:batch', json={'plantIds': plant_ids})
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+@pytest.mark.parametrize('body', [['tomato-101'], 'tomato-101', 42])
+def test_batch_rejects_a_body_that_is_not_an_object(client, body):
+    response = client.post('/api/v1/plants/status:batch', json=body)
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'plantIds must be a list of plant ID strings.'}
+
+
+def test_batch_reports_match_single_plant_reports(client):
+    import app
+    batch = client.post('/api/v1/plants/status:batch', json={}).get_json()
+    assert batch['notFound'] == []
+
+    for plant in batch['plants']:
+        # Same inputs as the batch (water levels drift while pumps run)
+        single = irrigation_model.get_daily_irrigation_recommendation(
+            **app.plant_model_inputs(plant['plantId'], plant['waterLevel']))
+        single.pop('date')
+        assert json.dumps(plant['aiReport'], sort_keys=True) == json.dumps(single, sort_keys=True)
+
+
+def test_incomplete_weather_yields_null_amounts(monkeypatch):
+    partial = dict(WEATHER, RH_max=float('nan'), RH_min=float('nan'))
+    monkeypatch.setattr(irrigation_model, 'fetch_weather', lambda lat, lon, z, date=None: partial)
+    field = {'lat': 36.4, 'lon': 10.14, 'z': 183.0, 'Kc': 1.0, 'soil_moisture_percent': 15.0}
+
+    single = irrigation_model.get_daily_irrigation_recommendation(**field, date='2024-06-01')
+    [batch] = irrigation_model.get_batch_irrigation_recommendations([field], date='2024-06-01')
+
+    for report in (single, batch):
+        assert report['ETc_mm_per_day'] is None
+        assert report['irrigation_needed_mm'] is None
+        json.dumps(report, allow_nan=False)
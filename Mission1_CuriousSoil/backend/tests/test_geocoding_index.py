@@ -0,0 +1,36 @@
+from geocoding_index import GeocodingIndex
+
+SEED = "# name\tlatitude\tlongitude\televation\tcountry\ttimezone\nZaghouan\t36.40291\t10.14292\t183.0\tTunisia\tAfrica/Tunis\n"
+BEJA = {"name": "Béja", "latitude": 36.72564, "longitude": 9.18169, "elevation": 235.0,
+        "country": "Tunisia", "timezone": "Africa/Tunis"}
+
+
+def test_learned_entries_go_to_the_cache_file_not_the_seed(tmp_path):
+    seed = tmp_path / "index.tsv"
+    seed.write_text(SEED, encoding="utf-8")
+    cache = tmp_path / "cache" / "geocoding_cache.tsv"
+
+    index = GeocodingIndex(str(seed), str(cache))
+    index.add(BEJA)
+
+    assert seed.read_text(encoding="utf-8") == SEED
+    assert "Béja" in cache.read_text(encoding="utf-8")
+    assert index.lookup("BEJA")["latitude"] == 36.72564
+
+    # A fresh index (next start) sees both files
+    reloaded = GeocodingIndex(str(seed), str(cache))
+    assert len(reloaded) == 2
+    assert reloaded.lookup("zaghouan")["elevation"] == 183.0
+    assert [e["name"] for e in reloaded.search("b")] == ["Béja"]
+
+
+def test_without_a_cache_path_entries_stay_in_memory(tmp_path):
+    seed = tmp_path / "index.tsv"
+    seed.write_text(SEED, encoding="utf-8")
+
+    index = GeocodingIndex(str(seed), None)
+    index.add(BEJA)
+
+    assert index.lookup("Béja") is not None
+    assert seed.read_text(encoding="utf-8") == SEED
+    assert GeocodingIndex(str(seed), None).lookup("Béja") is None
@@ -0,0 +1,156 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from http_client import CircuitBreaker, CircuitOpenError, HttpClient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class StubUpstream:
+    """
+    Local HTTP server answering GETs from a script of (status, delay_seconds) steps;
+    the last step repeats. 200 answers carry {"ok": true, "n": <request number>}.
+    """
+
+    def __init__(self):
+        self.script = [(200, 0.0)]
+        self.calls = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # Keep-alive, so connection reuse is observable
+
+            def do_GET(self):
+                stub.calls += 1
+                status, delay = stub.script[min(stub.calls, len(stub.script)) - 1]
+                time.sleep(delay)
+                body = json.dumps({'ok': True, 'n': stub.calls}).encode() if status == 200 else b'{}'
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f'http://127.0.0.1:{self.server.server_address[1]}/v1/forecast'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def upstream():
+    stub = StubUpstream()
+    yield stub
+    stub.close()
+
+
+def make_client(**kwargs):
+    options = dict(connect_timeout=1.0, read_timeout=1.0, max_retries=2, backoff_base=0.01,
+                   backoff_max=0.02, deadline=5.0, failure_threshold=2, reset_timeout=30.0)
+    options.update(kwargs)
+    return HttpClient(**options)
+
+
+def test_transient_errors_are_retried_on_a_pooled_connection(upstream):
+    upstream.script = [(503, 0.0), (502, 0.0), (200, 0.0)]
+    client = make_client()
+
+    assert client.get_json(upstream.url) == {'ok': True, 'n': 3}
+    assert client.get_json(upstream.url) == {'ok': True, 'n': 4}
+
+    stats = client.stats
+    assert stats['requests'] == 4
+    assert stats['retries'] == 2
+    assert stats['failures'] == 0
+    assert stats['connections_opened'] == 1
+    assert stats['connections_reused'] == 3
+    assert stats['circuit_state'] == 'closed'
+
+
+def test_client_errors_are_not_retried(upstream):
+    upstream.script = [(404, 0.0)]
+    client = make_client()
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.get_json(upstream.url)
+    assert upstream.calls == 1
+    assert client.stats['circuit_state'] == 'closed'
+
+
+def test_breaker_opens_then_fails_fast_and_a_trial_closes_it(upstream):
+    upstream.script = [(500, 0.0), (500, 0.0), (200, 0.0)]
+    client = make_client(max_retries=0)
+    clock = FakeClock()
+    client.breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30.0, clock=clock)
+
+    for _ in range(2):
+        with pytest.raises(requests.exceptions.HTTPError):
+            client.get_json(upstream.url)
+    with pytest.raises(CircuitOpenError):
+        client.get_json(upstream.url)
+    assert upstream.calls == 2
+    assert client.stats['circuit_rejections'] == 1
+
+    clock.now += 30.0
+    assert client.breaker.state == 'half-open'
+    assert client.get_json(upstream.url) == {'ok': True, 'n': 3}
+    assert client.breaker.state == 'closed'
+
+
+def test_trial_ending_in_an_unexpected_error_is_released(upstream):
+    client = make_client(max_retries=0)
+    clock = FakeClock()
+    client.breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30.0, clock=clock)
+    client.breaker.record_failure()
+    clock.now += 30.0
+
+    def broken_get(*args, **kwargs):
+        raise RuntimeError('decoder bug')
+
+    real_get, client.session.get = client.session.get, broken_get
+    with pytest.raises(RuntimeError):
+        client.get_json(upstream.url)
+
+    # Still half-open, and the next trial is let through
+    client.session.get = real_get
+    assert client.breaker.state == 'half-open'
+    assert client.get_json(upstream.url) == {'ok': True, 'n': 1}
+    assert client.breaker.state == 'closed'
+
+
+def test_slow_upstream_is_cut_off_by_the_deadline(upstream):
+    upstream.script = [(200, 1.0)]
+    client = make_client(read_timeout=0.2, deadline=0.5)
+
+    started = time.monotonic()
+    with pytest.raises(requests.exceptions.Timeout):
+        client.get_json(upstream.url)
+    assert time.monotonic() - started < 0.9
+    assert client.stats['failures'] == 1
+
+
+def test_exhausted_deadline_raises_timeout_without_sending(upstream):
+    client = make_client(deadline=0.0)
+
+    with pytest.raises(requests.exceptions.Timeout):
+        client.get_json(upstream.url)
+    assert upstream.calls == 0
+    assert client.stats['requests'] == 0
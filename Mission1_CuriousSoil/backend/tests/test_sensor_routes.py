@@ -0,0 +1,129 @@
+import json
+import time
+
+import pytest
+from flask import Flask
+
+import sensor_routes
+from timeseries_store import TimeSeriesStore
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(sensor_routes, "sensor_store", TimeSeriesStore())
+    monkeypatch.setattr(sensor_routes, "sensor_data", {})
+    app = Flask(__name__)
+    app.register_blueprint(sensor_routes.sensor_bp)
+    return app.test_client()
+
+
+def readings(n=3):
+    now = time.time()
+    return [{"timestamp": now - 60 * (n - i), "temperature": 20.0 + i, "soil_moisture": 40.0 - i} for i in range(n)]
+
+
+def history(client, sensor):
+    return client.get(f"/history?sensor={sensor}&start={time.time() - 3600}&max_points=10000")
+
+
+def as_csv(rows, header=("timestamp", "temperature", "soil_moisture")):
+    return "\n".join([",".join(header)] + [",".join(str(r.get(h, "")) for h in header) for r in rows])
+
+
+@pytest.mark.parametrize("content_type, encode", [
+    ("application/json", json.dumps),
+    ("application/x-ndjson", lambda rows: "\n".join(json.dumps(r) for r in rows)),
+    ("text/csv", as_csv),
+])
+def test_batch_stores_every_reading(client, content_type, encode):
+    rows = readings()
+    resp = client.post("/update:batch", data=encode(rows), content_type=content_type)
+
+    assert resp.status_code == 200
+    assert resp.get_json() == {"accepted": 3, "rejected": 0, "errors": []}
+    data = history(client, "temperature").get_json()
+    assert data["resolution"] == "raw"
+    assert data["t"] == [r["timestamp"] for r in rows]
+    assert data["mean"] == [20.0, 21.0, 22.0]
+    assert history(client, "timestamp").status_code == 404  # Not a sensor
+    assert client.get("/data").get_json() == {"temperature": 22.0, "soil_moisture": 38.0}  # Latest values
+
+
+def test_json_and_csv_bodies_parse_to_the_same_readings():
+    rows = readings()
+    from_json, _ = sensor_routes.parse_readings(json.dumps(rows).encode(), "application/json")
+    from_csv, _ = sensor_routes.parse_readings(as_csv(rows).encode(), "text/csv; charset=utf-8")
+
+    assert from_csv == from_json
+
+
+def test_mixed_batch_reports_rejected_rows_by_index(client):
+    rows = readings(4)
+    rows[1]["humidity"] = 140.0                      # Out of range
+    rows[3]["temperature"] = "warm"                  # Not a number
+    body = rows[:2] + [17] + rows[2:]                # Index 2 is not an object
+
+    resp = client.post("/update:batch", data=json.dumps(body), content_type="application/json")
+
+    assert resp.status_code == 200
+    result = resp.get_json()
+    assert (result["accepted"], result["rejected"]) == (2, 3)
+    assert [e["index"] for e in result["errors"]] == [1, 2, 4]
+    assert result["errors"][0]["error"] == "Field 'humidity' out of range [0.0, 100.0]."
+    assert result["errors"][1]["error"] == "Reading must be a JSON object."
+    assert result["errors"][2]["error"] == "Field 'temperature' must be a finite number."
+    assert history(client, "temperature").get_json()["mean"] == [20.0, 22.0]
+    assert history(client, "humidity").status_code == 404  # The rejected row stored nothing
+
+
+def test_csv_rows_that_do_not_parse_are_rejected_individually(client):
+    body = "timestamp,temperature,soil_moisture\n" \
+           f"{time.time() - 10},21.5,30\n" \
+           f"{time.time() - 5},n/a,31\n" \
+           "\n" \
+           f"{time.time() + 3600},22,32\n"   # Too far in the future
+
+    resp = client.post("/update:batch", data=body, content_type="text/csv")
+
+    result = resp.get_json()
+    assert (resp.status_code, result["accepted"], result["rejected"]) == (200, 1, 2)
+    assert result["errors"][0]["index"] == 1 and result["errors"][0]["error"].startswith("Invalid number:")
+    assert result["errors"][1] == {"index": 2, "error": "Field 'timestamp' is more than 300 s ahead of the server clock."}
+
+
+def test_ndjson_lines_that_do_not_decode_are_rejected_individually(client):
+    body = json.dumps(readings(1)[0]) + "\n{not json\n\n" + json.dumps({"soil_moisture": 12.0}) + "\n"
+
+    result = client.post("/update:batch", data=body, content_type="application/x-ndjson").get_json()
+
+    assert (result["accepted"], result["rejected"]) == (2, 1)
+    assert result["errors"][0]["index"] == 1 and result["errors"][0]["error"].startswith("Invalid JSON:")
+
+
+def test_batch_with_only_rejected_rows_is_a_400(client):
+    resp = client.post("/update:batch", data=json.dumps([{"humidity": -5}, {}]), content_type="application/json")
+
+    assert resp.status_code == 400
+    assert resp.get_json()["accepted"] == 0 and resp.get_json()["rejected"] == 2
+
+
+@pytest.mark.parametrize("body, content_type", [
+    ('{"temperature": 20}', "application/json"),  # Not an array
+    ("[1, 2", "application/json"),
+    ("", "text/csv"),
+    (b"\xff\xfe", "application/json"),
+])
+def test_unparseable_body_is_a_400(client, body, content_type):
+    resp = client.post("/update:batch", data=body, content_type=content_type)
+
+    assert resp.status_code == 400
+    assert resp.get_json()["error"].startswith("Could not parse body:")
+
+
+def test_single_update_does_not_store_the_timestamp_as_a_sensor(client):
+    resp = client.post("/update", json={"timestamp": time.time() - 30, "soil_moisture": 33.0})
+
+    assert resp.status_code == 200
+    assert history(client, "soil_moisture").get_json()["mean"] == [33.0]
+    assert history(client, "timestamp").status_code == 404
+    assert "timestamp" not in sensor_routes.sensor_store.sensors()
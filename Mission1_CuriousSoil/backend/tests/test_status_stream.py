@@ -0,0 +1,60 @@
+import json
+import math
+
+from plant_state import PlantStateStore
+from status_stream import StatusBroadcaster, format_sse
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_broadcaster(store, change_key=None):
+    built = []
+
+    def build_payloads(plant_ids, states):
+        built.append(list(plant_ids))
+        return {pid: dict(states[pid], plantId=pid) for pid in plant_ids}, {}
+
+    broadcaster = StatusBroadcaster(store.snapshot, build_payloads, change_key=change_key)
+    return broadcaster, built
+
+
+def test_draining_plant_is_republished_only_when_its_level_crosses_a_step():
+    clock = FakeClock()
+    store = PlantStateStore({'tomato-101': {'waterLevel': 75.9, 'isPumpOn': False}}, clock=clock)
+    broadcaster, built = make_broadcaster(
+        store, change_key=lambda s: (math.floor(s['waterLevel']), s['isPumpOn'], s['version']))
+
+    assert broadcaster.publish_changes() == 1
+    for _ in range(7):  # Drains 0.125 %/s: still within the same percent
+        clock.now += 1.0
+        assert broadcaster.publish_changes() == 0
+    clock.now += 2.0
+    assert broadcaster.publish_changes() == 1
+
+    store.set_pump('tomato-101', True)
+    assert broadcaster.publish_changes() == 1
+    assert len(built) == 3
+
+
+def test_without_a_change_key_any_level_drift_is_a_change():
+    clock = FakeClock()
+    store = PlantStateStore({'tomato-101': {'waterLevel': 75.0, 'isPumpOn': False}}, clock=clock)
+    broadcaster, _ = make_broadcaster(store)
+
+    broadcaster.publish_changes()
+    clock.now += 1.0
+    assert broadcaster.publish_changes() == 1
+
+
+def test_format_sse_sends_nan_as_null():
+    frame = format_sse({'plants': [{'ETc_mm_per_day': float('nan'), 'waterLevel': 45.0}]}, event='status')
+
+    assert frame.startswith('event: status\ndata: ')
+    data = json.loads(frame.split('data: ', 1)[1])
+    assert data == {'plants': [{'ETc_mm_per_day': None, 'waterLevel': 45.0}]}
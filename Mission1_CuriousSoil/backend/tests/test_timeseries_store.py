@@ -0,0 +1,47 @@
+import time
+
+import numpy as np
+
+from sensor_routes import validate_reading
+from timeseries_store import SensorSeries
+
+BUDGET = 1024 * 1024
+
+
+def test_late_points_merge_into_their_closed_bucket():
+    series = SensorSeries(BUDGET)
+    series.ingest_one(0.0, 10.0)
+    series.ingest_one(65.0, 20.0)   # Closes the [0, 60) minute
+    series.ingest_one(30.0, 40.0)   # Late: belongs to the closed minute
+    series.ingest(np.array([10.0, 125.0, 50.0]), np.array([2.0, 5.0, 6.0]))  # Out-of-order batch
+
+    minutes = series.query("1m", 0.0, 200.0)
+    assert minutes["t"].tolist() == [0.0, 60.0, 120.0]
+    assert minutes["min"].tolist() == [2.0, 20.0, 5.0]
+    assert minutes["max"].tolist() == [40.0, 20.0, 5.0]
+    assert minutes["mean"][0] == (10.0 + 40.0 + 2.0 + 6.0) / 4
+    assert series.unmerged_late == 0
+
+
+def test_late_points_for_a_bucket_never_held_are_counted():
+    series = SensorSeries(BUDGET)
+    series.ingest_one(0.0, 1.0)
+    series.ingest_one(200.0, 1.0)
+    series.ingest_one(100.0, 1.0)   # The [60, 120) minute has no row
+
+    assert series.unmerged_late == 1
+    assert series.query("1m", 0.0, 300.0)["t"].tolist() == [0.0, 180.0]
+
+
+def test_rollup_sum_keeps_float64_precision():
+    series = SensorSeries(BUDGET)
+    t = np.arange(3600, dtype=np.float64)
+    series.ingest(t, np.full(3600, 1000.1))
+
+    assert abs(series.query("1m", 0.0, 3600.0)["mean"][0] - 1000.1) < 1e-9
+
+
+def test_far_future_timestamps_are_rejected():
+    now = time.time()
+    assert validate_reading({"timestamp": now + 60, "soil_moisture": 40.0}) is None
+    assert "ahead of the server clock" in validate_reading({"timestamp": now + 86400 * 365, "soil_moisture": 40.0})
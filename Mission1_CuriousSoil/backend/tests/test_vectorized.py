@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+
+from irrigation_model import (
+    calculate_ETc,
+    calculate_ETc_vectorized,
+    calculate_irrigation_need,
+    calculate_irrigation_need_vectorized,
+)
+
+N = 2000
+
+
+def random_weather(rng, n=N):
+    """Physically plausible daily inputs (latitudes short of the polar day/night)."""
+    T_max = rng.uniform(5.0, 46.0, n)
+    RH_min = rng.uniform(5.0, 70.0, n)
+    return {
+        'T_max': T_max,
+        'T_min': T_max - rng.uniform(2.0, 20.0, n),
+        'RH_max': np.minimum(RH_min + rng.uniform(5.0, 50.0, n), 100.0),
+        'RH_min': RH_min,
+        'Rs': rng.uniform(2.0, 32.0, n),
+        'u2': rng.uniform(0.0, 8.0, n),
+        'z': rng.uniform(0.0, 2500.0, n),
+        'latitude': rng.uniform(-60.0, 60.0, n),
+        'J': rng.integers(1, 366, n).astype(np.float64),
+        'Kc': rng.uniform(0.2, 1.3, n),
+    }
+
+
+def scalar_ETc(inputs):
+    return np.array([calculate_ETc(**{k: float(v[i]) for k, v in inputs.items()}) for i in range(N)])
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_ETc_vectorized_matches_scalar(seed):
+    inputs = random_weather(np.random.default_rng(seed))
+
+    np.testing.assert_allclose(calculate_ETc_vectorized(**inputs), scalar_ETc(inputs), rtol=1e-12, atol=1e-12)
+
+
+def test_ETc_vectorized_broadcasts_per_field_parameters_over_days():
+    rng = np.random.default_rng(3)
+    days = random_weather(rng, n=30)
+    fields = {'Kc': rng.uniform(0.2, 1.3, (5, 1)), 'latitude': rng.uniform(-60.0, 60.0, (5, 1)), 'z': 120.0}
+    weather = {k: v for k, v in days.items() if k not in fields}
+
+    etc = calculate_ETc_vectorized(**weather, **fields)
+
+    assert etc.shape == (5, 30)
+    for f in range(5):
+        for d in range(30):
+            expected = calculate_ETc(**{k: float(v[d]) for k, v in weather.items()},
+                                     Kc=float(fields['Kc'][f, 0]), latitude=float(fields['latitude'][f, 0]), z=120.0)
+            np.testing.assert_allclose(etc[f, d], expected, rtol=1e-12, atol=1e-12)
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_irrigation_need_vectorized_matches_scalar(seed):
+    rng = np.random.default_rng(seed)
+    wilting_point = rng.uniform(0.05, 0.20, N)
+    inputs = {
+        'soil_moisture_percent': rng.uniform(0.0, 0.5, N),  # Below and above the MAD target
+        'field_capacity': wilting_point + rng.uniform(0.05, 0.30, N),
+        'wilting_point': wilting_point,
+        'root_depth_mm': rng.uniform(100.0, 1500.0, N),
+        'ETc': rng.uniform(0.0, 12.0, N),
+        'MAD': rng.uniform(0.2, 0.8, N),
+    }
+
+    need = calculate_irrigation_need_vectorized(**inputs)
+    expected = np.array([calculate_irrigation_need(**{k: float(v[i]) for k, v in inputs.items()}) for i in range(N)])
+
+    assert (need == 0).any() and (need > 0).any()
+    np.testing.assert_allclose(np.round(need, 2), expected, rtol=0, atol=1e-9)  # The scalar one rounds to 0.01 mm
+
+
+def test_irrigation_need_vectorized_uses_the_default_MAD():
+    args = (0.12, 0.30, 0.10, 600.0, np.array([0.0, 2.0, 50.0]))
+    expected = [calculate_irrigation_need(*args[:4], float(etc)) for etc in args[4]]
+
+    np.testing.assert_allclose(np.round(calculate_irrigation_need_vectorized(*args), 2), expected, rtol=0, atol=1e-9)
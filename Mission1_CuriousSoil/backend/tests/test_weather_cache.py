@@ -0,0 +1,211 @@
+import asyncio
+import threading
+import time
+
+import pytest
+import requests
+
+import irrigation_model
+import weather_cache
+from weather_cache import WeatherCache, make_weather_key
+
+DAY = {"T_max": 30.0, "T_min": 18.0, "RH_max": 80.0, "RH_min": 40.0, "Rs": 22.0, "u2": 2.1}
+KEY = make_weather_key(36.4, 10.14, "2024-06-01")
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class CountingFetcher:
+    """Stub upstream: counts calls, optionally blocks until released, or fails."""
+
+    def __init__(self, value=DAY, error=None, block=False):
+        self.value = value
+        self.error = error
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        if not block:
+            self.release.set()
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+        if self.error is not None:
+            raise self.error
+        return dict(self.value)
+
+
+def run_concurrently(cache, fetcher, n=16):
+    results, errors = [], []
+
+    def worker():
+        try:
+            results.append(cache.get_or_fetch(KEY, fetcher))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(n)]
+    for t in threads:
+        t.start()
+    fetcher.started.wait(5)
+    fetcher.release.set()
+    for t in threads:
+        t.join(5)
+    return results, errors
+
+
+def test_concurrent_misses_share_one_upstream_call():
+    cache = WeatherCache()
+    fetcher = CountingFetcher(block=True)
+
+    results, errors = run_concurrently(cache, fetcher)
+
+    assert errors == []
+    assert fetcher.calls == 1
+    assert results == [DAY] * 16
+    assert cache.stats["upstream_calls"] == 1
+
+
+def test_concurrent_misses_share_the_upstream_error():
+    cache = WeatherCache()
+    fetcher = CountingFetcher(error=requests.exceptions.ConnectionError("down"), block=True)
+
+    results, errors = run_concurrently(cache, fetcher)
+
+    assert results == []
+    assert len(errors) == 16 and all(isinstance(e, requests.exceptions.ConnectionError) for e in errors)
+    assert fetcher.calls == 1
+    # The failed flight is cleared, so the next miss retries upstream
+    assert cache.get_or_fetch(KEY, CountingFetcher()) == DAY
+
+
+def test_ttl_expiry_refetches():
+    clock = FakeClock()
+    cache = WeatherCache(ttl_seconds=60, clock=clock)
+    fetcher = CountingFetcher()
+
+    cache.get_or_fetch(KEY, fetcher)
+    clock.now += 59
+    cache.get_or_fetch(KEY, fetcher)
+    assert fetcher.calls == 1
+
+    clock.now += 1
+    cache.get_or_fetch(KEY, fetcher)
+    assert fetcher.calls == 2
+
+
+def test_async_fetch_writes_the_disk_store_off_the_event_loop(tmp_path, monkeypatch):
+    path = str(tmp_path / "weather.sqlite")
+    cache = WeatherCache(disk_path=path)
+    write_threads = []
+    real_put = weather_cache._DiskStore.put
+
+    def slow_put(self, key, expires_at, value):
+        write_threads.append(threading.get_ident())
+        time.sleep(0.2)  # A slow disk
+        real_put(self, key, expires_at, value)
+
+    monkeypatch.setattr(weather_cache._DiskStore, "put", slow_put)
+
+    async def fetch():
+        return dict(DAY)
+
+    async def scenario():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticking = asyncio.create_task(ticker())
+        results = await asyncio.gather(*(cache.get_or_fetch_async(KEY, fetch) for _ in range(4)))
+        ticking.cancel()
+        return results, ticks
+
+    loop_thread = threading.get_ident()
+    results, ticks = asyncio.run(scenario())
+
+    assert results == [DAY] * 4
+    assert len(write_threads) == 1 and write_threads[0] != loop_thread
+    assert ticks >= 5  # The loop kept running while the row was written
+    assert cache.stats["upstream_calls"] == 1
+    assert WeatherCache(disk_path=path).get(KEY) == DAY  # Persisted before the waiters were released
+
+
+@pytest.fixture
+def model_cache(monkeypatch):
+    clock = FakeClock()
+    cache = WeatherCache(ttl_seconds=60, clock=clock)
+    monkeypatch.setattr(irrigation_model, "WEATHER_CACHE", cache)
+    return clock
+
+
+def test_fetch_weather_serves_stale_when_upstream_fails(model_cache, monkeypatch):
+    fetcher = CountingFetcher()
+    monkeypatch.setattr(irrigation_model, "_fetch_weather_upstream", lambda lat, lon, date: fetcher())
+    assert irrigation_model.fetch_weather(36.4, 10.14, 420, "2024-06-01") == DAY
+
+    model_cache.now += 3600  # Entry expired
+    fetcher.error = requests.exceptions.ConnectionError("down")
+    assert irrigation_model.fetch_weather(36.4, 10.14, 420, "2024-06-01") == DAY
+    assert fetcher.calls == 2
+
+
+def test_fetch_weather_raises_without_stale_entry(model_cache, monkeypatch):
+    def failing(lat, lon, date):
+        raise requests.exceptions.Timeout("slow")
+
+    monkeypatch.setattr(irrigation_model, "_fetch_weather_upstream", failing)
+    with pytest.raises(requests.exceptions.Timeout):
+        irrigation_model.fetch_weather(36.4, 10.14, 420, "2024-06-01")
+
+
+def range_response(t_max):
+    """Open-Meteo shaped response for 2024-06-01 onwards, one day per t_max value (None = missing)."""
+    n = len(t_max)
+    return {
+        "daily": {
+            "time": [f"2024-06-0{i + 1}" for i in range(n)],
+            "temperature_2m_max": t_max,
+            "temperature_2m_min": [18.0] * n,
+            "shortwave_radiation_sum": [22.0] * n,
+            "wind_speed_10m_max": [8.0] * n,
+        },
+        "hourly": {"relative_humidity_2m": [40.0, 80.0] * n},
+    }
+
+
+def test_days_with_missing_values_are_masked_and_not_cached(model_cache, monkeypatch):
+    response = range_response([30.0, None, 31.0])
+    monkeypatch.setattr(irrigation_model, "_fetch_weather_range_upstream",
+                        lambda lat, lon, start, end, url: irrigation_model._parse_weather_range(response, start))
+
+    weather = irrigation_model.fetch_weather_range(36.4, 10.14, "2024-06-01", "2024-06-03", archive=True)
+
+    assert weather["valid"].tolist() == [True, False, True]
+    assert weather["T_max"][0] == 30.0
+    etc = irrigation_model.calculate_ETc_range(weather, z=183.0, latitude=36.4, Kc=1.0)
+    assert (etc[weather["valid"]] > 0).all()
+    assert irrigation_model.WEATHER_CACHE.get(make_weather_key(36.4, 10.14, "2024-06-02")) is None
+
+
+def test_single_day_with_missing_values_falls_back_to_stale(model_cache, monkeypatch):
+    response = range_response([None])
+    monkeypatch.setattr(irrigation_model, "_fetch_weather_range_upstream",
+                        lambda lat, lon, start, end, url: irrigation_model._parse_weather_range(response, start))
+
+    with pytest.raises(irrigation_model.MissingWeatherError):
+        irrigation_model.fetch_weather(36.4, 10.14, 420, "2024-06-01")
+
+    irrigation_model.WEATHER_CACHE.put(KEY, DAY)
+    model_cache.now += 3600  # Expired, still usable as a fallback
+    assert irrigation_model.fetch_weather(36.4, 10.14, 420, "2024-06-01") == DAY
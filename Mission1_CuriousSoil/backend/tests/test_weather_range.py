@@ -0,0 +1,125 @@
+import datetime
+import math
+
+import numpy as np
+import pytest
+
+import irrigation_model
+from weather_cache import WeatherCache, make_weather_key
+
+LAT, LON = 36.4, 10.14
+
+
+class StubUpstream:
+    """Stands in for HTTP_CLIENT: answers Open-Meteo daily/hourly requests and records them."""
+
+    def __init__(self, missing=(), missing_in_retry=True):
+        self.missing = set(missing)  # Dates returned with a null temperature
+        self.missing_in_retry = missing_in_retry
+        self.calls = []
+
+    def get_json(self, url, params=None):
+        self.calls.append((url, params))
+        start = datetime.date.fromisoformat(params["start_date"])
+        end = datetime.date.fromisoformat(params["end_date"])
+        dates = [(start + datetime.timedelta(days=i)).isoformat() for i in range((end - start).days + 1)]
+        single_day = len(dates) == 1 and len(self.calls) > 1
+        missing = self.missing if self.missing_in_retry or not single_day else set()
+        return {
+            "daily": {
+                "time": dates,
+                "temperature_2m_max": [None if d in missing else 25.0 + i for i, d in enumerate(dates)],
+                "temperature_2m_min": [15.0] * len(dates),
+                "shortwave_radiation_sum": [20.0] * len(dates),
+                "wind_speed_10m_max": [10.0] * len(dates),
+            },
+            "hourly": {
+                "time": [f"{d}T{h:02d}:00" for d in dates for h in range(24)],
+                "relative_humidity_2m": [30.0 + 2 * h for _ in dates for h in range(24)],
+            },
+        }
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    monkeypatch.setattr(irrigation_model, "WEATHER_CACHE", WeatherCache(ttl_seconds=3600))
+    stub = StubUpstream()
+    monkeypatch.setattr(irrigation_model, "HTTP_CLIENT", stub)
+    return stub
+
+
+def days_from_today(n):
+    return (datetime.date.today() + datetime.timedelta(days=n)).isoformat()
+
+
+def test_archive_range_is_one_request_to_the_archive_api(upstream):
+    weather = irrigation_model.fetch_weather_range(LAT, LON, "2023-02-27", "2023-03-02", archive=True)
+
+    assert len(upstream.calls) == 1
+    url, params = upstream.calls[0]
+    assert url == irrigation_model.ARCHIVE_URL
+    assert params == irrigation_model._weather_params(LAT, LON, "2023-02-27", "2023-03-02")
+    assert weather["date"] == ["2023-02-27", "2023-02-28", "2023-03-01", "2023-03-02"]
+    assert weather["J"].tolist() == [58.0, 59.0, 60.0, 61.0]
+    assert weather["valid"].tolist() == [True] * 4
+    assert weather["T_max"].tolist() == [25.0, 26.0, 27.0, 28.0]
+    assert weather["RH_max"].tolist() == [76.0] * 4 and weather["RH_min"].tolist() == [30.0] * 4
+    assert weather["u2"][0] == pytest.approx(10.0 * 4.87 / math.log(67.8 * 10 - 5.42))
+    for name in irrigation_model.WEATHER_VARIABLES:
+        assert weather[name].dtype == np.float64 and weather[name].shape == (4,)
+
+
+def test_forecast_range_uses_the_forecast_api(upstream):
+    start, end = days_from_today(0), days_from_today(2)
+    weather = irrigation_model.fetch_weather_range(LAT, LON, start, end)
+
+    assert [url for url, _ in upstream.calls] == [irrigation_model.FORECAST_URL]
+    assert (upstream.calls[0][1]["start_date"], upstream.calls[0][1]["end_date"]) == (start, end)
+    assert weather["valid"].all()
+
+
+def test_cached_window_needs_no_request_and_a_partial_one_refetches_the_range(upstream):
+    irrigation_model.fetch_weather_range(LAT, LON, "2023-06-01", "2023-06-03", archive=True)
+    weather = irrigation_model.fetch_weather_range(LAT, LON, "2023-06-01", "2023-06-03", archive=True)
+    assert len(upstream.calls) == 1
+    assert weather["T_max"].tolist() == [25.0, 26.0, 27.0]
+
+    irrigation_model.fetch_weather_range(LAT, LON, "2023-06-02", "2023-06-05", archive=True)
+    assert len(upstream.calls) == 2
+    assert (upstream.calls[1][1]["start_date"], upstream.calls[1][1]["end_date"]) == ("2023-06-02", "2023-06-05")
+
+
+def test_valid_mask_in_archive_mode_skips_incomplete_days(upstream):
+    upstream.missing = {"2023-06-02"}
+    weather = irrigation_model.fetch_weather_range(LAT, LON, "2023-06-01", "2023-06-03", archive=True)
+
+    assert len(upstream.calls) == 1  # The archive is not retried day by day
+    assert weather["valid"].tolist() == [True, False, True]
+    assert all(math.isnan(weather[name][1]) for name in irrigation_model.WEATHER_VARIABLES)
+    etc = irrigation_model.calculate_ETc_range(weather, z=10.0, latitude=LAT, Kc=1.0)
+    assert np.isnan(etc[1]) and np.isfinite(etc[[0, 2]]).all()
+    assert irrigation_model.WEATHER_CACHE.get(make_weather_key(LAT, LON, "2023-06-02")) is None
+
+
+@pytest.mark.parametrize("retry_complete", [False, True])
+def test_incomplete_forecast_day_is_retried_alone(upstream, retry_complete):
+    dates = [days_from_today(i) for i in range(3)]
+    upstream.missing = {dates[1]}
+    upstream.missing_in_retry = not retry_complete
+
+    weather = irrigation_model.fetch_weather_range(LAT, LON, dates[0], dates[2])
+
+    assert [(p["start_date"], p["end_date"]) for _, p in upstream.calls] == [(dates[0], dates[2]), (dates[1], dates[1])]
+    assert weather["valid"].tolist() == [True, retry_complete, True]
+    assert np.isnan(weather["T_max"][1]) != retry_complete
+
+
+def test_window_is_checked_before_any_request(upstream):
+    with pytest.raises(ValueError, match="before start_date"):
+        irrigation_model.fetch_weather_range(LAT, LON, "2023-06-03", "2023-06-01", archive=True)
+    beyond = days_from_today(irrigation_model.FORECAST_HORIZON_DAYS)
+    with pytest.raises(ValueError, match="forecast horizon"):
+        irrigation_model.fetch_weather_range(LAT, LON, days_from_today(0), beyond)
+
+    irrigation_model.fetch_weather_range(LAT, LON, days_from_today(0), beyond, archive=True)  # No horizon for the archive
+    assert len(upstream.calls) == 1
@@ -0,0 +1,292 @@
+# timeseries_store.py
+"""
+Bounded in-process time-series store for sensor readings.
+
+Every sensor owns preallocated NumPy ring buffers: raw points plus min/max/mean
+rollups at 1-minute and 1-hour resolution, updated incrementally on ingest.
+Memory is fixed up front by the configured cap, so continuous ingestion never
+grows the process.
+
+Readings older than the bucket being filled are merged into their closed
+bucket when it is still held; otherwise they only reach the raw ring and are
+counted in SensorSeries.unmerged_late.
+"""
+
+import os
+import threading
+
+import numpy as np
+
+# (name, bucket width in seconds); 0 means raw points
+RESOLUTIONS = (("raw", 0), ("1m", 60), ("1h", 3600))
+
+# Share of each sensor's memory budget given to each resolution
+RESOLUTION_BUDGET = {"raw": 0.5, "1m": 0.3, "1h": 0.2}
+
+RAW_ROW_BYTES = 8 + 4             # timestamp (float64) + value (float32)
+ROLLUP_ROW_BYTES = 8 + 4 * 2 + 8 + 4  # bucket start + min/max (float32) + sum (float64) + count (int32)
+ROLLUP_FIELDS = ("t", "min", "max", "sum", "count")
+
+
+class _Ring:
+    """Fixed-capacity columnar ring buffer, oldest rows overwritten first."""
+
+    def __init__(self, capacity: int, columns: dict):
+        self.capacity = max(1, capacity)
+        self.cols = {name: np.zeros(self.capacity, dtype=dtype) for name, dtype in columns.items()}
+        self.head = 0   # Next write position
+        self.size = 0
+
+    def append(self, rows: dict):
+        """Appends equal-length column arrays (keeps only the newest `capacity` rows)."""
+        n = len(rows["t"])
+        if n == 0:
+            return
+        if n > self.capacity:
+            rows = {k: v[-self.capacity:] for k, v in rows.items()}
+            n = self.capacity
+        first = min(n, self.capacity - self.head)
+        for name, col in self.cols.items():
+            col[self.head:self.head + first] = rows[name][:first]
+            col[:n - first] = rows[name][first:]
+        self.head = (self.head + n) % self.capacity
+        self.size = min(self.capacity, self.size + n)
+
+    def ordered(self) -> dict:
+        """Returns the rows oldest → newest (copies)."""
+        start = (self.head - self.size) % self.capacity
+        idx = (start + np.arange(self.size)) % self.capacity
+        return {name: col[idx] for name, col in self.cols.items()}
+
+    def append_one(self, row: tuple):
+        """Appends a single row (values in column order)."""
+        for col, value in zip(self.cols.values(), row):
+            col[self.head] = value
+        self.head = (self.head + 1) % self.capacity
+        self.size = min(self.capacity, self.size + 1)
+
+    def index_of(self, t: float):
+        """Physical index of the row at time t (rows being sorted by t), or None."""
+        start = (self.head - self.size) % self.capacity
+        col = self.cols["t"]
+        lo, hi = 0, self.size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if col[(start + mid) % self.capacity] < t:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.size and col[(start + lo) % self.capacity] == t:
+            return (start + lo) % self.capacity
+        return None
+
+    def oldest_t(self):
+        if self.size == 0:
+            return None
+        return float(self.cols["t"][(self.head - self.size) % self.capacity])
+
+
+class SensorSeries:
+    """Raw ring plus incrementally maintained rollup rings for one sensor."""
+
+    def __init__(self, budget_bytes: int):
+        self._lock = threading.Lock()
+        self.raw = _Ring(int(budget_bytes * RESOLUTION_BUDGET["raw"]) // RAW_ROW_BYTES,
+                         {"t": np.float64, "value": np.float32})
+        self.rollups = {}
+        self.open = {}  # resolution -> [bucket_start, min, max, sum, count] still being filled
+        self.unmerged_late = 0  # Late rollup contributions whose bucket is no longer held
+        for name, width in RESOLUTIONS:
+            if width:
+                self.rollups[name] = _Ring(
+                    int(budget_bytes * RESOLUTION_BUDGET[name]) // ROLLUP_ROW_BYTES,
+                    {"t": np.float64, "min": np.float32, "max": np.float32, "sum": np.float64, "count": np.int32}
+                )
+
+    def ingest(self, t: np.ndarray, values: np.ndarray):
+        """Ingests timestamp/value arrays (sorted here if needed)."""
+        t = np.asarray(t, dtype=np.float64)
+        values = np.asarray(values, dtype=np.float64)
+        if len(t) == 0:
+            return
+        if len(t) > 1 and np.any(np.diff(t) < 0):
+            order = np.argsort(t, kind="stable")
+            t, values = t[order], values[order]
+
+        with self._lock:
+            self.raw.append({"t": t, "value": values})
+            for name, width in RESOLUTIONS:
+                if width:
+                    self._roll(name, width, t, values)
+
+    def ingest_one(self, t: float, value: float):
+        """Scalar fast path for a single reading (no temporary arrays)."""
+        with self._lock:
+            self.raw.append_one((t, value))
+            for name, width in RESOLUTIONS:
+                if not width:
+                    continue
+                bucket = (t // width) * width
+                open_bucket = self.open.get(name)
+                if open_bucket is not None and bucket == open_bucket[0]:
+                    open_bucket[1] = min(open_bucket[1], value)
+                    open_bucket[2] = max(open_bucket[2], value)
+                    open_bucket[3] += value
+                    open_bucket[4] += 1
+                elif open_bucket is None or bucket > open_bucket[0]:
+                    if open_bucket is not None:
+                        self.rollups[name].append_one(open_bucket)
+                    self.open[name] = [bucket, value, value, value, 1]
+                else:
+                    self._merge_late(name, bucket, value, value, value, 1)
+
+    def _merge_late(self, name: str, bucket: float, b_min: float, b_max: float, b_sum: float, b_count: int):
+        """Folds a late group of points into its closed bucket, if that bucket is still held."""
+        ring = self.rollups[name]
+        i = ring.index_of(bucket)
+        if i is None:
+            # Evicted, or no point ever landed in that bucket (rows cannot be inserted mid-ring)
+            self.unmerged_late += b_count
+            return
+        cols = ring.cols
+        cols["min"][i] = min(cols["min"][i], b_min)
+        cols["max"][i] = max(cols["max"][i], b_max)
+        cols["sum"][i] += b_sum
+        cols["count"][i] += b_count
+
+    def _roll(self, name: str, width: int, t: np.ndarray, values: np.ndarray):
+        open_bucket = self.open.get(name)
+        if open_bucket is not None and t[0] < open_bucket[0]:
+            # Points older than the bucket being filled go to their closed buckets
+            n_late = int(np.searchsorted(t, open_bucket[0]))
+            for late in zip(*self._group(t[:n_late], values[:n_late], width)):
+                self._merge_late(name, *late)
+            t, values = t[n_late:], values[n_late:]
+            if len(t) == 0:
+                return
+
+        b_t, b_min, b_max, b_sum, b_count = self._group(t, values, width)
+
+        if open_bucket is not None and b_t[0] == open_bucket[0]:
+            # First group continues the open bucket
+            b_min[0] = min(b_min[0], open_bucket[1])
+            b_max[0] = max(b_max[0], open_bucket[2])
+            b_sum[0] += open_bucket[3]
+            b_count[0] += open_bucket[4]
+        elif open_bucket is not None:
+            self.rollups[name].append({k: np.array([v]) for k, v in zip(ROLLUP_FIELDS, open_bucket)})
+
+        # Every group but the last is complete; the last stays open
+        self.rollups[name].append({"t": b_t[:-1], "min": b_min[:-1], "max": b_max[:-1], "sum": b_sum[:-1], "count": b_count[:-1]})
+        self.open[name] = [float(b_t[-1]), float(b_min[-1]), float(b_max[-1]), float(b_sum[-1]), int(b_count[-1])]
+
+    @staticmethod
+    def _group(t: np.ndarray, values: np.ndarray, width: int):
+        """(bucket start, min, max, sum, count) arrays of sorted points, one entry per bucket."""
+        buckets = np.floor(t / width) * width
+        starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+        return (buckets[starts], np.minimum.reduceat(values, starts), np.maximum.reduceat(values, starts),
+                np.add.reduceat(values, starts), np.diff(np.r_[starts, len(values)]))
+
+    def covers(self, resolution: str, start: float) -> bool:
+        """True if resolution still holds everything recorded since start (nothing evicted yet)."""
+        with self._lock:
+            ring = self.raw if resolution == "raw" else self.rollups[resolution]
+            oldest = ring.oldest_t()
+            return ring.size < ring.capacity or oldest is None or oldest <= start
+
+    def query(self, resolution: str, start: float, end: float) -> dict:
+        """Returns columnar {t, min, max, mean} for rows with start <= t <= end."""
+        with self._lock:
+            if resolution == "raw":
+                rows = self.raw.ordered()
+                sel = (rows["t"] >= start) & (rows["t"] <= end)
+                v = rows["value"][sel]
+                return {"t": rows["t"][sel], "min": v, "max": v, "mean": v}
+
+            rows = self.rollups[resolution].ordered()
+            open_bucket = self.open.get(resolution)
+            if open_bucket is not None:
+                rows = {k: np.r_[rows[k], open_bucket[i]] for i, k in enumerate(ROLLUP_FIELDS)}
+        width = dict(RESOLUTIONS)[resolution]
+        sel = (rows["t"] + width > start) & (rows["t"] <= end)
+        return {
+            "t": rows["t"][sel],
+            "min": rows["min"][sel],
+            "max": rows["max"][sel],
+            "mean": rows["sum"][sel] / np.maximum(rows["count"][sel], 1),
+        }
+
+
+class TimeSeriesStore:
+    """
+    Per-sensor series under one global memory cap.
+
+    Parameters:
+    - memory_cap_bytes: Total preallocated budget, split evenly across max_sensors.
+    - max_sensors: How many distinct sensor names may be stored; others are rejected.
+    """
+
+    def __init__(self, memory_cap_bytes: int = 64 * 1024 * 1024, max_sensors: int = 32):
+        self.memory_cap_bytes = memory_cap_bytes
+        self.max_sensors = max_sensors
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def _get_series(self, sensor: str, create: bool):
+        series = self._series.get(sensor)
+        if series is None and create:
+            with self._lock:
+                series = self._series.get(sensor)
+                if series is None:
+                    if len(self._series) >= self.max_sensors:
+                        raise ValueError(f"Sensor limit reached ({self.max_sensors}); '{sensor}' not stored.")
+                    series = self._series[sensor] = SensorSeries(self.memory_cap_bytes // self.max_sensors)
+        return series
+
+    def ingest(self, sensor: str, t: float, value: float):
+        self._get_series(sensor, create=True).ingest_one(float(t), float(value))
+
+    def ingest_many(self, sensor: str, t, values):
+        """Ingests many readings of one sensor in a single vectorized pass."""
+        self._get_series(sensor, create=True).ingest(t, values)
+
+    def sensors(self) -> list:
+        return sorted(self._series)
+
+    def query(self, sensor: str, start: float, end: float, max_points: int = 500):
+        """
+        Returns (resolution, columns) for [start, end], or None for an unknown sensor.
+
+        Uses the finest resolution that still covers the window and returns at most
+        max_points rows, stepping up to coarser rollups otherwise.
+        """
+        series = self._get_series(sensor, create=False)
+        if series is None:
+            return None
+        coarsest = RESOLUTIONS[-1][0]
+        for name, width in RESOLUTIONS:
+            if name != coarsest:
+                if not series.covers(name, start):
+                    continue  # This resolution no longer reaches back to start
+                if width and (end - start) / width > max_points:
+                    continue  # Certainly too many buckets
+            columns = series.query(name, start, end)
+            if name == coarsest or len(columns["t"]) <= max_points:
+                return name, {k: v[-max_points:] for k, v in columns.items()}
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the preallocated ring buffers."""
+        total = 0
+        for series in list(self._series.values()):
+            for ring in [series.raw, *series.rollups.values()]:
+                total += sum(col.nbytes for col in ring.cols.values())
+        return total
+
+
+def timeseries_store_from_env() -> TimeSeriesStore:
+    """Builds the store from SENSOR_STORE_MEMORY_MB and SENSOR_STORE_MAX_SENSORS."""
+    return TimeSeriesStore(
+        memory_cap_bytes=int(float(os.environ.get("SENSOR_STORE_MEMORY_MB", 64)) * 1024 * 1024),
+        max_sensors=int(os.environ.get("SENSOR_STORE_MAX_SENSORS", 32))
+    )
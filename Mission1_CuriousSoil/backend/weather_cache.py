@@ -0,0 +1,236 @@
+# weather_cache.py
+"""
+In-process cache for daily Open-Meteo weather, keyed by rounded coordinates and date.
+
+The daily weather for one (lat, lon, date) does not change between two dashboard
+polls, so the model only needs to ask Open-Meteo once per key per TTL window.
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Coordinates are rounded to 2 decimals (~1 km) before keying the cache.
+COORD_PRECISION = 2
+DEFAULT_TTL_SECONDS = 3 * 3600
+DEFAULT_MAX_ENTRIES = 1024
+
+
+def make_weather_key(lat: float, lon: float, date: str) -> tuple:
+    """Builds the cache key for one location and one ISO date."""
+    return (round(float(lat), COORD_PRECISION), round(float(lon), COORD_PRECISION), date)
+
+
+class _Flight:
+    """One in-progress upstream call that other threads can wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class _DiskStore:
+    """Small SQLite table backing the cache so a restart does not go cold."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS weather ("
+            " lat REAL, lon REAL, date TEXT, expires_at REAL, payload TEXT,"
+            " PRIMARY KEY (lat, lon, date))"
+        )
+        self._conn.commit()
+
+    def load(self, now: float):
+        """Returns all non-expired (key, expires_at, value) rows."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT lat, lon, date, expires_at, payload FROM weather WHERE expires_at > ?"
+                " ORDER BY expires_at", (now,)
+            ).fetchall()
+        return [((lat, lon, date), expires_at, json.loads(payload)) for lat, lon, date, expires_at, payload in rows]
+
+    def put(self, key: tuple, expires_at: float, value: dict):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO weather (lat, lon, date, expires_at, payload) VALUES (?, ?, ?, ?, ?)",
+                (key[0], key[1], key[2], expires_at, json.dumps(value))
+            )
+            self._conn.commit()
+
+    def purge(self, now: float):
+        with self._lock:
+            self._conn.execute("DELETE FROM weather WHERE expires_at <= ?", (now,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class WeatherCache:
+    """
+    TTL + LRU cache with a single-flight guard and an optional on-disk store.
+
+    Parameters:
+    - ttl_seconds: How long a fetched day stays fresh.
+    - max_entries: LRU bound on the number of in-memory keys.
+    - disk_path: Optional SQLite file used to persist entries across restarts.
+    """
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES,
+                 disk_path: str = None,
+                 clock=time.time):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()   # key -> (expires_at, value)
+        self._flights = {}              # key -> _Flight
+        self._async_flights = {}        # key -> asyncio.Future (ASGI mode, one event loop)
+        self.stats = {"hits": 0, "misses": 0, "upstream_calls": 0}
+
+        self._disk = _DiskStore(disk_path) if disk_path else None
+        if self._disk:
+            for key, expires_at, value in self._disk.load(self._clock()):
+                self._entries[key] = (expires_at, value)
+            self._evict()
+
+    def _evict(self):
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: tuple, allow_stale: bool = False):
+        """Returns the cached value for key, or None if missing (or expired, unless allow_stale)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock() and not allow_stale:
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: tuple, value: dict):
+        """Stores value under key with a fresh TTL."""
+        expires_at = self._clock() + self.ttl_seconds
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            self._evict()
+        if self._disk:
+            self._disk.put(key, expires_at, value)
+
+    def get_or_fetch(self, key: tuple, fetch):
+        """
+        Returns the fresh cached value for key, calling fetch() on a miss.
+
+        Concurrent misses for the same key share one fetch() call: the first
+        caller runs it and the others wait for its result (or its exception).
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self._clock():
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[1]
+            self.stats["misses"] += 1
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            with self._lock:
+                self.stats["upstream_calls"] += 1
+            flight.value = fetch()
+            self.put(key, flight.value)
+            return flight.value
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    async def get_or_fetch_async(self, key: tuple, fetch):
+        """
+        Async twin of get_or_fetch: fetch is a coroutine function, and concurrent
+        misses on the event loop await one shared fetch() instead of blocking a thread.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > self._clock():
+                self._entries.move_to_end(key)
+                self.stats["hits"] += 1
+                return entry[1]
+            self.stats["misses"] += 1
+
+        flight = self._async_flights.get(key)
+        if flight is not None:
+            return await asyncio.shield(flight)
+
+        flight = self._async_flights[key] = asyncio.get_running_loop().create_future()
+        try:
+            with self._lock:
+                self.stats["upstream_calls"] += 1
+            value = await fetch()
+            if self._disk:
+                await asyncio.to_thread(self.put, key, value)  # SQLite INSERT + commit off the event loop
+            else:
+                self.put(key, value)
+            flight.set_result(value)
+            return value
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except Exception as e:
+            flight.set_exception(e)
+            flight.exception()  # Mark retrieved so lone failures are not logged as unhandled
+            raise
+        finally:
+            self._async_flights.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def purge_expired(self):
+        """Drops expired entries from memory and from the disk store."""
+        now = self._clock()
+        with self._lock:
+            for key in [k for k, (expires_at, _) in self._entries.items() if expires_at <= now]:
+                del self._entries[key]
+        if self._disk:
+            self._disk.purge(now)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def weather_cache_from_env() -> WeatherCache:
+    """
+    Builds the model's shared cache from environment variables:
+    WEATHER_CACHE_TTL (seconds), WEATHER_CACHE_SIZE (entries), WEATHER_CACHE_PATH (SQLite file).
+    """
+    return WeatherCache(
+        ttl_seconds=float(os.environ.get("WEATHER_CACHE_TTL", DEFAULT_TTL_SECONDS)),
+        max_entries=int(os.environ.get("WEATHER_CACHE_SIZE", DEFAULT_MAX_ENTRIES)),
+        disk_path=os.environ.get("WEATHER_CACHE_PATH") or None
+    )
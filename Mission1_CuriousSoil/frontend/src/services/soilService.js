@@ -1,4 +1,5 @@
 const BASE_URL = "http://localhost:5000/api/soil"; // Flask backend base
+const PLANT_STREAM_URL = "http://localhost:5000/api/v1/plants/stream"; // SSE plant status feed
 
 // --- small helper: fetch with timeout ---
 const fetchWithTimeout = async (url, options = {}, timeout = 7000) => {
@@ -113,6 +114,31 @@ export const subscribeSoilStream = (onMessage, onError) => {
   return es;
 };
 
+/**
+ * Real-time plant status via the v1 SSE feed.
+ * Backend exposes: GET /api/v1/plants/stream, sending 'status' events shaped like
+ * { date, lastUpdated, plants: [...] } that contain only the plants whose state changed.
+ * onUpdate receives the parsed payload. Returns the EventSource instance (call .close() to stop).
+ */
+export const subscribePlantStatusStream = (onUpdate, onError) => {
+  if (typeof EventSource === 'undefined') {
+    console.warn('EventSource not available in this environment');
+    return null;
+  }
+  const es = new EventSource(PLANT_STREAM_URL);
+  es.addEventListener('status', (e) => {
+    try {
+      onUpdate && onUpdate(JSON.parse(e.data));
+    } catch (err) {
+      onError && onError(err);
+    }
+  });
+  es.onerror = (err) => {
+    onError && onError(err);
+  };
+  return es;
+};
+
 /**
  * Simple polling fallback for environments without SSE.
  * Returns a stop() function that cancels the polling.
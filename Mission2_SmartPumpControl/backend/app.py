@@ -1,9 +1,13 @@
 from flask import Flask, request, jsonify
 from datetime import datetime, timedelta
+import atexit
 import logging
 import json
 import os
 
+from device_registry import device_registry_from_env
+from watering_log import WateringLog
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -19,46 +23,74 @@ MAX_WATER_AMOUNT = 500  # Maximum ml per watering
 MIN_WATER_AMOUNT = 50   # Minimum ml per watering
 WATERING_COOLDOWN = timedelta(hours=6)  # Minimum time between waterings
 
+WATERING_LOG_DIR = 'watering_log'  # Append-only segments + checkpoint
+LEGACY_HISTORY_FILE = 'watering_history.json'  # Migrated into the log on first start
+HISTORY_LIMIT = 100  # Entries returned by GET /history by default
+MAX_HISTORY_LIMIT = 1000  # Largest ?limit= served by GET /history (bounds the disk read)
+DEFAULT_DEVICE = 'default'  # Device used by the legacy single-pump routes
+
 # Store the last watering time and amount
 class WateringHistory:
-    def __init__(self):
+    def __init__(self, log_dir=WATERING_LOG_DIR, legacy_path=LEGACY_HISTORY_FILE):
+        self.log = WateringLog(log_dir, tail_size=HISTORY_LIMIT)
         self.last_watering = None
-        self.history = []
-        self.load_history()
+        self.load_history(legacy_path)
     
-    def load_history(self):
+    def load_history(self, legacy_path):
         try:
-            if os.path.exists('watering_history.json'):
-                with open('watering_history.json', 'r') as f:
-                    data = json.load(f)
-                    self.last_watering = datetime.fromisoformat(data['last_watering']) if data.get('last_watering') else None
-                    self.history = data.get('history', [])
+            if self.log.count == 0 and os.path.exists(legacy_path):
+                self.migrate_legacy(legacy_path)
+            if self.log.last_watering:
+                self.last_watering = datetime.fromisoformat(self.log.last_watering)
         except Exception as e:
             logger.error(f"Error loading history: {e}")
     
-    def save_history(self):
-        try:
-            with open('watering_history.json', 'w') as f:
-                json.dump({
-                    'last_watering': self.last_watering.isoformat() if self.last_watering else None,
-                    'history': self.history
-                }, f)
-        except Exception as e:
-            logger.error(f"Error saving history: {e}")
+    def migrate_legacy(self, legacy_path):
+        """Imports the old single-file history into the log once, then renames it."""
+        with open(legacy_path, 'r') as f:
+            data = json.load(f)
+        for entry in data.get('history', []):
+            self.log.append(entry)
+        self.log.compact()
+        os.replace(legacy_path, legacy_path + '.migrated')
+        logger.info(f"Migrated {len(data.get('history', []))} entries from {legacy_path}")
     
-    def add_watering(self, amount, moisture_before):
+    @property
+    def history(self):
+        return self.log.recent(HISTORY_LIMIT)
+    
+    def recent(self, limit):
+        return self.log.recent(limit)
+    
+    def add_watering(self, amount, moisture_before, device_id=None):
         now = datetime.now()
         self.last_watering = now
-        self.history.append({
+        record = {
             'timestamp': now.isoformat(),
             'amount_ml': amount,
             'moisture_before': moisture_before
-        })
-        # Keep only last 100 entries
-        self.history = self.history[-100:]
-        self.save_history()
+        }
+        if device_id is not None:
+            record['device'] = device_id
+        try:
+            self.log.append(record)
+        except Exception as e:
+            logger.error(f"Error saving history: {e}")
 
 history = WateringHistory()
+atexit.register(history.log.close)
+
+# Per-device cooldown, last watering and recent moisture
+devices = device_registry_from_env(WATERING_COOLDOWN.total_seconds())
+default_state = devices.get(DEFAULT_DEVICE)
+if default_state.last_watering is None and history.last_watering:
+    # Carry the single-pump cooldown over from before devices were tracked
+    default_state.last_watering = history.last_watering.timestamp()
+devices.start()
+atexit.register(devices.close)
+
+def iso_or_none(epoch):
+    return datetime.fromtimestamp(epoch).isoformat() if epoch is not None else None
 
 def calculate_water_amount(moisture_level):
     """Calculate how much water to give based on moisture level."""
@@ -71,32 +103,44 @@ def calculate_water_amount(moisture_level):
     
     return min(max(amount, MIN_WATER_AMOUNT), MAX_WATER_AMOUNT)
 
+def decide_irrigation(device_id, moisture):
+    """
+    Decides whether one device should water now.
+
+    Parameters:
+    - device_id: Device or zone ID.
+    - moisture: Current moisture in %, or None to use the device's latest reading.
+
+    Returns:
+    - dict with 'water', 'amount_ml' and, when not watering for a reason, 'reason'.
+    """
+    state = devices.touch(device_id, moisture)
+    if moisture is None:
+        if not state.moisture:
+            return {'water': False, 'amount_ml': 0, 'reason': 'no_reading'}
+        moisture = state.moisture[-1]
+    logger.info(f"[{device_id}] Moisture level: {moisture}%")
+    
+    # Check if enough time has passed since this device's last watering
+    if state.in_cooldown(state.last_seen):
+        logger.info(f"[{device_id}] Still in cooldown period")
+        return {'water': False, 'amount_ml': 0, 'reason': 'cooldown'}
+    
+    # Calculate if watering is needed
+    amount = calculate_water_amount(moisture)
+    should_water = amount > 0
+    
+    if should_water:
+        logger.info(f"[{device_id}] Recommending watering of {amount}ml")
+    
+    return {'water': should_water, 'amount_ml': amount}
+
 @app.route('/api/v1/irrigate', methods=['GET'])
 def check_irrigation():
     try:
         moisture = float(request.args.get('moisture', 0))
-        logger.info(f"Received moisture level: {moisture}%")
-        
-        # Check if enough time has passed since last watering
-        if history.last_watering and datetime.now() - history.last_watering < WATERING_COOLDOWN:
-            logger.info("Still in cooldown period")
-            return jsonify({
-                'water': False,
-                'amount_ml': 0,
-                'reason': 'cooldown'
-            })
-        
-        # Calculate if watering is needed
-        amount = calculate_water_amount(moisture)
-        should_water = amount > 0
-        
-        if should_water:
-            logger.info(f"Recommending watering of {amount}ml")
-        
-        return jsonify({
-            'water': should_water,
-            'amount_ml': amount
-        })
+        device_id = request.args.get('device', DEFAULT_DEVICE)
+        return jsonify(decide_irrigation(device_id, moisture))
         
     except Exception as e:
         logger.error(f"Error in check_irrigation: {e}")
@@ -106,19 +150,45 @@ def check_irrigation():
             'error': str(e)
         }), 500
 
+@app.route('/irrigate/<device_id>', methods=['GET'])
+@app.route('/api/v1/irrigate/<device_id>', methods=['GET'])
+def check_device_irrigation(device_id):
+    """Polling endpoint used by the ESP32 firmware (expects 'on' and 'qte_water_needed')."""
+    try:
+        moisture = request.args.get('moisture')
+        decision = decide_irrigation(device_id, float(moisture) if moisture is not None else None)
+        decision.update({
+            'device': device_id,
+            'on': decision['water'],
+            'qte_water_needed': decision['amount_ml']
+        })
+        return jsonify(decision)
+        
+    except Exception as e:
+        logger.error(f"Error in check_device_irrigation: {e}")
+        return jsonify({
+            'device': device_id,
+            'on': False,
+            'qte_water_needed': 0,
+            'error': str(e)
+        }), 500
+
 @app.route('/api/v1/irrigate/feedback', methods=['POST'])
-def irrigation_feedback():
+@app.route('/api/v1/irrigate/<device_id>/feedback', methods=['POST'])
+def irrigation_feedback(device_id=None):
     try:
         data = request.get_json()
+        device_id = device_id or data.get('device') or data.get('plant') or DEFAULT_DEVICE
         requested = data.get('requested_ml', 0)
         delivered = data.get('delivered_ml', 0)
         moisture = data.get('moisture', 0)
         
-        logger.info(f"Watering feedback - Requested: {requested}ml, "
+        logger.info(f"[{device_id}] Watering feedback - Requested: {requested}ml, "
                    f"Delivered: {delivered}ml, New moisture: {moisture}%")
         
         # Record the watering
-        history.add_watering(delivered, moisture)
+        devices.record_watering(device_id, moisture)
+        history.add_watering(delivered, moisture, device_id)
         
         return jsonify({'status': 'success'})
         
@@ -126,12 +196,24 @@ def irrigation_feedback():
         logger.error(f"Error in irrigation_feedback: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/v1/devices/<device_id>', methods=['GET'])
+def get_device(device_id):
+    state = devices.peek(device_id)
+    if state is None:
+        return jsonify({'error': f"Unknown device '{device_id}'"}), 404
+    info = state.to_dict()
+    info['last_watering'] = iso_or_none(state.last_watering)
+    info['last_seen'] = iso_or_none(state.last_seen)
+    info['in_cooldown'] = state.in_cooldown(datetime.now().timestamp())
+    return jsonify(info)
+
 @app.route('/api/v1/history', methods=['GET'])
 def get_history():
     try:
+        limit = min(max(0, int(request.args.get('limit', HISTORY_LIMIT))), MAX_HISTORY_LIMIT)
         return jsonify({
             'last_watering': history.last_watering.isoformat() if history.last_watering else None,
-            'history': history.history
+            'history': history.recent(limit)
         })
     except Exception as e:
         logger.error(f"Error getting history: {e}")
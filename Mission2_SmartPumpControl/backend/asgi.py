@@ -0,0 +1,12 @@
+"""
+ASGI entry point for the pump controller:  uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+The controller makes no upstream calls, so its Flask routes are served unchanged
+through asgiref's WsgiToAsgi; `python app.py` still starts the Flask server.
+"""
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import app as flask_app
+
+app = WsgiToAsgi(flask_app)
@@ -0,0 +1,221 @@
+"""
+Per-device irrigation state for many ESP32 pumps served by one process.
+
+Each device (or zone) has its own cooldown, last watering and recent moisture
+readings. Lookups on the polling path are a dict access; devices that stop
+polling are evicted from memory, and only entries changed since the last flush
+are written to SQLite, so persistence cost follows activity rather than fleet size.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+
+logger = logging.getLogger(__name__)
+
+RECENT_MOISTURE = 12  # Readings kept per device (1 h at a 5 min polling interval)
+
+
+class DeviceState:
+    __slots__ = ('device_id', 'last_watering', 'last_seen', 'cooldown', 'moisture')
+
+    def __init__(self, device_id, cooldown, last_watering=None, last_seen=None, moisture=()):
+        self.device_id = device_id
+        self.cooldown = cooldown          # Seconds between waterings
+        self.last_watering = last_watering  # Epoch seconds or None
+        self.last_seen = last_seen        # Epoch seconds of the last poll/feedback
+        self.moisture = deque(moisture, maxlen=RECENT_MOISTURE)
+
+    def in_cooldown(self, now):
+        return self.last_watering is not None and now - self.last_watering < self.cooldown
+
+    def to_dict(self):
+        return {
+            'device_id': self.device_id,
+            'last_watering': self.last_watering,
+            'last_seen': self.last_seen,
+            'cooldown_seconds': self.cooldown,
+            'recent_moisture': list(self.moisture)
+        }
+
+
+class DeviceRegistry:
+    """
+    In-memory index of DeviceState keyed by device ID, backed by SQLite.
+
+    Parameters:
+    - db_path: SQLite file holding one row per device ever seen.
+    - default_cooldown: Cooldown (seconds) for devices without a stored one.
+    - idle_timeout: Devices silent for this long are flushed and dropped from memory.
+    - flush_interval: Seconds between background flushes of dirty devices.
+    """
+
+    def __init__(self, db_path='device_state.db', default_cooldown=6 * 3600,
+                 idle_timeout=24 * 3600, flush_interval=30.0, clock=time.time):
+        self.db_path = db_path
+        self.default_cooldown = default_cooldown
+        self.idle_timeout = idle_timeout
+        self.flush_interval = flush_interval
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._devices = OrderedDict()  # Least recently seen first
+        self._dirty = set()
+        self._worker = None
+        self._stop = threading.Event()
+        self.stats = {'loaded': 0, 'created': 0, 'evicted': 0, 'flushed': 0}
+
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS devices ('
+            'device_id TEXT PRIMARY KEY, last_watering REAL, last_seen REAL, '
+            'cooldown REAL, moisture TEXT)'
+        )
+        self._db.commit()
+        self._db_lock = threading.Lock()
+
+    def _load(self, device_id):
+        with self._db_lock:
+            row = self._db.execute(
+                'SELECT last_watering, last_seen, cooldown, moisture FROM devices WHERE device_id = ?',
+                (device_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        last_watering, last_seen, cooldown, moisture = row
+        return DeviceState(device_id, cooldown, last_watering, last_seen, json.loads(moisture or '[]'))
+
+    def get(self, device_id, create=True):
+        """Returns the device's state, loading it from disk or creating it on first contact."""
+        state = self._devices.get(device_id)
+        if state is not None or not create:
+            return state
+        loaded = self._load(device_id)  # Cold path: new or previously evicted device
+        with self._lock:
+            state = self._devices.get(device_id)
+            if state is None:
+                if loaded is not None:
+                    state = loaded
+                    self.stats['loaded'] += 1
+                else:
+                    state = DeviceState(device_id, self.default_cooldown)
+                    self.stats['created'] += 1
+                    self._dirty.add(device_id)
+                self._devices[device_id] = state
+        return state
+
+    def peek(self, device_id):
+        """Returns the device's state from memory or disk without keeping it resident."""
+        return self._devices.get(device_id) or self._load(device_id)
+
+    def _resident(self, device_id, state):
+        """
+        Called with _lock held: the in-memory entry for device_id, re-inserting
+        `state` (from an earlier get()) if evict_idle() dropped it meanwhile, and
+        marking it most recently seen.
+        """
+        current = self._devices.get(device_id)
+        if current is None:
+            self._devices[device_id] = current = state
+        else:
+            self._devices.move_to_end(device_id)
+        return current
+
+    def _touch_locked(self, state, moisture):
+        state.last_seen = self.clock()
+        if moisture is not None:
+            state.moisture.append(moisture)
+        self._dirty.add(state.device_id)
+
+    def touch(self, device_id, moisture=None):
+        """Marks a poll from the device, optionally recording a moisture reading."""
+        state = self.get(device_id)
+        with self._lock:
+            state = self._resident(device_id, state)
+            self._touch_locked(state, moisture)
+        return state
+
+    def record_watering(self, device_id, moisture=None):
+        state = self.get(device_id)
+        with self._lock:
+            state = self._resident(device_id, state)
+            self._touch_locked(state, moisture)
+            state.last_watering = state.last_seen
+        return state
+
+    def set_cooldown(self, device_id, seconds):
+        state = self.get(device_id)
+        with self._lock:
+            state = self._resident(device_id, state)
+            state.cooldown = float(seconds)
+            self._dirty.add(device_id)
+        return state
+
+    def flush(self):
+        """Writes only the devices changed since the last flush. Returns how many."""
+        with self._lock:
+            rows = [
+                (s.device_id, s.last_watering, s.last_seen, s.cooldown, json.dumps(list(s.moisture)))
+                for s in (self._devices.get(d) for d in self._dirty) if s is not None
+            ]
+            self._dirty.clear()
+        if not rows:
+            return 0
+        with self._db_lock:
+            self._db.executemany('INSERT OR REPLACE INTO devices VALUES (?, ?, ?, ?, ?)', rows)
+            self._db.commit()
+        self.stats['flushed'] += len(rows)
+        return len(rows)
+
+    def evict_idle(self):
+        """Flushes, then drops devices silent for longer than idle_timeout. Returns how many."""
+        self.flush()
+        cutoff = self.clock() - self.idle_timeout
+        evicted = 0
+        with self._lock:
+            while self._devices:
+                device_id, state = next(iter(self._devices.items()))
+                if device_id in self._dirty or (state.last_seen or 0) >= cutoff:
+                    break
+                del self._devices[device_id]
+                evicted += 1
+        self.stats['evicted'] += evicted
+        return evicted
+
+    def _run(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.evict_idle()
+            except Exception as e:
+                logger.error(f"Device state flush failed: {e}")
+
+    def start(self):
+        """Starts the background flush/eviction thread."""
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name='device-registry', daemon=True)
+            self._worker.start()
+
+    def close(self):
+        self._stop.set()
+        self.flush()
+        with self._db_lock:
+            self._db.close()
+
+    def __len__(self):
+        return len(self._devices)
+
+    def __contains__(self, device_id):
+        return device_id in self._devices
+
+
+def device_registry_from_env(default_cooldown):
+    """Builds the registry from DEVICE_STATE_DB, DEVICE_IDLE_TIMEOUT and DEVICE_FLUSH_INTERVAL."""
+    return DeviceRegistry(
+        db_path=os.environ.get('DEVICE_STATE_DB', 'device_state.db'),
+        default_cooldown=default_cooldown,
+        idle_timeout=float(os.environ.get('DEVICE_IDLE_TIMEOUT', 24 * 3600)),
+        flush_interval=float(os.environ.get('DEVICE_FLUSH_INTERVAL', 30))
+    )
@@ -0,0 +1,79 @@
+import threading
+
+from device_registry import DeviceRegistry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_registry(tmp_path, clock):
+    return DeviceRegistry(db_path=str(tmp_path / 'devices.db'), default_cooldown=600,
+                          idle_timeout=60, clock=clock)
+
+
+def test_update_after_eviction_reinserts_the_device(tmp_path):
+    clock = FakeClock()
+    registry = make_registry(tmp_path, clock)
+    state = registry.get('plant_x')
+    clock.now += 3600
+    registry.flush()
+
+    # Evicted between the lookup and the update, as a concurrent evict_idle() could do
+    real_get = registry.get
+    registry.get = lambda device_id, create=True: (registry.evict_idle(), state)[1]
+    registry.set_cooldown('plant_x', 120)
+    registry.get = real_get
+
+    assert 'plant_x' in registry
+    assert registry.flush() == 1
+    registry._devices.clear()
+    assert registry.get('plant_x').cooldown == 120.0
+    registry.close()
+
+
+def test_concurrent_touch_and_evict(tmp_path):
+    clock = FakeClock()
+    registry = make_registry(tmp_path, clock)
+    device_ids = [f'plant_{i}' for i in range(50)]
+    errors = []
+    stop = threading.Event()
+
+    def poll():
+        try:
+            for round_ in range(200):
+                for device_id in device_ids:
+                    registry.touch(device_id, moisture=round_)
+                registry.record_watering(device_ids[round_ % len(device_ids)])
+                registry.set_cooldown(device_ids[-1], 300)
+        except Exception as e:
+            errors.append(e)
+
+    def evict():
+        while not stop.is_set():
+            clock.now += 3600  # Every device looks idle
+            registry.evict_idle()
+
+    evictor = threading.Thread(target=evict)
+    evictor.start()
+    pollers = [threading.Thread(target=poll) for _ in range(4)]
+    for t in pollers:
+        t.start()
+    for t in pollers:
+        t.join()
+    stop.set()
+    evictor.join()
+
+    assert errors == []
+    registry.flush()
+    registry._devices.clear()
+    for device_id in device_ids:
+        state = registry.get(device_id)
+        assert state.last_seen is not None
+        assert list(state.moisture)[-1] == 199
+    assert registry.get(device_ids[-1]).cooldown == 300.0
+    registry.close()
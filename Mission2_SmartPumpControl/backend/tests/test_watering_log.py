@@ -0,0 +1,52 @@
+from watering_log import WateringLog
+
+
+def count_disk_reads(monkeypatch):
+    reads = []
+    real = WateringLog._read_recent
+
+    def counting(self, limit):
+        reads.append(limit)
+        return real(self, limit)
+
+    monkeypatch.setattr(WateringLog, '_read_recent', counting)
+    return reads
+
+
+def test_recent_is_served_from_memory_while_the_tail_holds_the_whole_log(tmp_path, monkeypatch):
+    log = WateringLog(str(tmp_path), tail_size=100)
+    for i in range(10):
+        log.append({'timestamp': f't{i}', 'amount': i})
+    reads = count_disk_reads(monkeypatch)
+
+    assert [r['amount'] for r in log.recent(100)] == list(range(10))
+    assert [r['amount'] for r in log.recent(3)] == [7, 8, 9]
+    assert log.recent(0) == []
+    assert reads == []
+    log.close()
+
+
+def test_recent_beyond_the_tail_reads_segments(tmp_path, monkeypatch):
+    log = WateringLog(str(tmp_path), tail_size=5)
+    for i in range(8):
+        log.append({'timestamp': f't{i}', 'amount': i})
+    reads = count_disk_reads(monkeypatch)
+
+    assert [r['amount'] for r in log.recent(5)] == [3, 4, 5, 6, 7]
+    assert reads == []
+    assert [r['amount'] for r in log.recent(8)] == list(range(8))
+    assert reads == [8]
+    log.close()
+
+
+def test_reopened_log_knows_whether_its_tail_is_complete(tmp_path, monkeypatch):
+    log = WateringLog(str(tmp_path), tail_size=5)
+    for i in range(3):
+        log.append({'timestamp': f't{i}', 'amount': i})
+    log.close()
+
+    reopened = WateringLog(str(tmp_path), tail_size=5)
+    reads = count_disk_reads(monkeypatch)
+    assert [r['amount'] for r in reopened.recent(100)] == [0, 1, 2]
+    assert reads == []
+    reopened.close()
@@ -0,0 +1,242 @@
+"""
+Append-only storage for watering events.
+
+Replaces rewriting the whole history file on every event: records are appended
+as JSON lines to size-bounded segments, so each write costs the same no matter
+how much history exists, and a crash can at worst tear the final line.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from itertools import islice
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_PREFIX = 'segment-'
+SEGMENT_SUFFIX = '.jsonl'
+CHECKPOINT_FILE = 'checkpoint.json'
+
+
+def _segment_name(index):
+    return f"{SEGMENT_PREFIX}{index:06d}{SEGMENT_SUFFIX}"
+
+
+def _read_lines_reversed(path, block_size=65536):
+    """Yields the complete lines of a file from last to first, reading it in blocks from the end."""
+    with open(path, 'rb') as f:
+        f.seek(0, os.SEEK_END)
+        position = f.tell()
+        remainder = b''
+        while position > 0:
+            read_size = min(block_size, position)
+            position -= read_size
+            f.seek(position)
+            block = f.read(read_size) + remainder
+            lines = block.split(b'\n')
+            remainder = lines.pop(0)
+            for line in reversed(lines):
+                if line.strip():
+                    yield line
+        if remainder.strip():
+            yield remainder
+
+
+class WateringLog:
+    """
+    Append-only, segmented JSON-lines log of watering events.
+
+    - Each event is one line appended to the active segment; fsync is batched
+      (every `fsync_every` records or `fsync_interval` seconds, whichever first).
+    - Segments rotate once they exceed `segment_max_bytes`; a checkpoint
+      (segment, byte offset, last watering, event count) is written atomically
+      on every rotation/compaction so recovery only replays the tail.
+    - A torn last line (crash mid-write) is truncated away on load.
+    - Recent history is served from an in-memory tail and, beyond it, by reading
+      segments backwards from the end, never the whole log.
+    """
+
+    def __init__(self, directory='watering_log', segment_max_bytes=1024 * 1024,
+                 fsync_every=16, fsync_interval=1.0, retain_segments=None, tail_size=100):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.retain_segments = retain_segments  # None keeps every segment
+        self._lock = threading.Lock()
+        self._tail = deque(maxlen=tail_size)
+        self._tail_complete = False  # True while the tail holds every record of the log
+        self._unsynced = 0
+        self._last_fsync = time.monotonic()
+        self.last_watering = None
+        self.count = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._recover()
+
+    # --- Segment bookkeeping ---
+
+    def _segments(self):
+        indexes = []
+        for name in os.listdir(self.directory):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                try:
+                    indexes.append(int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+                except ValueError:
+                    continue
+        return sorted(indexes)
+
+    def _path(self, index):
+        return os.path.join(self.directory, _segment_name(index))
+
+    def _read_checkpoint(self):
+        path = os.path.join(self.directory, CHECKPOINT_FILE)
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"Ignoring unreadable checkpoint: {e}")
+            return None
+
+    def _write_checkpoint(self):
+        checkpoint = {
+            'segment': self._active_index,
+            'offset': self._active.tell(),
+            'last_watering': self.last_watering,
+            'count': self.count
+        }
+        path = os.path.join(self.directory, CHECKPOINT_FILE)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(checkpoint, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    # --- Recovery ---
+
+    def _recover(self):
+        segments = self._segments()
+        checkpoint = self._read_checkpoint()
+        if checkpoint and checkpoint.get('segment') in segments:
+            start_index, start_offset = checkpoint['segment'], checkpoint['offset']
+            self.last_watering = checkpoint.get('last_watering')
+            self.count = checkpoint.get('count', 0)
+        else:
+            start_index, start_offset = (segments[0] if segments else 1), 0
+
+        # Replay everything written after the checkpoint
+        for index in [i for i in segments if i >= start_index]:
+            path = self._path(index)
+            offset = start_offset if index == start_index else 0
+            with open(path, 'rb') as f:
+                f.seek(offset)
+                good_until = offset
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        if index == segments[-1] and not line.endswith(b'\n'):
+                            break  # Torn write at the very end of the log
+                        logger.error(f"Skipping corrupt record in {path} at byte {good_until}")
+                        good_until += len(line)
+                        continue
+                    good_until += len(line)
+                    self.count += 1
+                    self.last_watering = record.get('timestamp', self.last_watering)
+            if index == segments[-1] and good_until < os.path.getsize(path):
+                logger.warning(f"Truncating torn record at the end of {path}")
+                with open(path, 'r+b') as f:
+                    f.truncate(good_until)
+
+        self._active_index = segments[-1] if segments else 1
+        self._active = open(self._path(self._active_index), 'ab')
+        recent = self._read_recent(self._tail.maxlen)
+        self._tail.extend(reversed(recent))
+        self._tail_complete = len(recent) < self._tail.maxlen
+        self._write_checkpoint()
+
+    # --- Writes ---
+
+    def append(self, record):
+        """Appends one event; cost is independent of how much history exists."""
+        line = (json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8')
+        with self._lock:
+            self._active.write(line)
+            self._active.flush()
+            self._unsynced += 1
+            self.count += 1
+            self.last_watering = record.get('timestamp', self.last_watering)
+            if len(self._tail) == self._tail.maxlen:
+                self._tail_complete = False  # The oldest record now only lives on disk
+            self._tail.append(record)
+
+            now = time.monotonic()
+            if self._unsynced >= self.fsync_every or now - self._last_fsync >= self.fsync_interval:
+                self._fsync(now)
+            if self._active.tell() >= self.segment_max_bytes:
+                self._rotate()
+
+    def _fsync(self, now=None):
+        os.fsync(self._active.fileno())
+        self._unsynced = 0
+        self._last_fsync = now if now is not None else time.monotonic()
+
+    def _rotate(self):
+        self._fsync()
+        self._active.close()
+        self._active_index += 1
+        self._active = open(self._path(self._active_index), 'ab')
+        self._compact()
+
+    def _compact(self):
+        """Checkpoints the current position and drops segments beyond retention."""
+        self._write_checkpoint()
+        if self.retain_segments:
+            for index in self._segments()[:-self.retain_segments]:
+                os.remove(self._path(index))
+
+    def compact(self):
+        with self._lock:
+            self._fsync()
+            self._compact()
+
+    def sync(self):
+        """Forces pending records to disk."""
+        with self._lock:
+            if self._unsynced:
+                self._fsync()
+
+    def close(self):
+        with self._lock:
+            if not self._active.closed:
+                self._fsync()
+                self._write_checkpoint()
+                self._active.close()
+
+    # --- Reads ---
+
+    def _read_recent(self, limit):
+        records = []
+        for index in reversed(self._segments()):
+            for line in _read_lines_reversed(self._path(index)):
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+                if len(records) >= limit:
+                    return records
+        return records
+
+    def recent(self, limit=100):
+        """Returns the newest `limit` records, oldest first."""
+        with self._lock:
+            if limit <= len(self._tail) or self._tail_complete:
+                return list(islice(self._tail, max(0, len(self._tail) - limit), None))
+            self._active.flush()
+            return list(reversed(self._read_recent(limit)))
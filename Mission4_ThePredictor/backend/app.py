@@ -1,7 +1,14 @@
-from flask import Flask, jsonify
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime, timedelta
+from werkzeug.http import http_date
 import math
+import os
+import threading
+
+from forecast_cache import ForecastCache
+from schedule_engine import build_schedules
 
 # --- CONFIGURATION AND DATA ---
 
@@ -9,6 +16,8 @@ import math
 TUNISIAN_MONTHS = ['جانفي', 'فيفري', 'مارس', 'أفريل', 'ماي', 'جوان', 'جويلية', 'أوت', 'سبتمبر', 'أكتوبر', 'نوفمبر', 'ديسمبر']
 DAYS_OF_WEEK = ['Sun', 'Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat']
 WEATHER_FACTORS = [1.0, 1.1, 0.8, 1.2, 1.05, 0.9, 1.15] # Mocked weather factors for 7 days
+RAIN_FORECAST = [0, 0, 6.0, 0, 0, 1.5, 0] # Mocked rain (mm): rain on day 3, light rain on day 6
+MAX_FORECAST_DAYS = 28 # Longest horizon served by /weekly-forecast?days= (weekly pattern repeats)
 
 INITIAL_PLANT_CONFIGS = [
     {
@@ -34,15 +43,36 @@ INITIAL_PLANT_CONFIGS = [
     },
 ]
 
+# Trained DQN checkpoint (mission_four.py --save-model) served by /api/v1/policy-schedule
+POLICY_MODEL_PATH = os.environ.get('POLICY_MODEL_PATH', 'policy.pt')
+POLICY_TORCHSCRIPT = os.environ.get('POLICY_TORCHSCRIPT', '0') == '1'
+POLICY_MAX_BATCH = int(os.environ.get('POLICY_MAX_BATCH', '4096'))  # Fields per forward pass
+POLICY_MAX_WAIT_MS = float(os.environ.get('POLICY_MAX_WAIT_MS', '2'))  # Wait for concurrent requests to join a batch
+MAX_POLICY_FIELDS = 10000  # Per request
+MAX_POLICY_DAYS = 28  # Longest et/rain series per field (days the policy is rolled out)
+POLICY_TIMEOUT = float(os.environ.get('POLICY_TIMEOUT', '30'))  # Seconds a request waits for its batch
+
+# Bumped whenever INITIAL_PLANT_CONFIGS changes; part of the forecast cache key
+CONFIG_VERSION = 0
+
+def update_plant_configs(configs):
+    """
+    Replaces the plant configurations and invalidates the cached forecast.
+    Always change INITIAL_PLANT_CONFIGS through this helper.
+    """
+    global CONFIG_VERSION
+    INITIAL_PLANT_CONFIGS[:] = configs
+    CONFIG_VERSION += 1
+
 # --- CORE IRRIGATION CALCULATION ---
 
-def calculate_weekly_schedule(config):
+def calculate_weekly_schedule(config, today=None):
     """
     Calculates the 7-day irrigation schedule for a single plant configuration.
     This logic mirrors the original React component's calculation.
     """
     schedule = []
-    today = datetime.now()
+    today = today or datetime.now()
 
     for i in range(7):
         date = today + timedelta(days=i)
@@ -80,20 +110,139 @@ def calculate_weekly_schedule(config):
 
     return { **config, 'schedule': schedule }
 
+def calculate_schedules(configs, today=None, horizon=7):
+    """
+    Array-based equivalent of calculate_weekly_schedule for many configs at once.
+    Horizons beyond 7 days repeat the weekly weather and rain pattern.
+    """
+    return build_schedules(
+        configs, today or datetime.now(), horizon,
+        WEATHER_FACTORS, RAIN_FORECAST, DAYS_OF_WEEK, TUNISIAN_MONTHS
+    )
+
 # --- FLASK APPLICATION SETUP ---
 
 app = Flask(__name__)
 # Enable CORS for the frontend running on a different port (e.g., in the canvas environment)
 CORS(app) 
 
+def build_weekly_forecasts(today, horizon=7):
+    return calculate_schedules(INITIAL_PLANT_CONFIGS, today, horizon)
+
+# Built once per (local day, CONFIG_VERSION, horizon) and kept as serialized JSON bytes
+# (byte-for-byte what jsonify would send)
+forecast_cache = ForecastCache(build_weekly_forecasts, serialize=lambda data: app.json.response(data).get_data())
+
 @app.route('/api/v1/weekly-forecast', methods=['GET'])
 def get_weekly_forecast():
     """
     API endpoint to return the calculated weekly irrigation forecasts for all plants.
+    Served from the forecast cache, with ETag / Last-Modified validators (304 when unchanged).
+    Optional ?days=N (1..MAX_FORECAST_DAYS, default 7) extends the horizon.
+    """
+    horizon = request.args.get('days', 7, type=int)
+    if not horizon or not 1 <= horizon <= MAX_FORECAST_DAYS:
+        return jsonify({'error': f'days must be an integer between 1 and {MAX_FORECAST_DAYS}.'}), 400
+
+    forecast = forecast_cache.get(CONFIG_VERSION, horizon)
+    headers = {
+        'ETag': forecast.etag,
+        'Last-Modified': http_date(forecast.last_modified),
+        'Cache-Control': 'no-cache'  # Clients must revalidate (the forecast changes at midnight)
+    }
+
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(forecast.etag.strip('"'))
+    else:
+        not_modified = request.if_modified_since is not None and request.if_modified_since >= forecast.last_modified
+    if not_modified:
+        return Response(status=304, headers=headers)
+
+    return Response(forecast.body, mimetype='application/json', headers=headers)
+
+# --- POLICY INFERENCE ---
+
+_policy_batcher = None
+_policy_lock = threading.Lock()
+
+def get_policy_batcher():
+    """
+    Micro-batcher over the cached POLICY_MODEL_PATH network, created on first use
+    (torch is only imported then, so the forecast API starts without it).
+    """
+    global _policy_batcher
+    with _policy_lock:
+        if _policy_batcher is None:
+            from policy_inference import MicroBatcher, load_policy
+            _policy_batcher = MicroBatcher(
+                lambda: load_policy(POLICY_MODEL_PATH, torchscript=POLICY_TORCHSCRIPT),
+                max_batch=POLICY_MAX_BATCH,
+                max_wait=POLICY_MAX_WAIT_MS / 1000.0
+            )
+        return _policy_batcher
+
+def _number(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+def parse_policy_fields(body):
+    """
+    Validates the policy-schedule request body.
+    Returns (fields, error): fields hold 'fieldId', 'et', 'rain', 'cropNeed', 'initialMoisture'.
     """
-    all_forecasts = [calculate_weekly_schedule(config) for config in INITIAL_PLANT_CONFIGS]
-    
-    return jsonify(all_forecasts)
+    raw = body.get('fields') if isinstance(body, dict) else None
+    if not isinstance(raw, list) or not raw:
+        return None, "'fields' must be a non-empty list."
+    if len(raw) > MAX_POLICY_FIELDS:
+        return None, f"At most {MAX_POLICY_FIELDS} fields per request."
+
+    fields = []
+    for i, field in enumerate(raw):
+        if not isinstance(field, dict):
+            return None, f"fields[{i}] must be an object."
+        et = field.get('et')
+        if not isinstance(et, list) or not 1 <= len(et) <= MAX_POLICY_DAYS or not all(map(_number, et)):
+            return None, f"fields[{i}].et must be a list of 1..{MAX_POLICY_DAYS} numbers (mm/day)."
+        rain = field.get('rain', [0.0] * len(et))
+        if not isinstance(rain, list) or len(rain) != len(et) or not all(map(_number, rain)):
+            return None, f"fields[{i}].rain must be a list of numbers as long as et."
+        crop_need = field.get('cropNeed')
+        if not _number(crop_need):
+            return None, f"fields[{i}].cropNeed must be a number."
+        moisture = field.get('initialMoisture', 0.5)
+        if not _number(moisture) or not 0 <= moisture <= 1:
+            return None, f"fields[{i}].initialMoisture must be between 0 and 1."
+        fields.append({
+            'fieldId': field.get('fieldId', i),
+            'et': [float(x) for x in et],
+            'rain': [float(x) for x in rain],
+            'cropNeed': float(crop_need),
+            'initialMoisture': float(moisture),
+        })
+    return fields, None
+
+@app.route('/api/v1/policy-schedule', methods=['POST'])
+def post_policy_schedule():
+    """
+    Irrigation schedules from the trained DQN policy for many fields at once.
+    Body: {"fields": [{"fieldId", "et": [...], "rain": [...], "cropNeed", "initialMoisture"}, ...]}.
+    Concurrent requests are micro-batched into one forward pass per simulated day.
+    """
+    if not os.path.isfile(POLICY_MODEL_PATH):
+        return jsonify({'error': f'No trained policy at {POLICY_MODEL_PATH} (train one with mission_four.py --save-model).'}), 503
+
+    fields, error = parse_policy_fields(request.get_json(silent=True))
+    if error:
+        return jsonify({'error': error}), 400
+
+    try:
+        rows = get_policy_batcher().run(fields, timeout=POLICY_TIMEOUT)
+    except FutureTimeoutError:
+        return jsonify({'error': f'Policy inference did not finish within {POLICY_TIMEOUT:g} s, try again later.'}), 504
+    except Exception as e:
+        # torch missing, or the checkpoint could not be loaded (corrupt, incompatible, removed meanwhile)
+        print(f"[POLICY] Inference failed: {e!r}")
+        return jsonify({'error': f'Policy model at {POLICY_MODEL_PATH} could not be loaded or run (see server log).'}), 503
+    return jsonify({'model': os.path.basename(POLICY_MODEL_PATH), 'fields': rows})
 
 if __name__ == '__main__':
     # Run the server on the standard Flask port
@@ -0,0 +1,12 @@
+"""
+ASGI entry point for the weekly forecast API:  uvicorn asgi:app --port 5000
+
+The forecast is computed locally (no upstream calls), so the Flask routes are
+served unchanged through asgiref's WsgiToAsgi; `python app.py` still works.
+"""
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import app as flask_app
+
+app = WsgiToAsgi(flask_app)
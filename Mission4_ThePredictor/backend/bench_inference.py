@@ -0,0 +1,120 @@
+"""
+Benchmark: per-field run_policy versus batched policy inference.
+
+Trains a tiny policy (or loads --model), then measures fields/second for
+  - run_policy on one WateringEnv per field (batch-of-1 forward passes),
+  - rollout_schedules over all fields (eager and TorchScript),
+  - MicroBatcher with many client threads each sending small requests,
+and checks that the batched schedules equal run_policy's.
+
+Usage:
+    python bench_inference.py                       # 1k and 10k fields
+    python bench_inference.py 1e5 --model policy.pt --clients 64 --fields-per-request 4
+"""
+
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+import torch
+
+from mission_four import WateringEnv, make_forecast, run_policy, train_dqn
+from policy_inference import MicroBatcher, load_policy, run_fields
+
+
+def make_fields(n, days=7, seed=0):
+    rng = random.Random(seed)
+    return [
+        {
+            'fieldId': f'field-{i}',
+            'et': [round(rng.uniform(2.0, 8.0), 2) for _ in range(days)],
+            'rain': [rng.choice([0.0, 0.0, 0.0, round(rng.uniform(1.0, 15.0), 1)]) for _ in range(days)],
+            'cropNeed': round(rng.uniform(1.0, 6.0), 2),
+            'initialMoisture': round(rng.uniform(0.3, 0.7), 3),
+        }
+        for i in range(n)
+    ]
+
+
+def reference_schedules(model, fields):
+    schedules = []
+    for f in fields:
+        env = WateringEnv(make_forecast(f['et'], f['rain'], None), f['cropNeed'],
+                          initial_moisture=f['initialMoisture'], max_days=len(f['et']))
+        schedule, _, _ = run_policy(env, model, start_moisture=f['initialMoisture'])
+        schedules.append(schedule)
+    return schedules
+
+
+def train_small_policy(path):
+    env = WateringEnv(make_forecast([5.0] * 7, [0, 0, 6, 0, 0, 1.5, 0], None), crop_need=3.0)
+    net, _ = train_dqn(env, episodes=100, seed=0, use_tqdm=False, num_envs=16)
+    torch.save({"state_dict": net.state_dict(), "state_size": 17, "action_size": 21}, path)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def bench_batcher(model_fn, fields, clients, per_request):
+    batcher = MicroBatcher(model_fn)
+    requests = [fields[i:i + per_request] for i in range(0, len(fields), per_request)]
+    lock = threading.Lock()
+
+    def client():
+        while True:
+            with lock:
+                if not requests:
+                    return
+                request = requests.pop()
+            batcher.run(request)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    batcher.close()
+    return elapsed, batcher.stats
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Per-field vs batched DQN policy inference.")
+    ap.add_argument("sizes", nargs="*", type=float, default=[1e3, 1e4])
+    ap.add_argument("--model", type=str, default=None, help="Checkpoint from mission_four.py --save-model.")
+    ap.add_argument("--clients", type=int, default=32, help="Concurrent client threads for the micro-batcher run.")
+    ap.add_argument("--fields-per-request", type=int, default=1)
+    args = ap.parse_args()
+
+    path = args.model
+    if path is None:
+        path = os.path.join(tempfile.mkdtemp(), 'policy.pt')
+        train_small_policy(path)
+
+    eager = load_policy(path)
+    scripted = load_policy(path, torchscript=True)
+
+    print(f"{'fields':>8} {'run_policy':>12} {'batched':>12} {'torchscript':>12} {'micro-batched':>14} {'batches':>8}  match")
+    for n in map(int, args.sizes):
+        fields = make_fields(n)
+        ref_n = min(n, 2000)  # The per-field loop is slow; time a slice and scale
+        reference, t_ref = timed(lambda: reference_schedules(eager, fields[:ref_n]))
+        rows, t_eager = timed(lambda: run_fields(eager, fields))
+        rows_ts, t_ts = timed(lambda: run_fields(scripted, fields))
+        t_batcher, stats = bench_batcher(lambda: scripted, fields, args.clients, args.fields_per_request)
+
+        match = all(r['schedule_mm'] == s for r, s in zip(rows, reference))
+        match = match and [r['schedule_mm'] for r in rows] == [r['schedule_mm'] for r in rows_ts]
+        print(f"{n:>8,} {ref_n / t_ref:>10,.0f}/s {n / t_eager:>10,.0f}/s {n / t_ts:>10,.0f}/s "
+              f"{n / t_batcher:>12,.0f}/s {stats['batches']:>8}  {'yes' if match else 'NO'}")
+
+
+if __name__ == "__main__":
+    main()
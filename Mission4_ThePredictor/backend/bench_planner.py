@@ -0,0 +1,59 @@
+"""
+Benchmark: DQN training versus the dynamic-programming planner.
+
+For a few forecast scenarios, trains a DQN policy (vectorized collection) and
+plans the same episode with dp_planner, then reports wall time, the episode
+reward of each schedule in WateringEnv and the DQN's gap to the DP optimum.
+
+Usage:
+    python bench_planner.py                          # 300 DQN episodes per scenario
+    python bench_planner.py --episodes 2000 --num-envs 32 --grid 4001
+"""
+
+import argparse
+import time
+
+from dp_planner import plan_schedule
+from mission_four import WateringEnv, make_forecast, replay_schedule, run_policy, train_dqn
+
+SCENARIOS = {
+    'steady 5 mm ET': ([5.0] * 7, [0.0] * 7),
+    'mission4 rain': ([5.0] * 7, [0, 0, 6.0, 0, 0, 1.5, 0]),
+    'heatwave': ([4.0, 6.5, 8.0, 9.5, 9.0, 7.0, 5.5], [0.0] * 7),
+    'storm mid-week': ([4.5, 5.0, 3.0, 2.5, 5.5, 6.0, 6.0], [0, 0, 25.0, 12.0, 0, 0, 0]),
+    '14 days dry': ([6.0] * 14, [0.0] * 14),
+}
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    ap = argparse.ArgumentParser(description="DQN vs exact DP watering schedules.")
+    ap.add_argument("--episodes", type=int, default=300)
+    ap.add_argument("--num-envs", type=int, default=16)
+    ap.add_argument("--grid", type=int, default=2001, help="DP moisture grid points.")
+    ap.add_argument("--initial-moisture", type=float, default=0.5)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    print(f"{'scenario':<16} {'dqn time':>9} {'dp time':>9} {'dqn R':>9} {'dp R':>9} {'gap':>8}  dp schedule (mm)")
+    for name, (et, rain) in SCENARIOS.items():
+        env = WateringEnv(make_forecast(et, rain, None), crop_need=3.0,
+                          initial_moisture=args.initial_moisture, max_days=len(et))
+
+        (net, _), t_dqn = timed(lambda: train_dqn(env, episodes=args.episodes, seed=args.seed,
+                                                  use_tqdm=False, num_envs=args.num_envs))
+        schedule, _, _ = run_policy(env, net, start_moisture=args.initial_moisture)
+        dqn_reward, _ = replay_schedule(env, schedule, args.initial_moisture)
+
+        plan, t_dp = timed(lambda: plan_schedule(env, args.initial_moisture, grid_size=args.grid))
+        print(f"{name:<16} {t_dqn:>8.2f}s {t_dp * 1000:>7.1f}ms {dqn_reward:>9.3f} {plan.total_reward:>9.3f} "
+              f"{plan.total_reward - dqn_reward:>8.3f}  {' '.join(f'{w:g}' for w in plan.schedule_mm)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Benchmark: deque-based ReplayBuffer versus the array-backed replay memories.
+
+Measures push throughput (one transition at a time, and 64-row batches as a
+BatchWateringEnv produces them) and sample throughput for a DQN-sized batch,
+including the conversion to torch tensors that train_dqn does every step.
+
+Usage:
+    python bench_replay.py                      # 10k and 100k transitions, batch 128
+    python bench_replay.py 1e6 --batch-size 256
+"""
+
+import argparse
+import time
+
+import numpy as np
+import torch
+
+from mission_four import ReplayBuffer
+from replay_memory import ArrayReplayMemory, PrioritizedReplayMemory
+
+STATE_SIZE = 17
+
+
+def make_transitions(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return (
+        rng.random((n, STATE_SIZE)),
+        rng.integers(0, 21, size=n),
+        rng.normal(size=n),
+        rng.random((n, STATE_SIZE)),
+        rng.random(n) < 0.15,
+    )
+
+
+def rate(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return repeat / (time.perf_counter() - start)
+
+
+def push_all(memory, data):
+    for row in zip(*data):
+        memory.push(*row)
+
+
+def push_batches(memory, data, rows=64):
+    for i in range(0, len(data[1]), rows):
+        memory.push_batch(*(x[i:i + rows] for x in data))
+
+
+def deque_sample_tensors(buffer, batch_size):
+    s, a, r, ns, d = buffer.sample(batch_size)
+    return (torch.FloatTensor(s), torch.LongTensor(a), torch.FloatTensor(r),
+            torch.FloatTensor(ns), torch.FloatTensor(d))
+
+
+def array_sample_tensors(memory, batch_size):
+    return [torch.from_numpy(x) for x in memory.sample(batch_size)[:5]]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Replay buffer push/sample throughput.")
+    ap.add_argument("sizes", nargs="*", type=float, default=[1e4, 1e5])
+    ap.add_argument("--batch-size", type=int, default=128)
+    ap.add_argument("--samples", type=int, default=2000, help="sample() calls timed per buffer.")
+    args = ap.parse_args()
+
+    print(f"{'transitions':>11} {'buffer':>12} {'push/s':>11} {'batch push/s':>13} {'sample+tensor/s':>16}")
+    for n in map(int, args.sizes):
+        data = make_transitions(n)
+        buffers = [
+            ('deque', lambda: ReplayBuffer(capacity=n)),
+            ('array', lambda: ArrayReplayMemory(n, STATE_SIZE)),
+            ('prioritized', lambda: PrioritizedReplayMemory(n, STATE_SIZE)),
+        ]
+        for name, make in buffers:
+            memory = make()
+            start = time.perf_counter()
+            push_all(memory, data)
+            push_rate = n / (time.perf_counter() - start)
+
+            if name == 'deque':
+                batch_rate = None
+                sample = lambda: deque_sample_tensors(memory, args.batch_size)
+            else:
+                batched = make()
+                start = time.perf_counter()
+                push_batches(batched, data)
+                batch_rate = n / (time.perf_counter() - start)
+                sample = lambda: array_sample_tensors(memory, args.batch_size)
+
+            sample_rate = rate(sample, args.samples)
+            batch_col = f"{batch_rate:>13,.0f}" if batch_rate else f"{'-':>13}"
+            print(f"{n:>11,} {name:>12} {push_rate:>11,.0f} {batch_col} {sample_rate:>16,.0f}")
+
+
+if __name__ == "__main__":
+    main()
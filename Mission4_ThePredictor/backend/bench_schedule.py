@@ -0,0 +1,67 @@
+"""
+Benchmark: per-plant calculate_weekly_schedule loop versus the array-based
+schedule engine, for growing plant catalogs.
+
+Reports the matrix computation alone (compute_schedule_matrix) and the full
+list-of-dicts output (calculate_schedules), and checks that the engine's
+output equals the scalar reference.
+
+Usage:
+    python bench_schedule.py                 # 1k, 10k and 100k plants, 7-day horizon
+    python bench_schedule.py 1e6 --days 14
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime
+
+from app import RAIN_FORECAST, WEATHER_FACTORS, calculate_schedules, calculate_weekly_schedule
+from schedule_engine import compute_schedule_matrix, extend_pattern
+
+
+def make_configs(n, seed=0):
+    rng = random.Random(seed)
+    return [
+        {
+            'plantId': f'plant-{i}',
+            'plantName': f'Plant {i}',
+            'soilDeficit': round(rng.uniform(0.0, 0.5), 2),
+            'color': '#16a34a',
+            'baseETc': round(rng.uniform(1.0, 8.0), 2),
+        }
+        for i in range(n)
+    ]
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Scalar vs vectorized irrigation schedule benchmark.")
+    ap.add_argument("sizes", nargs="*", type=float, default=[1e3, 1e4, 1e5])
+    ap.add_argument("--days", type=int, default=7, help="Horizon (the scalar reference only supports 7).")
+    args = ap.parse_args()
+
+    today = datetime.now()
+    factors = extend_pattern(WEATHER_FACTORS, args.days)
+    rain = extend_pattern(RAIN_FORECAST, args.days)
+    print(f"{'plants':>9} {'scalar loop':>12} {'matrix only':>12} {'engine dicts':>13} {'speedup':>8}  match")
+    for n in map(int, args.sizes):
+        configs = make_configs(n)
+        _, t_matrix = timed(lambda: compute_schedule_matrix(
+            [c['baseETc'] for c in configs], [c['soilDeficit'] for c in configs], factors, rain))
+        engine, t_engine = timed(lambda: calculate_schedules(configs, today, args.days))
+        if args.days == 7:
+            scalar, t_scalar = timed(lambda: [calculate_weekly_schedule(c, today) for c in configs])
+            match = "yes" if scalar == engine else "NO"
+            print(f"{n:>9,} {t_scalar:>11.3f}s {t_matrix:>11.4f}s {t_engine:>12.3f}s {t_scalar / t_engine:>7.1f}x  {match}")
+        else:
+            print(f"{n:>9,} {'-':>12} {t_matrix:>11.4f}s {t_engine:>12.3f}s {'-':>8}  -")
+
+
+if __name__ == "__main__":
+    main()
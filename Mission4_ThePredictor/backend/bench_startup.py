@@ -0,0 +1,97 @@
+"""
+Startup-time benchmark and regression guard for mission_four.py.
+
+Measures, in fresh interpreters:
+  - `import mission_four` with `python -X importtime` (cumulative time of the
+    module itself), and which heavy packages it pulled in,
+  - the wall time of `mission_four.py run` on a saved (.npz) policy.
+
+Exits with status 1 if the import or the run exceeds its threshold, or if
+torch / matplotlib / tqdm are imported by `import mission_four`.
+
+Usage:
+    python bench_startup.py
+    python bench_startup.py --repeat 5 --max-import-ms 300 --max-run-ms 1000
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+HEAVY_MODULES = ('torch', 'matplotlib', 'tqdm')
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+
+def import_profile():
+    """(cumulative microseconds of mission_four, set of top-level packages imported)."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "import mission_four"],
+                          cwd=HERE, capture_output=True, text=True, check=True)
+    cumulative, packages = None, set()
+    for line in proc.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        module = match.group(4)
+        packages.add(module.split('.')[0])
+        if module == 'mission_four':
+            cumulative = int(match.group(2))
+    return cumulative, packages
+
+
+def make_npz_policy(path, sizes=(17, 128, 128, 21), seed=0):
+    """Random weights in the NumpyPolicy layout (no torch needed)."""
+    rng = np.random.default_rng(seed)
+    arrays = {'num_layers': np.array(len(sizes) - 1)}
+    for i, (n_in, n_out) in enumerate(zip(sizes, sizes[1:])):
+        arrays[f'w{i}'] = rng.normal(0, n_in ** -0.5, size=(n_out, n_in)).astype(np.float32)
+        arrays[f'b{i}'] = np.zeros(n_out, dtype=np.float32)
+    np.savez(path, **arrays)
+
+
+def run_wall_time(model_path):
+    cmd = [sys.executable, os.path.join(HERE, "mission_four.py"), "run", "--model", model_path,
+           "--crop-need", "3", "--et", "5,5,5,5,5,5,5", "--rain", "0,0,6,0,0,1.5,0"]
+    start = time.perf_counter()
+    subprocess.run(cmd, cwd=HERE, capture_output=True, check=True)
+    return time.perf_counter() - start
+
+
+def main():
+    ap = argparse.ArgumentParser(description="mission_four.py startup time guard.")
+    ap.add_argument("--repeat", type=int, default=3, help="Runs per measurement (best is kept).")
+    ap.add_argument("--max-import-ms", type=float, default=500.0)
+    ap.add_argument("--max-run-ms", type=float, default=1500.0)
+    args = ap.parse_args()
+
+    profiles = [import_profile() for _ in range(args.repeat)]
+    import_ms = min(us for us, _ in profiles) / 1000.0
+    heavy = sorted(set(HEAVY_MODULES) & profiles[0][1])
+
+    model_path = os.path.join(tempfile.mkdtemp(), "policy.npz")
+    make_npz_policy(model_path)
+    run_ms = min(run_wall_time(model_path) for _ in range(args.repeat)) * 1000.0
+
+    failures = []
+    if import_ms > args.max_import_ms:
+        failures.append(f"import mission_four took {import_ms:.0f} ms (limit {args.max_import_ms:.0f} ms)")
+    if run_ms > args.max_run_ms:
+        failures.append(f"`mission_four.py run` took {run_ms:.0f} ms (limit {args.max_run_ms:.0f} ms)")
+    if heavy:
+        failures.append(f"import mission_four loads {', '.join(heavy)}")
+
+    print(f"import mission_four: {import_ms:8.1f} ms   heavy modules: {', '.join(heavy) or 'none'}")
+    print(f"mission_four.py run: {run_ms:8.1f} ms   (wall time, fresh interpreter)")
+    for failure in failures:
+        print(f"REGRESSION: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
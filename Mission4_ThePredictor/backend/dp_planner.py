@@ -0,0 +1,118 @@
+"""
+Dynamic-programming planner for WateringEnv.
+
+The environment is deterministic given the forecast, its only dynamic state is
+soil moisture in [0, 1], and there are 21 actions, so the optimal schedule can
+be computed directly instead of learned. Moisture is discretized on a fine
+grid and backward induction runs over (day, moisture, action) with NumPy: for
+every grid point and action, the next moisture and reward come from the same
+balance and shaped_reward as WateringEnv.step, and the continuation value is
+linearly interpolated on the next day's value function. Wilting is terminal.
+
+The schedule for a given start is then rolled forward one day at a time,
+picking the best action at the true (off-grid) moisture with the same
+one-step lookahead, so rewards and wilting checks are exact and only the
+continuation value is interpolated.
+"""
+
+import time
+
+import numpy as np
+
+from mission_four import replay_schedule, shaped_reward
+
+ACTION_SIZE = 21
+ACTION_MM = 0.5
+
+
+class DPPlan:
+    __slots__ = ('schedule_mm', 'total_water_mm', 'total_reward', 'moistures',
+                 'grid', 'values', 'policy', 'seconds')
+
+    def __init__(self, schedule_mm, total_water_mm, total_reward, moistures, grid, values, policy, seconds):
+        self.schedule_mm = schedule_mm        # Water per day (mm), shortened if the plant wilts
+        self.total_water_mm = total_water_mm
+        self.total_reward = total_reward      # Episode reward of the schedule in WateringEnv
+        self.moistures = moistures            # Moisture at day 0 and after each day
+        self.grid = grid                      # (grid_size,) moisture values
+        self.values = values                  # (days + 1, grid_size) optimal value from each day on
+        self.policy = policy                  # (days, grid_size) optimal action index
+        self.seconds = seconds
+
+
+def _interp_uniform(x, values):
+    """np.interp(x, linspace(0, 1, len(values)), values) without the binary search."""
+    pos = x * (len(values) - 1)
+    i = np.minimum(pos.astype(np.int64), len(values) - 2)
+    frac = pos - i
+    return values[i] * (1.0 - frac) + values[i + 1] * frac
+
+
+def _q_values(moisture, rain, et, next_values, water, wilting_point, saturation, gamma):
+    """(len(moisture), actions) Q-values for one day."""
+    # Same operation order as WateringEnv.step
+    next_moisture = np.clip(moisture[:, None] + (rain + water[None, :] - et) / 100.0, 0.0, 1.0)
+    reward, wilted = shaped_reward(next_moisture, water[None, :], wilting_point, saturation)
+    continuation = _interp_uniform(next_moisture, next_values)
+    return reward + gamma * np.where(wilted, 0.0, continuation)
+
+
+def backward_induction(rain, et, wilting_point=0.20, saturation=0.80, grid_size=2001, gamma=1.0):
+    """
+    Optimal value function and policy on a moisture grid.
+
+    Parameters:
+    - rain, et: per-day forecast (mm), one entry per simulated day.
+    - gamma: discount (1.0 optimizes the undiscounted episode reward).
+
+    Returns:
+    - (grid, values, policy) with values[d] the best reward obtainable from day d on.
+    """
+    rain = np.asarray(rain, dtype=np.float64)
+    et = np.asarray(et, dtype=np.float64)
+    days = len(rain)
+    grid = np.linspace(0.0, 1.0, grid_size)
+    water = np.arange(ACTION_SIZE) * ACTION_MM
+
+    values = np.zeros((days + 1, grid_size))
+    policy = np.zeros((days, grid_size), dtype=np.int16)
+    for day in reversed(range(days)):
+        q = _q_values(grid, rain[day], et[day], values[day + 1], water, wilting_point, saturation, gamma)
+        policy[day] = q.argmax(1)
+        values[day] = q[np.arange(grid_size), policy[day]]
+    return grid, values, policy
+
+
+def plan_schedule(env, start_moisture=None, grid_size=2001, gamma=1.0):
+    """
+    Optimal schedule for `env` (a WateringEnv) from start_moisture
+    (default: the env's current moisture).
+
+    Returns:
+    - A DPPlan.
+    """
+    started = time.perf_counter()
+    forecast = env.weather_forecast[:env.max_days]
+    rain = np.array(forecast.rain, dtype=np.float64)
+    et = np.array(forecast.et, dtype=np.float64)
+    if start_moisture is None:
+        start_moisture = env.moisture
+
+    grid, values, policy = backward_induction(rain, et, env.wilting_point, env.saturation, grid_size, gamma)
+
+    # Roll forward at the true moisture, re-deciding each day against the value function
+    water = np.arange(ACTION_SIZE) * ACTION_MM
+    moisture = float(start_moisture)
+    schedule = []
+    for day in range(len(rain)):
+        q = _q_values(np.array([moisture]), rain[day], et[day], values[day + 1], water,
+                      env.wilting_point, env.saturation, gamma)[0]
+        action = int(q.argmax())
+        schedule.append(action * ACTION_MM)
+        moisture = float(np.clip(moisture + (rain[day] + action * ACTION_MM - et[day]) / 100.0, 0.0, 1.0))
+        if moisture < env.wilting_point:
+            break
+
+    total_reward, moistures = replay_schedule(env, schedule, start_moisture)
+    return DPPlan(schedule, float(sum(schedule)), total_reward, moistures,
+                  grid, values, policy, time.perf_counter() - started)
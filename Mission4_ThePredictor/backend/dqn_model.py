@@ -0,0 +1,21 @@
+"""
+DQN network for the watering policy.
+
+Kept apart from mission_four.py so that importing the environment, planner or
+CLI does not load torch; mission_four.DQN resolves to this class on first use.
+"""
+
+import torch.nn as nn
+
+
+class DQN(nn.Module):
+    def __init__(self, state_size, action_size):
+        super().__init__()
+        self.net = nn.Sequential(
+            nn.Linear(state_size, 128), nn.ReLU(),
+            nn.Linear(128, 128), nn.ReLU(),
+            nn.Linear(128, action_size)
+        )
+
+    def forward(self, x):
+        return self.net(x)
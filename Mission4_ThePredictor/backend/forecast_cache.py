@@ -0,0 +1,73 @@
+"""
+Memoized, pre-serialized weekly forecast.
+
+The weekly forecast only depends on the local calendar day and on the plant
+configurations, so it is built once per (date, config version, horizon) and
+kept as ready-to-send JSON bytes with a content ETag and a Last-Modified time.
+A new day (local midnight) or a config version bump simply produces a new key,
+and the next request rebuilds it.
+"""
+
+import hashlib
+import threading
+from datetime import datetime
+
+
+class CachedForecast:
+    __slots__ = ('key', 'body', 'etag', 'last_modified')
+
+    def __init__(self, key, body, etag, last_modified):
+        self.key = key
+        self.body = body                  # Serialized JSON (bytes)
+        self.etag = etag                  # Quoted strong ETag
+        self.last_modified = last_modified  # Aware datetime, whole seconds
+
+
+class ForecastCache:
+    """
+    Parameters:
+    - build: fn(today: datetime, *params) -> JSON-serializable forecast for that day.
+    - serialize: fn(obj) -> bytes sent as the response body (e.g. what jsonify would send).
+    - clock: fn() -> local datetime (injectable for tests).
+    """
+
+    def __init__(self, build, serialize, clock=datetime.now):
+        self._build = build
+        self._serialize = serialize
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries = {}  # (date, config_version, *params) -> CachedForecast
+        self.stats = {'hits': 0, 'builds': 0}
+
+    def get(self, config_version, *params):
+        """Returns the CachedForecast for today, config_version and params, building it on a miss."""
+        now = self._clock()
+        key = (now.date(), config_version) + params
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.stats['hits'] += 1
+            return entry
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self.stats['hits'] += 1
+                return entry
+            previous = next((e for k, e in self._entries.items() if k[2:] == params), None)
+            body = self._serialize(self._build(now, *params))
+            etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+            if previous is not None and previous.etag == etag:
+                last_modified = previous.last_modified  # Same content: keep validators stable
+            else:
+                last_modified = datetime.fromtimestamp(int(now.timestamp())).astimezone()
+
+            # Entries of another day or config version can never be hit again
+            entries = {k: e for k, e in self._entries.items() if k[:2] == key[:2]}
+            entries[key] = CachedForecast(key, body, etag, last_modified)
+            self._entries = entries
+            self.stats['builds'] += 1
+            return entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries = {}
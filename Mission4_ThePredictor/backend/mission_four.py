@@ -3,28 +3,24 @@ import json
 import os
 import sys
 import math
-import csv
-from typing import List, Optional
+from typing import Optional
 
 import numpy as np
-import torch
-import torch.nn as nn
-import torch.optim as optim
 from collections import deque
 import random
-from tqdm import tqdm
 
-# Use a non-interactive backend for headless servers
-import matplotlib
-matplotlib.use("Agg")
-import matplotlib.pyplot as plt
+# torch, tqdm and matplotlib take seconds to import, so they are imported inside the
+# functions that need them (bench_startup.py guards the import time)
+from replay_memory import ArrayReplayMemory, PrioritizedReplayMemory
+from series_io import ArrayForecast, as_forecast, read_series, split_key
+from training_profiler import NULL_PROFILER, TrainingProfiler
 
 # -------------------------- Environment -------------------------
 class WateringEnv:
     def __init__(self, weather_forecast, crop_need,
                  initial_moisture=0.5,
                  wilting_point=0.20, saturation=0.80, max_days=7):
-        self.weather_forecast = weather_forecast
+        self.weather_forecast = as_forecast(weather_forecast)  # Read as rain / et arrays
         self.crop_need = crop_need
         self.wilting_point = wilting_point
         self.saturation = saturation
@@ -49,14 +45,12 @@ class WateringEnv:
         max_forecast_len = 7
         remaining_forecast_days = min(max_forecast_len, self.max_days - self.day)
 
-        rain = [self.weather_forecast[self.day + i]['rain']
-                for i in range(remaining_forecast_days)]
-        et = [self.weather_forecast[self.day + i]['et']
-              for i in range(remaining_forecast_days)]
-       
-        # Pad to max length (7 days of rain + 7 days of ET = 14)
-        flat = np.array(rain + et, dtype=np.float32)
-        flat = np.pad(flat, (0, 14 - len(flat)), constant_values=0.0)
+        window = slice(self.day, self.day + remaining_forecast_days)
+
+        # Remaining rain, then remaining ET, zero padded to max length (7 + 7 = 14)
+        flat = np.zeros(14, dtype=np.float32)
+        flat[:remaining_forecast_days] = self.weather_forecast.rain[window]
+        flat[remaining_forecast_days:2 * remaining_forecast_days] = self.weather_forecast.et[window]
        
         delta = self.moisture - self.prev_moisture
         return np.concatenate(([self.moisture, delta, self.crop_need], flat))
@@ -64,10 +58,11 @@ class WateringEnv:
     def step(self, action_idx):
         # 21 actions: 0.0, 0.5, 1.0, ..., 10.0 mm
         water = action_idx * 0.5
-        wth = self.weather_forecast[self.day]
+        rain = float(self.weather_forecast.rain[self.day])
+        et = float(self.weather_forecast.et[self.day])
 
         # Soil Moisture Balance: Rain + Irrigation - Evapotranspiration (ET)
-        delta = (wth['rain'] + water - wth['et']) / 100.0 # /100.0 to convert mm change to fraction of 1.0
+        delta = (rain + water - et) / 100.0 # /100.0 to convert mm change to fraction of 1.0
         self.prev_moisture = self.moisture
         self.moisture = np.clip(self.moisture + delta, 0.0, 1.0)
 
@@ -93,20 +88,163 @@ class WateringEnv:
         self.done = self.done or (self.day >= self.max_days)
         return self.get_state(), reward, self.done, {}
 
-# --------------------------- DQN Model -------------------------
-class DQN(nn.Module):
-    def __init__(self, state_size, action_size):
-        super().__init__()
-        self.net = nn.Sequential(
-            nn.Linear(state_size, 128), nn.ReLU(),
-            nn.Linear(128, 128), nn.ReLU(),
-            nn.Linear(128, action_size)
-        )
+def shaped_reward(moisture, water, wilting_point, saturation):
+    """
+    WateringEnv.step's reward for arrays of end-of-day moisture and water (mm).
+    Returns (reward, wilted); wilted marks the terminal states.
+    """
+    reward = -water * 0.1
+    reward = np.where(moisture < 0.30, reward - 50 * (0.30 - moisture) ** 2, reward)
+    wilted = moisture < wilting_point
+    reward = np.where(wilted, reward - 200, reward)
+    reward = np.where(moisture > saturation, reward - 10 * (moisture - saturation), reward)
+    return reward, wilted
+
+class BatchWateringEnv:
+    """
+    N independent WateringEnv copies stepped together with NumPy.
+
+    The forecast part of every possible state is precomputed once as a
+    (max_days + 1, 14) feature matrix (same layout as WateringEnv.get_state),
+    so a step is a handful of array operations for all environments. Finished
+    environments are reset automatically; the state they ended in is returned
+    in info['terminal_states'] and their episode return in info['episode_returns'].
+    """
+
+    def __init__(self, weather_forecast, crop_need, num_envs=8,
+                 initial_moisture=None,
+                 wilting_point=0.20, saturation=0.80, max_days=7):
+        self.num_envs = num_envs
+        self.crop_need = crop_need
+        self.wilting_point = wilting_point
+        self.saturation = saturation
+        self.max_days = max_days
+        self.initial_moisture = initial_moisture  # None: random in [0.3, 0.7) on every reset
+
+        forecast = as_forecast(weather_forecast)[:max_days]
+        rain = np.array(forecast.rain, dtype=np.float64)
+        et = np.array(forecast.et, dtype=np.float64)
+        self.rain, self.et = rain, et
+
+        # Row d = forecast features on day d: remaining rain, then remaining ET, zero padded to 14
+        features = np.zeros((max_days + 1, 14), dtype=np.float32)
+        for d in range(max_days + 1):
+            r = min(7, max_days - d)
+            features[d, :r] = rain[d:d + r]
+            features[d, r:2 * r] = et[d:d + r]
+        self.features = features.astype(np.float64)
+
+        self.moisture = np.zeros(num_envs)
+        self.prev_moisture = np.zeros(num_envs)
+        self.day = np.zeros(num_envs, dtype=np.int64)
+        self.returns = np.zeros(num_envs)
+        self.reset()
+
+    def _initial(self, n):
+        if self.initial_moisture is not None:
+            return np.full(n, float(self.initial_moisture))
+        return np.random.uniform(0.3, 0.7, size=n)
+
+    def reset(self, mask=None):
+        """Resets every environment (or those where mask is True); returns all states."""
+        if mask is None:
+            mask = np.ones(self.num_envs, dtype=bool)
+        start = self._initial(int(mask.sum()))
+        self.moisture[mask] = start
+        self.prev_moisture[mask] = start
+        self.day[mask] = 0
+        self.returns[mask] = 0.0
+        return self.get_states()
+
+    def get_states(self):
+        states = np.empty((self.num_envs, 17))
+        states[:, 0] = self.moisture
+        states[:, 1] = self.moisture - self.prev_moisture
+        states[:, 2] = self.crop_need
+        states[:, 3:] = self.features[self.day]
+        return states
+
+    def step(self, actions):
+        """Steps all environments with an (N,) array of action indices."""
+        water = np.asarray(actions) * 0.5
+        day = self.day
+
+        # Soil Moisture Balance: Rain + Irrigation - Evapotranspiration (ET)
+        delta = (self.rain[day] + water - self.et[day]) / 100.0
+        self.prev_moisture = self.moisture
+        m = self.moisture = np.clip(self.moisture + delta, 0.0, 1.0)
+
+        reward, wilted = shaped_reward(m, water, self.wilting_point, self.saturation)
+
+        self.day = day + 1
+        dones = wilted | (self.day >= self.max_days)
+        self.returns += reward
 
-    def forward(self, x):
-        return self.net(x)
+        info = {}
+        states = self.get_states()
+        if dones.any():
+            info['terminal_states'] = states[dones]
+            info['episode_returns'] = self.returns[dones]
+            states = self.reset(dones)
+        return states, reward, dones, info
+
+    def state_dict(self):
+        """Per-environment dynamic state (plain lists), e.g. for a training checkpoint."""
+        return {'moisture': self.moisture.tolist(), 'prev_moisture': self.prev_moisture.tolist(),
+                'day': self.day.tolist(), 'returns': self.returns.tolist()}
+
+    def load_state_dict(self, state):
+        self.moisture = np.array(state['moisture'], dtype=np.float64)
+        self.prev_moisture = np.array(state['prev_moisture'], dtype=np.float64)
+        self.day = np.array(state['day'], dtype=np.int64)
+        self.returns = np.array(state['returns'], dtype=np.float64)
+
+# --------------------------- DQN Model -------------------------
+# The torch network lives in dqn_model.py; `from mission_four import DQN` still works
+def __getattr__(name):
+    if name == "DQN":
+        from dqn_model import DQN
+        return DQN
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+class NumpyPolicy:
+    """
+    Forward pass of a saved DQN in NumPy (float32), for running a trained policy
+    without importing torch. Loaded from the .npz sidecar written by --save-model.
+    """
+
+    def __init__(self, layers):
+        self.layers = layers  # [(weight (out, in), bias (out,)), ...], ReLU between layers
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            count = int(data["num_layers"])
+            return cls([(data[f"w{i}"], data[f"b{i}"]) for i in range(count)])
+
+    def __call__(self, states):
+        x = np.asarray(states, dtype=np.float32)
+        for i, (weight, bias) in enumerate(self.layers):
+            x = x @ weight.T + bias
+            if i < len(self.layers) - 1:
+                x = np.maximum(x, 0.0)
+        return x
+
+    def act(self, state):
+        return int(self(state[None, :]).argmax(1)[0])
+
+def save_policy_npz(net, path):
+    """Writes the Linear layers of a DQN as float32 arrays for NumpyPolicy."""
+    linears = [m for m in net.net if hasattr(m, "weight")]
+    arrays = {"num_layers": np.array(len(linears))}
+    for i, layer in enumerate(linears):
+        arrays[f"w{i}"] = layer.weight.detach().cpu().numpy().astype(np.float32)
+        arrays[f"b{i}"] = layer.bias.detach().cpu().numpy().astype(np.float32)
+    np.savez(path, **arrays)
 
 # --------------------------- Replay Buffer --------------------
+# Deque-of-tuples buffer used before replay_memory.ArrayReplayMemory (kept as the
+# baseline for bench_replay.py)
 class ReplayBuffer:
     def __init__(self, capacity=100000):
         self.buf = deque(maxlen=capacity)
@@ -114,6 +252,10 @@ class ReplayBuffer:
     def push(self, *data):
         self.buf.append(tuple(data))
 
+    def push_batch(self, states, actions, rewards, next_states, dones):
+        """Stores one transition per row (one vectorized env step)."""
+        self.buf.extend(zip(states, actions, rewards, next_states, dones))
+
     def sample(self, batch_size):
         batch = random.sample(self.buf, batch_size)
         states, actions, rewards, next_states, dones = zip(*batch)
@@ -123,7 +265,62 @@ class ReplayBuffer:
         return len(self.buf)
 
 # --------------------------- Training Loop --------------------
-def train_dqn(env, episodes=10000, batch_size=128, tau=0.005, gamma=0.99, lr=3e-4, seed: Optional[int]=None, use_tqdm=True):
+def train_dqn(env, episodes=10000, batch_size=128, tau=0.005, gamma=0.99, lr=3e-4, seed: Optional[int]=None, use_tqdm=True,
+              num_envs=1, prioritized=False, memory=None, profiler=None, on_episode=None,
+              fused_step=False, target_update_every=1, checkpoint_dir=None, checkpoint_every=500,
+              checkpoint_keep=2, resume=False, warm_start=None, eps_start=1.0):
+    """
+    Double DQN training on `env`.
+
+    With num_envs > 1, experience is collected from a BatchWateringEnv holding
+    num_envs copies of `env` (one policy forward pass and one vectorized step
+    for all of them), with one gradient update per vectorized step. `episodes`
+    always counts finished episodes.
+
+    Transitions are kept in a replay_memory.ArrayReplayMemory, or a
+    PrioritizedReplayMemory (TD-error priorities, importance-weighted loss)
+    when prioritized=True. Pass `memory` to continue from a loaded buffer.
+
+    Pass a training_profiler.TrainingProfiler as `profiler` for per-phase
+    timings and throughput (the caller closes it).
+
+    on_episode(episode, episode_return) is called after every finished
+    episode; returning True stops training early (used by sweep.py).
+
+    fused_step=True runs the gradient step without per-step allocations:
+    batches are gathered straight into preallocated (pinned, on CUDA) input
+    tensors, gradients are zeroed in place, and Adam, gradient clipping and
+    the soft target update use multi-tensor (torch._foreach_*) kernels. The
+    arithmetic is unchanged, so for a fixed seed the losses and weights are
+    the same as with fused_step=False.
+
+    target_update_every=k applies the soft target update every k gradient
+    steps with tau' = 1 - (1 - tau)^k, which tracks the policy net at the same
+    rate as k updates with tau (k = 1 is the usual per-step update).
+
+    With checkpoint_dir, the full training state (networks, optimizer,
+    epsilon, counters, losses, RNG states, replay memory and vectorized env
+    state) is saved there every checkpoint_every episodes and at the end; see
+    training_checkpoint.py. resume=True continues from the latest checkpoint in
+    checkpoint_dir (if there is one) exactly as if training had not stopped;
+    `episodes` is the total, including the episodes already run. The
+    checkpoint's replay memory is used unless `memory` is passed.
+
+    warm_start is a policy state_dict to start from instead of random weights
+    (e.g. a policy trained for a similar crop/forecast); combine it with a
+    lower eps_start so the new run does not begin with random actions.
+    """
+    import torch
+    import torch.nn as nn
+    import torch.optim as optim
+    from tqdm import tqdm
+
+    import training_checkpoint
+    from dqn_model import DQN
+
+    if target_update_every < 1:
+        raise ValueError(f"target_update_every must be >= 1, got {target_update_every}.")
+
     if seed is not None:
         random.seed(seed)
         np.random.seed(seed)
@@ -137,18 +334,169 @@ def train_dqn(env, episodes=10000, batch_size=128, tau=0.005, gamma=0.99, lr=3e-
 
     policy_net = DQN(state_size, action_size).to(device)
     target_net = DQN(state_size, action_size).to(device)
+    if warm_start is not None:
+        policy_net.load_state_dict(warm_start)
     target_net.load_state_dict(policy_net.state_dict())
     target_net.eval()
 
-    optimizer = optim.Adam(policy_net.parameters(), lr=lr)
-    memory = ReplayBuffer(capacity=100000)
+    optimizer = optim.Adam(policy_net.parameters(), lr=lr, foreach=True if fused_step else None)
+    memory_cls = PrioritizedReplayMemory if prioritized else ArrayReplayMemory
+    checkpoint = training_checkpoint.latest_checkpoint(checkpoint_dir) if resume and checkpoint_dir else None
+    if memory is None:
+        memory = (training_checkpoint.load_memory(checkpoint, memory_cls) if checkpoint is not None
+                  else memory_cls(capacity=100000, state_size=state_size))
+    prioritized = isinstance(memory, PrioritizedReplayMemory)
     losses = []
+    loss_fn = nn.SmoothL1Loss(reduction='none' if prioritized else 'mean')
+
+    policy_params = list(policy_net.parameters())
+    target_params = list(target_net.parameters())
+    update_tau = tau if target_update_every == 1 else 1.0 - (1.0 - tau) ** target_update_every
+    keep_tau = 1.0 - update_tau
+    grad_steps = 0
+
+    if fused_step:
+        # Staging tensors the replay memory gathers into; pinned so the GPU copy can be async
+        pin = device.type == 'cuda'
+        host_inputs = (
+            torch.empty((batch_size, state_size), pin_memory=pin),
+            torch.empty(batch_size, dtype=torch.int64, pin_memory=pin),
+            torch.empty(batch_size, pin_memory=pin),
+            torch.empty((batch_size, state_size), pin_memory=pin),
+            torch.empty(batch_size, pin_memory=pin),
+        )
+        host_arrays = [t.numpy() for t in host_inputs]
+        inputs = tuple(torch.empty_like(t, device=device) for t in host_inputs) if pin else host_inputs
+        scaled_params = [torch.empty_like(p) for p in policy_params]
 
-    eps = 1.0
+    eps = eps_start
     eps_min = 0.05
     eps_decay = 0.9995 # Slower decay for more exploration
 
-    pbar = tqdm(range(episodes), desc="Training", disable=not use_tqdm)
+    prof = profiler or NULL_PROFILER
+    phase = prof.phase
+
+    benv = None
+    if num_envs > 1:
+        benv = BatchWateringEnv(env.weather_forecast, env.crop_need, num_envs=num_envs,
+                                wilting_point=env.wilting_point, saturation=env.saturation, max_days=env.max_days)
+
+    # Settings a checkpoint must have been trained with to be resumed exactly
+    config = {'batch_size': batch_size, 'tau': tau, 'gamma': gamma, 'lr': lr, 'num_envs': num_envs,
+              'prioritized': prioritized, 'target_update_every': target_update_every}
+    start_episode = 0
+    if checkpoint is not None:
+        state = training_checkpoint.load_state(checkpoint)
+        changed = [f"{k}={state['config'].get(k)} (now {v})" for k, v in config.items() if state['config'].get(k) != v]
+        if changed:
+            raise ValueError(f"Cannot resume {checkpoint}: it was trained with {', '.join(changed)}.")
+        policy_net.load_state_dict(state['policy'])
+        target_net.load_state_dict(state['target'])
+        optimizer.load_state_dict(state['optimizer'])
+        losses.extend(state['losses'])
+        eps, start_episode, grad_steps = state['eps'], state['episode'], state['grad_steps']
+        if benv is not None:
+            benv.load_state_dict(state['env'])
+        training_checkpoint.set_rng_state(state['rng'])  # Last: nothing may draw random numbers after it
+    last_saved = start_episode
+
+    def save_checkpoint(done_before, done_after, eps, final=False):
+        """Saves the training state when done_after crosses a multiple of checkpoint_every, and at the end."""
+        nonlocal last_saved
+        crossed = checkpoint_every and done_after // checkpoint_every > done_before // checkpoint_every
+        if not checkpoint_dir or done_after == last_saved or not (crossed or final):
+            return
+        with phase('checkpoint'):
+            training_checkpoint.save_checkpoint(checkpoint_dir, done_after, {
+                'config': config,
+                'episode': done_after,
+                'eps': eps,
+                'grad_steps': grad_steps,
+                'policy': policy_net.state_dict(),
+                'target': target_net.state_dict(),
+                'optimizer': optimizer.state_dict(),
+                'losses': losses,
+                'env': benv.state_dict() if benv is not None else None,
+                'rng': training_checkpoint.rng_state(),
+            }, memory, keep=checkpoint_keep)
+        last_saved = done_after
+
+    def soft_update():
+        if fused_step:
+            # Same operations as the loop below, one multi-tensor kernel each
+            with torch.no_grad():
+                torch._foreach_copy_(scaled_params, policy_params)
+                torch._foreach_mul_(scaled_params, update_tau)
+                torch._foreach_mul_(target_params, keep_tau)
+                torch._foreach_add_(target_params, scaled_params)
+        else:
+            for target_param, policy_param in zip(target_params, policy_params):
+                target_param.data.copy_(update_tau * policy_param.data + keep_tau * target_param.data)
+
+    def optimize():
+        nonlocal grad_steps
+        with phase('sample'):
+            if fused_step:
+                idx, weights = memory.sample_indices(batch_size)
+                memory.gather_into(idx, host_arrays)
+            else:
+                batch = memory.sample(batch_size)
+                idx, weights = batch[5:] if prioritized else (None, None)
+
+        # Wrap the sampled arrays as tensors (already float32 / int64, no copy on CPU)
+        with phase('to_tensor'):
+            if fused_step:
+                if pin:
+                    for dst, src in zip(inputs, host_inputs):
+                        dst.copy_(src, non_blocking=True)
+                s, a, r, ns, d = inputs
+            else:
+                s, a, r, ns, d = (torch.from_numpy(x).to(device) for x in batch[:5])
+            a = a.unsqueeze(1)
+
+        with phase('forward'):
+            # Double DQN (Standard implementation)
+            with torch.no_grad():
+                # Select best action from POLICY net for next state
+                next_actions = policy_net(ns).argmax(1, keepdim=True)
+                # Evaluate best action using TARGET net
+                next_q = target_net(ns).gather(1, next_actions).squeeze(1)
+                target = r + gamma * next_q * (1 - d)
+
+            current_q = policy_net(s).gather(1, a).squeeze(1)
+            loss = loss_fn(current_q, target)
+            if prioritized:
+                loss = (loss * torch.from_numpy(weights).to(device)).mean()
+
+        if prioritized:
+            with phase('priority_update'):
+                memory.update_priorities(idx, (current_q - target).detach().abs().cpu().numpy())
+
+        with phase('backward'):
+            optimizer.zero_grad(set_to_none=not fused_step)
+            loss.backward()
+            torch.nn.utils.clip_grad_norm_(policy_params, 1.0, foreach=True if fused_step else None)
+
+        with phase('optimizer'):
+            optimizer.step()
+
+        # Soft target update
+        grad_steps += 1
+        if grad_steps % target_update_every == 0:
+            with phase('target_update'):
+                soft_update()
+
+        losses.append(loss.item())
+        prof.count(grad_steps=1)
+
+    if benv is not None:
+        _collect_vectorized(benv, episodes, policy_net, memory, optimize, batch_size, action_size, device,
+                            eps, eps_min, eps_decay, losses, use_tqdm, prof, on_episode, start_episode, save_checkpoint)
+        return policy_net, losses
+
+    pbar = tqdm(range(start_episode, episodes), desc="Training", initial=start_episode, total=episodes,
+                disable=not use_tqdm)
+    done_episodes = start_episode
 
     for ep in pbar:
         state = env.reset()
@@ -156,75 +504,128 @@ def train_dqn(env, episodes=10000, batch_size=128, tau=0.005, gamma=0.99, lr=3e-
         done = False
 
         while not done:
-            state_t = torch.FloatTensor(state).unsqueeze(0).to(device)
-
-            if random.random() < eps:
-                action = random.randint(0, action_size - 1)
-            else:
-                with torch.no_grad():
-                    action = policy_net(state_t).argmax(1).item()
-
-            next_state, reward, done, _ = env.step(action)
-            memory.push(state, action, reward, next_state, done)
+            with phase('act'):
+                state_t = torch.FloatTensor(state).unsqueeze(0).to(device)
+
+                if random.random() < eps:
+                    action = random.randint(0, action_size - 1)
+                else:
+                    with torch.no_grad():
+                        action = policy_net(state_t).argmax(1).item()
+
+            with phase('env_step'):
+                next_state, reward, done, _ = env.step(action)
+            with phase('buffer_push'):
+                memory.push(state, action, reward, next_state, done)
+            prof.count(env_steps=1)
             state = next_state
             total_r += reward
 
             if len(memory) >= batch_size:
-                s, a, r, ns, d = memory.sample(batch_size)
-               
-                # Convert to Tensors
-                s = torch.FloatTensor(s).to(device)
-                ns = torch.FloatTensor(ns).to(device)
-                a = torch.LongTensor(a).to(device).unsqueeze(1)
-                r = torch.FloatTensor(r).to(device)
-                d = torch.FloatTensor(d).to(device)
-
-                # Double DQN (Standard implementation)
-                with torch.no_grad():
-                    # Select best action from POLICY net for next state
-                    next_actions = policy_net(ns).argmax(1, keepdim=True)
-                    # Evaluate best action using TARGET net
-                    next_q = target_net(ns).gather(1, next_actions).squeeze(1)
-                    target = r + gamma * next_q * (1 - d)
-
-                current_q = policy_net(s).gather(1, a).squeeze(1)
-                loss = nn.SmoothL1Loss()(current_q, target)
-
-                optimizer.zero_grad()
-                loss.backward()
-                torch.nn.utils.clip_grad_norm_(policy_net.parameters(), 1.0)
-                optimizer.step()
-
-                # Soft target update
-                for target_param, policy_param in zip(target_net.parameters(), policy_net.parameters()):
-                    target_param.data.copy_(tau * policy_param.data + (1.0 - tau) * target_param.data)
-
-                losses.append(loss.item())
+                optimize()
 
         eps = max(eps_min, eps * eps_decay)
+        prof.end_episodes(1)
+        done_episodes = ep + 1
+        save_checkpoint(ep, done_episodes, eps)
+        if on_episode is not None and on_episode(ep, float(total_r)):
+            break
 
         if use_tqdm and ep % 100 == 0:
             pbar.set_postfix({
                 'R': f'{total_r:+.1f}',
                 'ε': f'{eps:.3f}',
-                'L': f'{np.mean(losses[-100:]):.3f}' if losses else ''
+                'L': f'{np.mean(losses[-100:]):.3f}' if losses else '',
+                **prof.postfix()
             })
 
+    save_checkpoint(done_episodes, done_episodes, eps, final=True)
     return policy_net, losses
 
+def _collect_vectorized(benv, episodes, policy_net, memory, optimize, batch_size, action_size, device,
+                        eps, eps_min, eps_decay, losses, use_tqdm, prof, on_episode, start_episode, save_checkpoint):
+    """
+    train_dqn's loop over a BatchWateringEnv; epsilon decays once per finished episode.
+    A resumed run (start_episode > 0) continues from benv's restored state.
+    """
+    import torch
+    from tqdm import tqdm
+
+    phase = prof.phase
+    num_envs = benv.num_envs
+    states = benv.get_states() if start_episode else benv.reset()
+    finished = start_episode
+    last_r = 0.0
+    pbar = tqdm(total=episodes, initial=min(start_episode, episodes), desc="Training", disable=not use_tqdm)
+
+    while finished < episodes:
+        # Greedy actions for all envs in one forward pass, then per-env epsilon exploration
+        with phase('act'):
+            with torch.no_grad():
+                actions = policy_net(torch.FloatTensor(states).to(device)).argmax(1).cpu().numpy()
+            explore = np.random.random(num_envs) < eps
+            actions[explore] = np.random.randint(0, action_size, size=int(explore.sum()))
+
+        with phase('env_step'):
+            next_states, rewards, dones, info = benv.step(actions)
+        with phase('buffer_push'):
+            stored_next = next_states
+            if dones.any():
+                stored_next = next_states.copy()
+                stored_next[dones] = info['terminal_states']  # Learn from the real last state, not the reset one
+            memory.push_batch(states, actions, rewards, stored_next, dones)
+        prof.count(env_steps=num_envs)
+        states = next_states
+
+        if len(memory) >= batch_size:
+            optimize()
+
+        n_done = int(dones.sum())
+        if n_done:
+            eps = max(eps_min, eps * eps_decay ** n_done)
+            last_r = float(info['episode_returns'][-1])
+            before = finished
+            finished += n_done
+            prof.end_episodes(n_done)
+            save_checkpoint(before, finished, eps)
+            pbar.update(min(finished, episodes) - before)
+            if use_tqdm and before // 100 != finished // 100:
+                pbar.set_postfix({
+                    'R': f'{last_r:+.1f}',
+                    'ε': f'{eps:.3f}',
+                    'L': f'{np.mean(losses[-100:]):.3f}' if losses else '',
+                    **prof.postfix()
+                })
+            if on_episode is not None:
+                returns = info['episode_returns'].tolist()
+                if any([on_episode(before + i, r) for i, r in enumerate(returns)]):
+                    break
+
+    save_checkpoint(finished, finished, eps, final=True)
+    pbar.close()
+
 # --------------------- Policy Runner ---------------------
 def run_policy(env, net, start_moisture=0.5):
+    """Greedy rollout of a DQN (torch module) or a NumpyPolicy."""
     env.reset(start_moisture)
     state = env.get_state()
     schedule = []
     total_water = 0.0
     moistures = [env.moisture] # Initial moisture at Day 0
-    device = next(net.parameters()).device
+    if isinstance(net, NumpyPolicy):
+        act = net.act
+    else:
+        import torch
+
+        device = next(net.parameters()).device
+
+        def act(state):
+            s_t = torch.FloatTensor(state).unsqueeze(0).to(device)
+            with torch.no_grad():
+                return net(s_t).argmax(1).item()
 
     while not env.done:
-        s_t = torch.FloatTensor(state).unsqueeze(0).to(device)
-        with torch.no_grad():
-            action_idx = net(s_t).argmax(1).item()
+        action_idx = act(state)
        
         water = action_idx * 0.5
         schedule.append(water)
@@ -238,139 +639,318 @@ def run_policy(env, net, start_moisture=0.5):
 
     return schedule, total_water, moistures
 
+def replay_schedule(env, schedule_mm, start_moisture):
+    """
+    Steps `env` through a fixed schedule (mm per day) from start_moisture.
+    Returns (total reward, moistures); stops early if the plant wilts.
+    """
+    env.reset(start_moisture)
+    total_reward = 0.0
+    moistures = [env.moisture]
+    for water in schedule_mm:
+        if env.done:
+            break
+        _, reward, _, _ = env.step(int(round(water / 0.5)))
+        total_reward += reward
+        moistures.append(env.moisture)
+    return float(total_reward), moistures
+
 # --------------------- Helpers to parse inputs ---------------------
-def parse_series_arg(arg: str) -> List[float]:
-    # Accept "1,2,3", path.json, or path.csv (single column or with header)
+def parse_series_arg(arg: str, start: int = 0, length: Optional[int] = None) -> np.ndarray:
+    """
+    Values [start, start + length) of a series as a float64 array.
+
+    Accepts "1,2,3", or a file: .csv (single column or with header),
+    .ndjson/.jsonl, .json, .npy or .npz; "file.npz:rain" picks an array (or a
+    JSON / NDJSON field). Files are read through series_io, which streams
+    CSV / NDJSON and memory-maps .npy / .npz, so only the window is loaded.
+    """
     arg = arg.strip()
-    if os.path.isfile(arg):
-        if arg.lower().endswith(".json"):
-            with open(arg, "r", encoding="utf-8") as f:
-                data = json.load(f)
-            # If the JSON is just a list, return it; if it has a key "et" assume that
-            if isinstance(data, list):
-                return [float(x) for x in data]
-            elif isinstance(data, dict):
-                # pick first list field
-                for key in ("et","rain","series","data"):
-                    if key in data and isinstance(data[key], list):
-                        return [float(x) for x in data[key]]
-                raise ValueError("JSON file must contain a list or a key with a list (e.g., 'et').")
-            else:
-                raise ValueError("Unsupported JSON format for series.")
-        elif arg.lower().endswith(".csv"):
-            vals = []
-            with open(arg, newline='', encoding="utf-8") as f:
-                reader = csv.reader(f)
-                for row in reader:
-                    # skip empty lines
-                    row = [c for c in row if c.strip() != ""]
-                    if not row:
-                        continue
-                    # take first numeric cell
-                    vals.append(float(row[0]))
-            if not vals:
-                raise ValueError("CSV appears empty.")
-            return vals
-        else:
-            raise ValueError("Only .json or .csv files are supported for series input.")
+    path, key = split_key(arg)
+    if os.path.isfile(path):
+        return read_series(path, key, start=start, length=length)
     # Comma/space separated inline list
     parts = [p for p in arg.replace(";", ",").replace("|", ",").replace(" ", ",").split(",") if p.strip() != ""]
     if not parts:
         raise ValueError("Empty series.")
-    return [float(p) for p in parts]
+    end = None if length is None else start + length
+    return np.array([float(p) for p in parts[start:end]], dtype=np.float64)
 
-def make_forecast(et: List[float], rain: Optional[List[float]], max_days: Optional[int]) -> List[dict]:
+def make_forecast(et, rain, max_days: Optional[int]) -> ArrayForecast:
+    """First max_days days (default: all of ET) of the ET and rain series (no rain if None)."""
     if max_days is None:
         max_days = len(et)
     if rain is None:
-        rain = [0.0] * max_days
+        rain = np.zeros(max_days)
     if len(et) < max_days:
         raise ValueError(f"ET length ({len(et)}) shorter than max_days ({max_days}).")
     if len(rain) < max_days:
         raise ValueError(f"Rain length ({len(rain)}) shorter than max_days ({max_days}).")
-    return [{'rain': float(rain[i]), 'et': float(et[i])} for i in range(max_days)]
+    return ArrayForecast(et[:max_days], rain[:max_days])
+
+# --------------------- Output ---------------------
+def save_moisture_plot(path, moistures, env, title):
+    # Use a non-interactive backend for headless servers
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    plt.figure(figsize=(9,5))
+    days = list(range(len(moistures)))
+    plt.plot(days, moistures, 'o-', label='Soil Moisture', color='blue')
+    plt.axhspan(env.wilting_point, env.saturation, color='lightgreen', alpha=0.3, label='Comfort Zone')
+    plt.axhline(env.wilting_point, color='red', linestyle='--', label='Wilting Point')
+    plt.axhline(env.saturation, color='orange', linestyle='--', label='Saturation')
+    plt.title(title)
+    plt.xlabel("Day")
+    plt.ylabel("Moisture Level")
+    plt.xticks(days)
+    plt.legend()
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    plt.savefig(path, dpi=150)
+    plt.close()
+
+def write_result(result, json_out):
+    out_str = json.dumps(result)
+    if json_out:
+        with open(json_out, "w", encoding="utf-8") as f:
+            f.write(out_str)
+    else:
+        print(out_str)
+
+def load_saved_policy(path):
+    """
+    NumpyPolicy from a .npz, or from the .npz next to a .pt unless the .pt is
+    newer (e.g. retrained or copied over without its sidecar); otherwise the
+    torch checkpoint itself (imports torch).
+    """
+    npz_path = os.path.splitext(path)[0] + ".npz"
+    if os.path.isfile(npz_path):
+        if npz_path == path or not os.path.isfile(path):
+            return NumpyPolicy.load(npz_path)
+        if os.stat(npz_path).st_mtime_ns >= os.stat(path).st_mtime_ns:
+            return NumpyPolicy.load(npz_path)
+        print(f"Ignoring {npz_path}: older than {path}.", file=sys.stderr)
+
+    import torch
+    from dqn_model import DQN
+
+    checkpoint = torch.load(path, map_location="cpu", weights_only=True)
+    net = DQN(checkpoint["state_size"], checkpoint["action_size"])
+    net.load_state_dict(checkpoint["state_dict"])
+    net.eval()
+    return net
+
+def run_main(argv):
+    """`mission_four.py run`: schedule from a saved policy, without training (starts without torch)."""
+    ap = argparse.ArgumentParser(prog="mission_four.py run", description="Run a saved DQN watering policy.")
+    ap.add_argument("--model", type=str, required=True, help="Saved policy: .npz sidecar or .pt checkpoint from --save-model.")
+    ap.add_argument("--crop-need", type=float, required=True, help="Crop need (e.g., 3.0).")
+    ap.add_argument("--et", type=str, required=True, help="ET time-series: '5,5,5' or path to .csv/.ndjson/.json/.npy/.npz[:key]")
+    ap.add_argument("--rain", type=str, default=None, help="Rain time-series (optional): '0,0,0' or path to .csv/.ndjson/.json/.npy/.npz[:key]")
+    ap.add_argument("--initial-moisture", type=float, default=0.5, help="Initial soil moisture fraction [0..1].")
+    ap.add_argument("--max-days", type=int, default=None, help="Simulation days (defaults to len(ET)).")
+    ap.add_argument("--start-day", type=int, default=0,
+                    help="First day of the ET/rain series to simulate (only this window is read from files).")
+    ap.add_argument("--save-plot", type=str, default=None, help="Path to save moisture plot (PNG).")
+    ap.add_argument("--json-out", type=str, default=None, help="Path to write JSON result; defaults to stdout.")
+    args = ap.parse_args(argv)
+
+    et_list = parse_series_arg(args.et, args.start_day, args.max_days)
+    rain_list = parse_series_arg(args.rain, args.start_day, args.max_days) if args.rain else None
+    forecast = make_forecast(et_list, rain_list, args.max_days)
+    env = WateringEnv(forecast, crop_need=args.crop_need, initial_moisture=args.initial_moisture, max_days=len(forecast))
+
+    policy = load_saved_policy(args.model)
+    schedule, total_water, moistures = run_policy(env, policy, start_moisture=args.initial_moisture)
+    total_reward, _ = replay_schedule(env, schedule, args.initial_moisture)
+
+    if args.save_plot:
+        save_moisture_plot(args.save_plot, moistures, env, "Soil Moisture Trajectory (Saved Policy)")
+
+    write_result({
+        "schedule_mm": schedule,
+        "total_water_mm": round(float(total_water), 3),
+        "final_moisture": round(float(moistures[-1]), 4),
+        "days": len(forecast),
+        "total_reward": round(total_reward, 4),
+        "model": args.model
+    }, args.json_out)
 
 # --------------------- CLI ---------------------
-def main():
-    ap = argparse.ArgumentParser(description="Train and run a DQN watering policy.")
+def _train_from_args(args, env):
+    """train_dqn with the CLI's replay buffer, checkpoints, profiler and training options."""
+    import training_checkpoint
+
+    # Replay buffer: from the checkpoint being resumed, continued from disk, or created here
+    # when it has to be saved afterwards
+    memory_cls = PrioritizedReplayMemory if args.prioritized else ArrayReplayMemory
+    memory = None
+    checkpoint = training_checkpoint.latest_checkpoint(args.checkpoint_dir) if args.resume else None
+    if checkpoint is not None:
+        memory = training_checkpoint.load_memory(checkpoint, memory_cls)
+        print(f"Resuming from {checkpoint}", file=sys.stderr)
+    elif args.load_replay:
+        memory = memory_cls.load(args.load_replay)
+    elif args.save_replay:
+        memory = memory_cls(capacity=100000, state_size=len(env.get_state()))
+
+    warm_start = training_checkpoint.load_policy_weights(args.warm_start) if args.warm_start else None
+    eps_start = args.eps_start if args.eps_start is not None else (0.3 if warm_start is not None else 1.0)
+
+    profiler = None
+    if args.profile or args.profile_torch:
+        profiler = TrainingProfiler(args.profile, log_every=args.profile_every, torch_trace_dir=args.profile_torch)
+
+    policy_net, loss_history = train_dqn(
+        env,
+        episodes=args.episodes,
+        batch_size=args.batch_size,
+        tau=args.tau,
+        gamma=args.gamma,
+        lr=args.lr,
+        seed=args.seed,
+        use_tqdm=not args.no_tqdm and sys.stdout.isatty(),
+        num_envs=args.num_envs,
+        prioritized=args.prioritized,
+        memory=memory,
+        profiler=profiler,
+        fused_step=args.fused_step,
+        target_update_every=args.target_update_every,
+        checkpoint_dir=args.checkpoint_dir,
+        checkpoint_every=args.checkpoint_every,
+        resume=args.resume,
+        warm_start=warm_start,
+        eps_start=eps_start
+    )
+    if profiler:
+        summary = profiler.close()
+        print(f"Profile: {summary['env_steps_per_s']:.0f} env steps/s, {summary['grad_steps_per_s']:.0f} grad steps/s"
+              + (f" -> {args.profile}" if args.profile else ""), file=sys.stderr)
+
+    if args.save_replay:
+        memory.save(args.save_replay)
+
+    return policy_net, loss_history
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["run"]:
+        return run_main(argv[1:])
+
+    ap = argparse.ArgumentParser(description="Train and run a DQN watering policy (or `run` a saved one).")
     ap.add_argument("--crop-need", type=float, required=True, help="Crop need (e.g., 3.0).")
-    ap.add_argument("--et", type=str, required=True, help="ET time-series: '5,5,5' or path to .json/.csv")
-    ap.add_argument("--rain", type=str, default=None, help="Rain time-series (optional): '0,0,0' or path to .json/.csv")
+    ap.add_argument("--et", type=str, required=True, help="ET time-series: '5,5,5' or path to .csv/.ndjson/.json/.npy/.npz[:key]")
+    ap.add_argument("--rain", type=str, default=None, help="Rain time-series (optional): '0,0,0' or path to .csv/.ndjson/.json/.npy/.npz[:key]")
     ap.add_argument("--initial-moisture", type=float, default=0.5, help="Initial soil moisture fraction [0..1].")
     ap.add_argument("--max-days", type=int, default=None, help="Simulation days (defaults to len(ET)).")
+    ap.add_argument("--start-day", type=int, default=0,
+                    help="First day of the ET/rain series to simulate (only this window is read from files).")
     ap.add_argument("--episodes", type=int, default=1000, help="Training episodes.")
     ap.add_argument("--batch-size", type=int, default=128, help="Batch size.")
     ap.add_argument("--tau", type=float, default=0.005, help="Soft target update factor.")
     ap.add_argument("--gamma", type=float, default=0.99, help="Discount factor.")
     ap.add_argument("--lr", type=float, default=3e-4, help="Learning rate.")
+    ap.add_argument("--num-envs", type=int, default=1, help="Environments stepped together during training (vectorized when > 1).")
+    ap.add_argument("--prioritized", action="store_true", help="Prioritized experience replay (sum-tree).")
+    ap.add_argument("--fused-step", action="store_true",
+                    help="Allocation-free gradient step with multi-tensor Adam/clipping/target update (same results).")
+    ap.add_argument("--target-update-every", type=int, default=1,
+                    help="Gradient steps between soft target updates (tau is rescaled to keep the same tracking rate).")
+    ap.add_argument("--load-replay", type=str, default=None, help="Directory of a saved replay buffer to continue from.")
+    ap.add_argument("--save-replay", type=str, default=None, help="Directory to save the replay buffer to after training.")
+    ap.add_argument("--checkpoint-dir", type=str, default=None,
+                    help="Directory for periodic checkpoints of the full training state (incl. replay buffer).")
+    ap.add_argument("--checkpoint-every", type=int, default=500, help="Episodes between two checkpoints (0: only at the end).")
+    ap.add_argument("--resume", action="store_true",
+                    help="Continue from the latest checkpoint in --checkpoint-dir (starts fresh if there is none).")
+    ap.add_argument("--warm-start", type=str, default=None,
+                    help="Initialize from a trained policy (.pt from --save-model, or a checkpoint directory).")
+    ap.add_argument("--eps-start", type=float, default=None,
+                    help="Initial exploration rate (default 1.0, or 0.3 with --warm-start).")
+    ap.add_argument("--profile", type=str, nargs="?", const="train_profile.jsonl", default=None,
+                    help="Write per-phase training timings as JSON lines (default file: train_profile.jsonl).")
+    ap.add_argument("--profile-every", type=int, default=100, help="Episodes between two --profile records.")
+    ap.add_argument("--profile-torch", type=str, default=None, help="Directory for torch.profiler traces (TensorBoard format).")
+    ap.add_argument("--planner", choices=["dqn", "dp"], default="dqn",
+                    help="dqn: train a DQN policy; dp: exact dynamic-programming schedule (no training).")
+    ap.add_argument("--dp-grid", type=int, default=2001, help="Moisture grid points for --planner dp.")
+    ap.add_argument("--sweep", type=str, default=None, help="Hyperparameter sweep spec (JSON file or inline JSON); see sweep.py.")
+    ap.add_argument("--workers", type=int, default=None, help="Sweep worker processes (default: one per CPU).")
+    ap.add_argument("--sweep-out", type=str, default="sweep_results.csv", help="Ranked sweep results table (CSV).")
     ap.add_argument("--seed", type=int, default=None, help="Random seed.")
     ap.add_argument("--save-model", type=str, default=None, help="Path to save trained model (.pt).")
     ap.add_argument("--save-plot", type=str, default=None, help="Path to save moisture plot (PNG).")
     ap.add_argument("--no-tqdm", action="store_true", help="Disable progress bar.")
     ap.add_argument("--json-out", type=str, default=None, help="Path to write JSON result; defaults to stdout.")
-    args = ap.parse_args()
+    args = ap.parse_args(argv)
+    if args.resume and not args.checkpoint_dir:
+        ap.error("--resume needs --checkpoint-dir.")
 
-    et_list = parse_series_arg(args.et)
-    rain_list = parse_series_arg(args.rain) if args.rain else None
+    et_list = parse_series_arg(args.et, args.start_day, args.max_days)
+    rain_list = parse_series_arg(args.rain, args.start_day, args.max_days) if args.rain else None
     forecast = make_forecast(et_list, rain_list, args.max_days)
     max_days = len(forecast)
 
+    if args.sweep:
+        from sweep import load_spec, run_sweep
+
+        base = {
+            'forecast': forecast,
+            'crop_need': args.crop_need,
+            'initial_moisture': args.initial_moisture,
+            'train': {'episodes': args.episodes, 'batch_size': args.batch_size, 'tau': args.tau, 'gamma': args.gamma,
+                      'lr': args.lr, 'num_envs': args.num_envs, 'prioritized': args.prioritized,
+                      'fused_step': args.fused_step, 'target_update_every': args.target_update_every},
+        }
+        ranked = run_sweep(load_spec(args.sweep), base, workers=args.workers, out_path=args.sweep_out)
+        print(json.dumps({"best": ranked[0], "trials": len(ranked), "table": args.sweep_out}))
+        return
+
     env = WateringEnv(forecast, crop_need=args.crop_need, initial_moisture=args.initial_moisture, max_days=max_days)
 
-    policy_net, loss_history = train_dqn(
-        env,
-        episodes=args.episodes,
-        batch_size=args.batch_size,
-        tau=args.tau,
-        gamma=args.gamma,
-        lr=args.lr,
-        seed=args.seed,
-        use_tqdm=not args.no_tqdm and sys.stdout.isatty()
-    )
+    if args.planner == "dp":
+        from dp_planner import plan_schedule
+
+        plan = plan_schedule(env, args.initial_moisture, grid_size=args.dp_grid)
+        schedule, total_water, moistures = plan.schedule_mm, plan.total_water_mm, plan.moistures
+        loss_history = []
+        if args.save_model:
+            print("--save-model is ignored with --planner dp (no network is trained).", file=sys.stderr)
+    else:
+        policy_net, loss_history = _train_from_args(args, env)
+        schedule, total_water, moistures = run_policy(env, policy_net, start_moisture=args.initial_moisture)
 
-    schedule, total_water, moistures = run_policy(env, policy_net, start_moisture=args.initial_moisture)
+        # Optionally save model (plus a NumPy copy of the weights for the fast `run` command)
+        if args.save_model:
+            import torch
 
-    # Optionally save model
-    if args.save_model:
-        torch.save({
-            "state_dict": policy_net.state_dict(),
-            "state_size": len(env.get_state()),
-            "action_size": 21,
-        }, args.save_model)
+            torch.save({
+                "state_dict": policy_net.state_dict(),
+                "state_size": len(env.get_state()),
+                "action_size": 21,
+            }, args.save_model)
+            save_policy_npz(policy_net, os.path.splitext(args.save_model)[0] + ".npz")
+    total_reward, _ = replay_schedule(env, schedule, args.initial_moisture)
 
     # Optionally save plot
     if args.save_plot:
-        plt.figure(figsize=(9,5))
-        days = list(range(len(moistures)))
-        plt.plot(days, moistures, 'o-', label='Soil Moisture', color='blue')
-        plt.axhspan(env.wilting_point, env.saturation, color='lightgreen', alpha=0.3, label='Comfort Zone')
-        plt.axhline(env.wilting_point, color='red', linestyle='--', label='Wilting Point')
-        plt.axhline(env.saturation, color='orange', linestyle='--', label='Saturation')
-        plt.title("Soil Moisture Trajectory (Learned Policy)")
-        plt.xlabel("Day")
-        plt.ylabel("Moisture Level")
-        plt.xticks(days)
-        plt.legend()
-        plt.grid(True, alpha=0.3)
-        plt.tight_layout()
-        plt.savefig(args.save_plot, dpi=150)
-        plt.close()
+        save_moisture_plot(args.save_plot, moistures, env,
+                           "Soil Moisture Trajectory (DP Planner)" if args.planner == "dp" else "Soil Moisture Trajectory (Learned Policy)")
 
     result = {
         "schedule_mm": schedule,
         "total_water_mm": round(float(total_water), 3),
         "final_moisture": round(float(moistures[-1]), 4),
         "avg_loss_last_500": (float(np.mean(loss_history[-500:])) if loss_history else None),
-        "episodes": args.episodes,
-        "days": max_days
+        "episodes": args.episodes if args.planner == "dqn" else 0,
+        "days": max_days,
+        "planner": args.planner,
+        "total_reward": round(total_reward, 4)
     }
 
-    out_str = json.dumps(result)
-    if args.json_out:
-        with open(args.json_out, "w", encoding="utf-8") as f:
-            f.write(out_str)
-    else:
-        print(out_str)
+    write_result(result, args.json_out)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,248 @@
+"""
+Batched inference for trained DQN watering policies.
+
+A checkpoint written by `mission_four.py --save-model` is loaded once per
+(path, TorchScript flag) and cached; it is reloaded only when the file's
+mtime changes. rollout_schedules() runs the greedy policy for many fields at
+once: each simulated day is one forward pass over all fields still alive,
+with the same moisture balance, wilting stop and state layout as
+WateringEnv / run_policy, so the schedules are identical to run_policy's.
+
+MicroBatcher groups requests arriving concurrently from server threads into
+one rollout (up to max_batch fields, waiting at most max_wait seconds for
+more), so many small requests share a single forward pass per day.
+"""
+
+import os
+import threading
+import time
+import warnings
+from concurrent.futures import Future
+
+import numpy as np
+import torch
+
+from mission_four import DQN
+
+WILTING_POINT = 0.20  # WateringEnv defaults
+ACTION_MM = 0.5       # Action index i waters i * 0.5 mm
+
+_models = {}  # (realpath, torchscript) -> (mtime_ns, model)
+_models_lock = threading.Lock()
+
+
+def load_policy(path, torchscript=False):
+    """
+    Returns the eval-mode policy network stored at `path` (cached).
+
+    Parameters:
+    - torchscript: trace and freeze the network with TorchScript (lower
+      per-call overhead for the small MLP).
+    """
+    key = (os.path.realpath(path), bool(torchscript))
+    mtime = os.stat(key[0]).st_mtime_ns
+    with _models_lock:
+        cached = _models.get(key)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        checkpoint = torch.load(key[0], map_location='cpu', weights_only=True)
+        model = DQN(checkpoint['state_size'], checkpoint['action_size'])
+        model.load_state_dict(checkpoint['state_dict'])
+        model.eval()
+        model.state_size = checkpoint['state_size']
+        if torchscript:
+            state_size = model.state_size
+            with torch.no_grad(), warnings.catch_warnings():
+                warnings.simplefilter('ignore', FutureWarning)  # Newer torch flags TorchScript as deprecated
+                model = torch.jit.freeze(torch.jit.trace(model, torch.zeros(1, state_size)))
+            model.state_size = state_size
+
+        _models[key] = (mtime, model)
+        return model
+
+
+def forecast_features(rain, et):
+    """
+    Forecast part of the state for every field and day, laid out like
+    WateringEnv.get_state: (fields, days + 1, 14), float32-rounded.
+    """
+    fields, days = rain.shape
+    features = np.zeros((fields, days + 1, 14), dtype=np.float32)
+    for d in range(days + 1):
+        r = min(7, days - d)
+        features[:, d, :r] = rain[:, d:d + r]
+        features[:, d, r:2 * r] = et[:, d:d + r]
+    return features.astype(np.float64)
+
+
+def rollout_schedules(model, rain, et, crop_need, initial_moisture, wilting_point=WILTING_POINT):
+    """
+    Greedy rollout of `model` for a batch of fields sharing one horizon.
+
+    Parameters:
+    - rain, et: (fields, days) arrays in mm.
+    - crop_need, initial_moisture: (fields,) arrays.
+
+    Returns:
+    - (water_mm, moisture, days_run): water_mm is (fields, days), moisture is
+      (fields, days + 1) with the initial value first; a field that wilts stops
+      after days_run[i] days (later columns are unused).
+    """
+    rain = np.asarray(rain, dtype=np.float64)
+    et = np.asarray(et, dtype=np.float64)
+    fields, days = rain.shape
+    features = forecast_features(rain, et)
+
+    moisture = np.asarray(initial_moisture, dtype=np.float64).copy()
+    prev = moisture.copy()
+    states = np.empty((fields, 17))
+    states[:, 2] = crop_need
+    water_mm = np.zeros((fields, days))
+    trajectory = np.zeros((fields, days + 1))
+    trajectory[:, 0] = moisture
+    days_run = np.zeros(fields, dtype=np.int64)
+    alive = np.arange(fields)
+
+    with torch.inference_mode():
+        for day in range(days):
+            states[alive, 0] = moisture[alive]
+            states[alive, 1] = moisture[alive] - prev[alive]
+            states[alive, 3:] = features[alive, day]
+            batch = torch.from_numpy(states[alive].astype(np.float32))
+            actions = model(batch).argmax(1).numpy()
+
+            water = actions * ACTION_MM
+            prev[alive] = moisture[alive]
+            moisture[alive] = np.clip(moisture[alive] + (rain[alive, day] + water - et[alive, day]) / 100.0, 0.0, 1.0)
+            water_mm[alive, day] = water
+            trajectory[alive, day + 1] = moisture[alive]
+            days_run[alive] = day + 1
+
+            alive = alive[moisture[alive] >= wilting_point]  # Wilting ends the episode
+            if not len(alive):
+                break
+
+    return water_mm, trajectory, days_run
+
+
+def schedules_payload(fields, water_mm, moisture, days_run):
+    """Per-field response rows (same keys as the CLI's JSON result)."""
+    rows = []
+    for i, field in enumerate(fields):
+        n = int(days_run[i])
+        schedule = water_mm[i, :n].tolist()
+        rows.append({
+            'fieldId': field.get('fieldId', i),
+            'schedule_mm': schedule,
+            'total_water_mm': round(float(sum(schedule)), 3),
+            'moisture': [round(m, 4) for m in moisture[i, :n + 1].tolist()],
+            'final_moisture': round(float(moisture[i, n]), 4),
+            'wilted': bool(moisture[i, n] < WILTING_POINT),
+        })
+    return rows
+
+
+def run_fields(model, fields):
+    """Rollout for a list of parsed fields ({'rain', 'et', 'cropNeed', 'initialMoisture'}), any horizons."""
+    results = [None] * len(fields)
+    by_days = {}
+    for i, field in enumerate(fields):
+        by_days.setdefault(len(field['et']), []).append(i)
+
+    for idx in by_days.values():
+        group = [fields[i] for i in idx]
+        water_mm, moisture, days_run = rollout_schedules(
+            model,
+            [f['rain'] for f in group],
+            [f['et'] for f in group],
+            np.array([f['cropNeed'] for f in group], dtype=np.float64),
+            np.array([f['initialMoisture'] for f in group], dtype=np.float64),
+        )
+        for i, row in zip(idx, schedules_payload(group, water_mm, moisture, days_run)):
+            results[i] = row
+    return results
+
+
+class MicroBatcher:
+    """
+    Groups concurrent submit() calls into one run_fields() call.
+
+    Parameters:
+    - model_fn: fn() -> model (called per batch, so a reloaded checkpoint is picked up).
+    - max_batch: maximum number of fields per batch.
+    - max_wait: seconds the worker waits for more requests once one is queued.
+    """
+
+    def __init__(self, model_fn, max_batch=4096, max_wait=0.002):
+        self.model_fn = model_fn
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending = []  # [(fields, future)]
+        self._cond = threading.Condition()
+        self._closed = False
+        self.stats = {'batches': 0, 'requests': 0, 'fields': 0}
+        self._worker = threading.Thread(target=self._run, name='policy-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, fields):
+        """Queues a list of fields; the returned Future resolves to their result rows."""
+        future = Future()
+        with self._cond:
+            if self._closed:
+                raise RuntimeError('MicroBatcher is closed.')
+            self._pending.append((fields, future))
+            self._cond.notify()
+        return future
+
+    def run(self, fields, timeout=None):
+        return self.submit(fields).result(timeout)
+
+    def _take_batch(self):
+        with self._cond:
+            while not self._pending and not self._closed:
+                self._cond.wait()
+            if not self._pending:
+                return None
+
+            # Give concurrent requests a moment to join, unless the batch is already full
+            deadline = time.monotonic() + self.max_wait
+            while sum(len(f) for f, _ in self._pending) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._closed:
+                    break
+                self._cond.wait(remaining)
+
+            batch, size = [], 0
+            while self._pending and (not batch or size + len(self._pending[0][0]) <= self.max_batch):
+                fields, future = self._pending.pop(0)
+                batch.append((fields, future))
+                size += len(fields)
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            fields = [field for request, _ in batch for field in request]
+            try:
+                rows = run_fields(self.model_fn(), fields)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            start = 0
+            for request, future in batch:
+                future.set_result(rows[start:start + len(request)])
+                start += len(request)
+            self.stats['batches'] += 1
+            self.stats['requests'] += len(batch)
+            self.stats['fields'] += len(fields)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._worker.join()
@@ -0,0 +1,278 @@
+"""
+Array-backed replay memory for DQN training.
+
+Transitions live in preallocated, contiguous NumPy arrays used as a ring
+buffer: push() is a few O(1) row writes and sample() draws a vector of
+indices and gathers every field with one fancy-indexing operation, already
+in the dtypes train_dqn feeds to torch (float32 states/rewards/dones, int64
+actions), so torch.from_numpy can wrap them without another copy.
+
+PrioritizedReplayMemory adds proportional prioritized sampling on top of a
+sum-tree. Both can be saved to a directory of .npy files and loaded back,
+optionally memory-mapped so the buffer stays on disk.
+"""
+
+import json
+import os
+
+import numpy as np
+
+FIELDS = ('states', 'actions', 'rewards', 'next_states', 'dones')
+META_FILE = 'meta.json'
+
+
+class ArrayReplayMemory:
+    """
+    Parameters:
+    - capacity: maximum number of transitions (oldest are overwritten first).
+    - state_size: length of a state vector.
+    """
+
+    def __init__(self, capacity, state_size):
+        self.capacity = int(capacity)
+        self.state_size = int(state_size)
+        self.states = np.zeros((self.capacity, self.state_size), dtype=np.float32)
+        self.actions = np.zeros(self.capacity, dtype=np.int64)
+        self.rewards = np.zeros(self.capacity, dtype=np.float32)
+        self.next_states = np.zeros((self.capacity, self.state_size), dtype=np.float32)
+        self.dones = np.zeros(self.capacity, dtype=np.float32)
+        self.pos = 0   # Next slot to write
+        self.size = 0  # Number of valid transitions
+
+    def push(self, state, action, reward, next_state, done):
+        i = self.pos
+        self.states[i] = state
+        self.actions[i] = action
+        self.rewards[i] = reward
+        self.next_states[i] = next_state
+        self.dones[i] = done
+        self._advance(i, 1)
+
+    def push_batch(self, states, actions, rewards, next_states, dones):
+        """Stores one transition per row (e.g. one BatchWateringEnv step)."""
+        n = len(actions)
+        if n > self.capacity:  # Only the newest `capacity` rows survive anyway
+            states, actions, rewards, next_states, dones = (
+                x[-self.capacity:] for x in (states, actions, rewards, next_states, dones))
+            n = self.capacity
+        idx = (self.pos + np.arange(n)) % self.capacity
+        self.states[idx] = states
+        self.actions[idx] = actions
+        self.rewards[idx] = rewards
+        self.next_states[idx] = next_states
+        self.dones[idx] = dones
+        self._advance(self.pos, n)
+
+    def _advance(self, start, n):
+        """Marks the n slots written from `start` (wrapping) as filled."""
+        self.pos = (start + n) % self.capacity
+        self.size = min(self.size + n, self.capacity)
+
+    def _gather(self, idx):
+        return (self.states[idx], self.actions[idx], self.rewards[idx],
+                self.next_states[idx], self.dones[idx])
+
+    def gather_into(self, idx, out):
+        """
+        Like sample()'s gather, but writes rows `idx` into the preallocated
+        (states, actions, rewards, next_states, dones) arrays in `out`.
+        """
+        for name, dst in zip(FIELDS, out):
+            np.take(getattr(self, name), idx, axis=0, out=dst, mode='clip')  # 'raise' would buffer `out`
+
+    def sample_indices(self, batch_size):
+        """(indices, None): the rows sample() would gather; None stands for uniform weights."""
+        return np.random.randint(0, self.size, size=batch_size), None
+
+    def sample(self, batch_size):
+        """Uniform sample (with replacement): (states, actions, rewards, next_states, dones) arrays."""
+        idx, _ = self.sample_indices(batch_size)
+        return self._gather(idx)
+
+    def __len__(self):
+        return self.size
+
+    # --- Persistence ---
+
+    def _array_names(self):
+        return FIELDS
+
+    def _arrays(self):
+        return {name: getattr(self, name) for name in FIELDS}
+
+    def _set_array(self, name, array):
+        setattr(self, name, array)
+
+    def _meta(self):
+        return {'capacity': self.capacity, 'state_size': self.state_size, 'pos': self.pos, 'size': self.size}
+
+    def save(self, directory):
+        """
+        Writes every array to <directory>/<name>.npy through a memory map, then
+        meta.json last (atomically), so a directory with a meta.json is complete.
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name, array in self._arrays().items():
+            out = np.lib.format.open_memmap(os.path.join(directory, name + '.npy'), mode='w+',
+                                            dtype=array.dtype, shape=array.shape)
+            out[:] = array
+            out.flush()
+            del out
+
+        meta = dict(self._meta(), kind=type(self).__name__)
+        tmp = os.path.join(directory, META_FILE + '.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(directory, META_FILE))
+
+    @classmethod
+    def load(cls, directory, mmap=False):
+        """
+        Loads a buffer written by save().
+
+        Parameters:
+        - mmap: keep the arrays memory-mapped read/write instead of copying them
+          into RAM; new transitions are then written straight to the files.
+        """
+        with open(os.path.join(directory, META_FILE), encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('kind') != cls.__name__:
+            raise ValueError(f"{directory} holds a {meta.get('kind')}, not a {cls.__name__}.")
+
+        memory = cls.__new__(cls)
+        memory._restore(meta)
+        for name in memory._array_names():
+            array = np.load(os.path.join(directory, name + '.npy'), mmap_mode='r+' if mmap else None)
+            memory._set_array(name, array)
+        return memory
+
+    def _restore(self, meta):
+        self.capacity = meta['capacity']
+        self.state_size = meta['state_size']
+        self.pos = meta['pos']
+        self.size = meta['size']
+
+
+class SumTree:
+    """
+    Binary sum-tree over `capacity` leaf priorities, stored as one flat array
+    (node i has children 2i and 2i + 1, leaves start at index `leaves`).
+    Updates and prefix-sum lookups are vectorized over whole batches.
+    """
+
+    def __init__(self, capacity):
+        self.leaves = 1 << max(1, int(capacity - 1).bit_length())  # Power of two: all leaves at one depth
+        self.tree = np.zeros(2 * self.leaves, dtype=np.float64)
+
+    @property
+    def total(self):
+        return float(self.tree[1])
+
+    def update_one(self, i, priority):
+        node = i + self.leaves
+        tree = self.tree
+        tree[node] = priority
+        while node > 1:
+            node //= 2
+            tree[node] = tree[2 * node] + tree[2 * node + 1]
+
+    def update(self, idx, priorities):
+        nodes = np.asarray(idx, dtype=np.int64) + self.leaves
+        self.tree[nodes] = priorities
+        while nodes[0] > 1:  # Recompute parents level by level up to the root
+            nodes = np.unique(nodes // 2)
+            self.tree[nodes] = self.tree[2 * nodes] + self.tree[2 * nodes + 1]
+
+    def get(self, idx):
+        return self.tree[np.asarray(idx, dtype=np.int64) + self.leaves]
+
+    def find(self, values):
+        """Leaf index whose cumulative priority range contains each value in [0, total)."""
+        values = np.array(values, dtype=np.float64)
+        nodes = np.ones(len(values), dtype=np.int64)
+        while nodes[0] < self.leaves:
+            left = 2 * nodes
+            go_right = values >= self.tree[left]
+            values = np.where(go_right, values - self.tree[left], values)
+            nodes = left + go_right
+        return nodes - self.leaves
+
+
+class PrioritizedReplayMemory(ArrayReplayMemory):
+    """
+    Proportional prioritized replay: transition i is drawn with probability
+    p_i^alpha / sum(p^alpha), where p_i = |TD error| + eps. New transitions get
+    the largest priority seen so far, so each is sampled at least once early on.
+
+    Parameters:
+    - alpha: how strongly priorities skew sampling (0 = uniform).
+    - beta: importance-sampling correction exponent (1 = full correction).
+    - eps: added to |TD error| so no transition gets zero probability.
+    """
+
+    def __init__(self, capacity, state_size, alpha=0.6, beta=0.4, eps=1e-5):
+        super().__init__(capacity, state_size)
+        self.alpha = alpha
+        self.beta = beta
+        self.eps = eps
+        self.max_priority = 1.0
+        self.tree = SumTree(self.capacity)
+
+    def _advance(self, start, n):
+        priority = self.max_priority ** self.alpha
+        if n == 1:
+            self.tree.update_one(start, priority)
+        else:
+            self.tree.update((start + np.arange(n)) % self.capacity, priority)
+        super()._advance(start, n)
+
+    def sample_indices(self, batch_size):
+        """(indices, importance-sampling weights) of a prioritized sample."""
+        # Stratified: one uniform draw inside each of batch_size equal slices of the total mass
+        total = self.tree.total
+        bounds = np.arange(batch_size) * (total / batch_size)
+        values = bounds + np.random.uniform(0.0, total / batch_size, size=batch_size)
+        idx = np.minimum(self.tree.find(np.minimum(values, np.nextafter(total, 0))), self.size - 1)
+
+        probs = self.tree.get(idx) / total
+        weights = (self.size * probs) ** -self.beta
+        return idx, (weights / weights.max()).astype(np.float32)
+
+    def sample(self, batch_size):
+        """
+        Returns (states, actions, rewards, next_states, dones, indices, weights);
+        pass `indices` back to update_priorities() with the new TD errors.
+        """
+        idx, weights = self.sample_indices(batch_size)
+        return self._gather(idx) + (idx, weights)
+
+    def update_priorities(self, idx, td_errors):
+        priorities = np.abs(np.asarray(td_errors, dtype=np.float64)) + self.eps
+        self.max_priority = max(self.max_priority, float(priorities.max()))
+        self.tree.update(idx, priorities ** self.alpha)
+
+    def _array_names(self):
+        return FIELDS + ('tree',)
+
+    def _arrays(self):
+        return dict(super()._arrays(), tree=self.tree.tree)
+
+    def _set_array(self, name, array):
+        if name == 'tree':
+            self.tree.tree = array
+        else:
+            super()._set_array(name, array)
+
+    def _meta(self):
+        return dict(super()._meta(), alpha=self.alpha, beta=self.beta, eps=self.eps,
+                    max_priority=self.max_priority)
+
+    def _restore(self, meta):
+        super()._restore(meta)
+        self.alpha = meta['alpha']
+        self.beta = meta['beta']
+        self.eps = meta['eps']
+        self.max_priority = meta['max_priority']
+        self.tree = SumTree(self.capacity)
@@ -0,0 +1,97 @@
+"""
+Array-based irrigation schedule engine.
+
+Computes the whole (plants x days) ETc and needed_mm matrices in a few NumPy
+operations instead of a Python loop per plant and day, then expands them into
+the same per-plant dicts calculate_weekly_schedule returns (values identical,
+including Python's rounding and the int 0 used for dry days).
+"""
+
+from datetime import timedelta
+
+import numpy as np
+
+# Relative distance from a .x5 tie below which ETc rounding is redone with Python's round()
+_TIE_TOLERANCE = 1e-6
+
+
+def round1(values):
+    """
+    Rounds an array to 1 decimal exactly like Python's round(x, 1).
+
+    np.round scales by 10 before rounding, which can land on the other side of
+    a tie than Python's correctly rounded round(); only those near-tie entries
+    are recomputed in Python.
+    """
+    rounded = np.round(values, 1)
+    scaled = values * 10.0
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) < _TIE_TOLERANCE
+    if near_tie.any():
+        idx = np.nonzero(near_tie)
+        rounded[idx] = [round(v, 1) for v in values[idx].tolist()]
+    return rounded
+
+
+def compute_schedule_matrix(base_etc, soil_deficit, weather_factors, rain_mm):
+    """
+    Vectorized core of calculate_weekly_schedule.
+
+    Parameters:
+    - base_etc, soil_deficit: (plants,) arrays from the plant configs.
+    - weather_factors, rain_mm: (days,) arrays, one entry per forecast day.
+
+    Returns:
+    - (etc_mm, needed_mm): (plants, days) float arrays.
+    """
+    base_etc = np.asarray(base_etc, dtype=np.float64)[:, None]
+    deficit_buffer = np.asarray(soil_deficit, dtype=np.float64)[:, None] * 10
+    factors = np.asarray(weather_factors, dtype=np.float64)[None, :]
+    rain = np.asarray(rain_mm, dtype=np.float64)[None, :]
+
+    etc_mm = round1(base_etc * factors)
+
+    # Same operation order as the scalar code: max(0, etc + buffer - rain), then up to 0.5 mm steps
+    needed = np.maximum(etc_mm + deficit_buffer - rain, 0.0)
+    needed_mm = np.ceil(needed / 0.5) * 0.5 + 0.0  # + 0.0 turns -0.0 into 0.0
+    return etc_mm, needed_mm
+
+
+def extend_pattern(pattern, horizon):
+    """Repeats a weekly pattern (weather factors, rain) to cover `horizon` days."""
+    return [pattern[i % len(pattern)] for i in range(horizon)]
+
+
+def day_labels(today, horizon, day_names, month_names):
+    """(day, date_str) for each forecast day, computed once for all plants."""
+    labels = []
+    for i in range(horizon):
+        date = today + timedelta(days=i)
+        labels.append((day_names[date.weekday() % 7], f"{date.day} {month_names[date.month - 1]}"))
+    return labels
+
+
+def build_schedules(configs, today, horizon, weather_factors, rain_mm, day_names, month_names):
+    """
+    Schedules for every config in one pass, shaped like calculate_weekly_schedule's output:
+    [{**config, 'schedule': [{'day', 'date', 'rain_mm', 'etc_mm', 'needed_mm'}, ...]}, ...]
+    """
+    factors = extend_pattern(weather_factors, horizon)
+    rain = extend_pattern(rain_mm, horizon)
+    etc_mm, needed_mm = compute_schedule_matrix(
+        [c['baseETc'] for c in configs], [c['soilDeficit'] for c in configs], factors, rain
+    )
+
+    # Per-day fields shared by every plant (rain stays an int 0 on dry days, like round(0, 1))
+    days = [
+        {'day': day, 'date': date_str, 'rain_mm': round(r, 1)}
+        for (day, date_str), r in zip(day_labels(today, horizon, day_names, month_names), rain)
+    ]
+
+    forecasts = []
+    for config, etc_row, needed_row in zip(configs, etc_mm.tolist(), needed_mm.tolist()):
+        schedule = [
+            {**day, 'etc_mm': etc, 'needed_mm': needed}
+            for day, etc, needed in zip(days, etc_row, needed_row)
+        ]
+        forecasts.append({**config, 'schedule': schedule})
+    return forecasts
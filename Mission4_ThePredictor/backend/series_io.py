@@ -0,0 +1,230 @@
+"""
+Streaming and memory-mapped input for ET / rain series.
+
+Long series (multi-year daily series, many stations) are never loaded whole:
+  - .csv and .ndjson / .jsonl files are read incrementally and yield float64
+    arrays of at most chunk_size values,
+  - .npy files, and the members of .npz archives stored uncompressed
+    (np.savez), are memory-mapped,
+and read_series() keeps only the requested window [start, start + length),
+stopping at its end, so peak memory follows the window being simulated rather
+than the file size. A plain .json file still has to be parsed whole.
+
+ArrayForecast is the forecast WateringEnv / BatchWateringEnv / dp_planner
+read: two float64 arrays (rain, et) instead of a list of per-day dicts.
+`forecast[i]` still returns {'rain', 'et'} for code written against the list.
+"""
+
+import csv
+import json
+import os
+import struct
+import zipfile
+
+import numpy as np
+
+SERIES_KEYS = ('et', 'rain', 'series', 'data')  # Looked up in this order when no key is given
+CHUNK_SIZE = 65536
+
+
+class ArrayForecast:
+    """
+    Per-day rain and ET (mm) as two equally long float64 arrays.
+
+    Slicing returns an ArrayForecast viewing the same arrays (no copy, so a
+    window of a memory-mapped series stays on disk until read).
+    """
+
+    __slots__ = ('rain', 'et')
+
+    def __init__(self, et, rain=None):
+        self.et = np.asarray(et, dtype=np.float64)
+        self.rain = np.zeros(len(self.et)) if rain is None else np.asarray(rain, dtype=np.float64)
+        if len(self.rain) != len(self.et):
+            raise ValueError(f"Rain length ({len(self.rain)}) differs from ET length ({len(self.et)}).")
+
+    @classmethod
+    def from_records(cls, records):
+        """From a list of {'rain', 'et'} dicts (the former forecast format)."""
+        return cls([w['et'] for w in records], [w['rain'] for w in records])
+
+    def __len__(self):
+        return len(self.et)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return ArrayForecast(self.et[i], self.rain[i])
+        return {'rain': float(self.rain[i]), 'et': float(self.et[i])}
+
+
+def as_forecast(forecast):
+    """ArrayForecast for an ArrayForecast or a list of {'rain', 'et'} dicts."""
+    return forecast if isinstance(forecast, ArrayForecast) else ArrayForecast.from_records(forecast)
+
+
+# --- Incremental readers ---
+
+def _chunked(values, chunk_size):
+    """Groups an iterator of floats into float64 arrays of chunk_size values."""
+    buf = []
+    for v in values:
+        buf.append(v)
+        if len(buf) == chunk_size:
+            yield np.array(buf, dtype=np.float64)
+            buf = []
+    if buf:
+        yield np.array(buf, dtype=np.float64)
+
+
+def iter_csv_chunks(path, chunk_size=CHUNK_SIZE):
+    """
+    Float64 chunks of a CSV series: the first non-empty cell of every
+    non-empty row. A non-numeric first row is taken as a header and skipped.
+    """
+    def values():
+        with open(path, newline='', encoding='utf-8') as f:
+            for line_no, row in enumerate(csv.reader(f)):
+                row = [c for c in row if c.strip() != ""]
+                if not row:
+                    continue
+                try:
+                    yield float(row[0])
+                except ValueError:
+                    if line_no == 0:
+                        continue
+                    raise ValueError(f"{path}, line {line_no + 1}: not a number: {row[0]!r}") from None
+
+    return _chunked(values(), chunk_size)
+
+
+def iter_ndjson_chunks(path, key=None, chunk_size=CHUNK_SIZE):
+    """
+    Float64 chunks of an NDJSON series: one JSON value per line, either a
+    number or an object holding the value under `key` (default: the first of
+    SERIES_KEYS present).
+    """
+    def values():
+        with open(path, encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                if isinstance(item, dict):
+                    name = key or next((k for k in SERIES_KEYS if k in item), None)
+                    if name not in item:
+                        raise ValueError(f"{path}, line {line_no}: no {key or '/'.join(SERIES_KEYS)} field.")
+                    item = item[name]
+                yield float(item)
+
+    return _chunked(values(), chunk_size)
+
+
+def _window(chunks, start=0, length=None):
+    """Concatenates values [start, start + length) of a chunk stream, reading no further than needed."""
+    parts, seen, taken = [], 0, 0
+    for chunk in chunks:
+        lo = max(start - seen, 0)
+        seen += len(chunk)
+        if lo >= len(chunk):
+            continue
+        part = chunk[lo:] if length is None else chunk[lo:lo + length - taken]
+        parts.append(part)
+        taken += len(part)
+        if length is not None and taken >= length:
+            break
+    return np.concatenate(parts) if parts else np.zeros(0)
+
+
+# --- Memory-mapped arrays ---
+
+def _npz_member(path, name):
+    """
+    Member `name` of an .npz archive, memory-mapped when it is stored
+    uncompressed (np.savez); compressed members (np.savez_compressed) are read.
+    """
+    with zipfile.ZipFile(path) as zf:
+        info = zf.getinfo(name + '.npy')
+    if info.compress_type != zipfile.ZIP_STORED:
+        with np.load(path) as data:
+            return data[name]
+
+    with open(path, 'rb') as f:
+        f.seek(info.header_offset)
+        local_header = f.read(30)
+        name_len, extra_len = struct.unpack('<HH', local_header[26:30])
+        f.seek(info.header_offset + 30 + name_len + extra_len)
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+        offset = f.tell()
+    return np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape,
+                     order='F' if fortran_order else 'C')
+
+
+def _npz_series(path, key=None):
+    with zipfile.ZipFile(path) as zf:
+        names = [n[:-4] for n in zf.namelist() if n.endswith('.npy')]
+    if key is None:
+        key = next((k for k in SERIES_KEYS if k in names), names[0] if names else None)
+    if key not in names:
+        raise ValueError(f"{path} has no array {key!r} (arrays: {', '.join(names) or 'none'}).")
+    return _npz_member(path, key)
+
+
+def _json_series(path, key=None):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    # A list, or an object holding the list under `key` (default: first of SERIES_KEYS)
+    if isinstance(data, list):
+        return np.array(data, dtype=np.float64)
+    if isinstance(data, dict):
+        for name in ((key,) if key else SERIES_KEYS):
+            if name in data and isinstance(data[name], list):
+                return np.array(data[name], dtype=np.float64)
+        raise ValueError("JSON file must contain a list or a key with a list (e.g., 'et').")
+    raise ValueError("Unsupported JSON format for series.")
+
+
+# --- Entry point ---
+
+def split_key(arg):
+    """'data.npz:rain' -> ('data.npz', 'rain'); an existing path is never split."""
+    if os.path.isfile(arg) or ':' not in arg:
+        return arg, None
+    path, key = arg.rsplit(':', 1)
+    return (path, key) if os.path.isfile(path) else (arg, None)
+
+
+def read_series(path, key=None, start=0, length=None, chunk_size=CHUNK_SIZE):
+    """
+    Values [start, start + length) of the series stored at `path` as a float64
+    array (a read-only memory-mapped view for float64 .npy / stored .npz data).
+
+    Parameters:
+    - key: array (.npz) or field (.ndjson / .json) holding the series.
+    - length: None reads to the end of the series.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.npy':
+        data = np.load(path, mmap_mode='r')
+    elif ext == '.npz':
+        data = _npz_series(path, key)
+    elif ext == '.csv':
+        values = _window(iter_csv_chunks(path, chunk_size), start, length)
+        if not len(values) and start == 0:
+            raise ValueError("CSV appears empty.")
+        return values
+    elif ext in ('.ndjson', '.jsonl'):
+        return _window(iter_ndjson_chunks(path, key, chunk_size), start, length)
+    elif ext == '.json':
+        data = _json_series(path, key)
+    else:
+        raise ValueError("Only .json, .ndjson/.jsonl, .csv, .npy or .npz files are supported for series input.")
+
+    if data.ndim != 1:
+        raise ValueError(f"{path}: expected a 1-D series, got shape {data.shape}.")
+    end = None if length is None else start + length
+    return np.asarray(data[start:end], dtype=np.float64)  # Copies only the window (when not float64)
+
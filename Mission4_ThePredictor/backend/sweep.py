@@ -0,0 +1,243 @@
+"""
+Parallel hyperparameter / multi-seed sweep for the DQN watering policy.
+
+    python mission_four.py --crop-need 3 --et 5,5,5,5,5,5,5 --sweep spec.json --workers 4
+
+A spec is a JSON object (file path or inline string):
+
+    {"grid": {"lr": [1e-4, 3e-4, 1e-3], "gamma": [0.95, 0.99]},
+     "seeds": [0, 1, 2]}
+
+    {"random": {"lr": {"log_uniform": [1e-4, 3e-3]}, "tau": {"uniform": [0.001, 0.02]},
+                "episodes": [500, 1000]},
+     "trials": 24, "seed": 0,
+     "early_stop": {"window": 100, "check_every": 100, "min_episodes": 200, "min_trials": 3}}
+
+Random values are a list (choice), {"uniform": [a, b]}, {"log_uniform": [a, b]}
+or {"int": [a, b]} (inclusive). Every other train_dqn setting comes from the CLI.
+
+Trials run in a process pool; each worker pins torch to cpu_count // workers
+threads so the trials never compete for cores. Poor trials are stopped with
+the median stopping rule: at each checkpoint a trial whose rolling mean
+episode reward is below the median of the other trials at the same episode
+is stopped. Results are ranked by the greedy policy's evaluation reward and
+written as a CSV table.
+"""
+
+import csv
+import itertools
+import json
+import math
+import os
+import random
+import statistics
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import Manager
+
+# train_dqn keyword arguments a spec may set
+SWEEP_PARAMS = ('lr', 'gamma', 'tau', 'batch_size', 'episodes', 'num_envs', 'prioritized', 'target_update_every')
+EARLY_STOP_DEFAULTS = {'window': 100, 'check_every': 100, 'min_episodes': 200, 'min_trials': 3}
+
+
+def load_spec(arg):
+    """Spec from a JSON file path or an inline JSON string."""
+    if os.path.isfile(arg):
+        with open(arg, encoding='utf-8') as f:
+            return json.load(f)
+    return json.loads(arg)
+
+
+def _draw(dist, rng):
+    if isinstance(dist, list):
+        return rng.choice(dist)
+    if isinstance(dist, dict) and len(dist) == 1:
+        (kind, (low, high)), = dist.items()
+        if kind == 'uniform':
+            return rng.uniform(low, high)
+        if kind == 'log_uniform':
+            return math.exp(rng.uniform(math.log(low), math.log(high)))
+        if kind == 'int':
+            return rng.randint(low, high)
+    return dist  # Constant
+
+
+def expand_spec(spec):
+    """
+    Turns a spec into the list of trials.
+
+    Returns:
+    - [{'trial': i, 'seed': seed, 'params': {name: value}}, ...]
+    """
+    space = spec.get('grid') or spec.get('random') or {}
+    unknown = set(space) - set(SWEEP_PARAMS)
+    if unknown:
+        raise ValueError(f"Unknown sweep parameter(s): {', '.join(sorted(unknown))}. Allowed: {', '.join(SWEEP_PARAMS)}.")
+
+    if 'grid' in spec:
+        names = list(space)
+        configs = [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+    elif 'random' in spec:
+        rng = random.Random(spec.get('seed', 0))
+        configs = [{name: _draw(dist, rng) for name, dist in space.items()} for _ in range(spec.get('trials', 10))]
+    else:
+        raise ValueError("Sweep spec needs a 'grid' or a 'random' section.")
+
+    seeds = spec.get('seeds', [None])
+    return [
+        {'trial': i, 'seed': seed, 'params': params}
+        for i, (params, seed) in enumerate(itertools.product(configs, seeds))
+    ]
+
+
+class MedianStopper:
+    """
+    on_episode callback for train_dqn implementing the median stopping rule.
+    `shared` maps (trial, episode) -> rolling reward and is shared by all workers.
+    """
+
+    def __init__(self, shared, trial, window, check_every, min_episodes, min_trials):
+        self.shared = shared
+        self.trial = trial
+        self.check_every = check_every
+        self.min_episodes = min_episodes
+        self.min_trials = min_trials
+        self.returns = deque(maxlen=window)
+        self.episodes = 0
+        self.stopped = False
+
+    @property
+    def rolling_reward(self):
+        return statistics.fmean(self.returns) if self.returns else None
+
+    def __call__(self, episode, episode_return):
+        self.returns.append(episode_return)
+        self.episodes = episode + 1
+        if self.episodes < self.min_episodes or self.episodes % self.check_every:
+            return False
+
+        rolling = self.rolling_reward
+        self.shared[(self.trial, self.episodes)] = rolling
+        others = [r for (t, e), r in self.shared.items() if e == self.episodes and t != self.trial]
+        if len(others) >= self.min_trials and rolling < statistics.median(others):
+            self.stopped = True
+        return self.stopped
+
+
+def evaluate_policy(env, net, start_moisture):
+    """Greedy rollout from start_moisture: (total reward, schedule, total water)."""
+    from mission_four import replay_schedule, run_policy
+
+    schedule, total_water, _ = run_policy(env, net, start_moisture=start_moisture)
+    total_reward, _ = replay_schedule(env, schedule, start_moisture)
+    return total_reward, schedule, float(total_water)
+
+
+def _init_worker(threads):
+    import torch
+
+    torch.set_num_threads(threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # Already set in this process
+
+
+def _run_trial(trial, base, early_stop, shared):
+    from mission_four import WateringEnv, train_dqn
+
+    env = WateringEnv(base['forecast'], crop_need=base['crop_need'],
+                      initial_moisture=base['initial_moisture'], max_days=len(base['forecast']))
+    kwargs = dict(base['train'], **trial['params'])
+    stopper = MedianStopper(shared, trial['trial'], **early_stop) if early_stop else None
+
+    start = time.perf_counter()
+    net, losses = train_dqn(env, seed=trial['seed'], use_tqdm=False,
+                            on_episode=stopper, **kwargs)
+    seconds = time.perf_counter() - start
+    # Vectorized collection can finish a few episodes past the target in its last step
+    episodes_run = min(stopper.episodes, kwargs['episodes']) if stopper else kwargs['episodes']
+    eval_reward, schedule, total_water = evaluate_policy(env, net, base['initial_moisture'])
+
+    return {
+        'trial': trial['trial'],
+        'seed': trial['seed'],
+        **{name: kwargs.get(name) for name in SWEEP_PARAMS},
+        'episodes_run': episodes_run,
+        'stopped_early': bool(stopper and stopper.stopped and episodes_run < kwargs['episodes']),
+        'rolling_reward': round(stopper.rolling_reward, 4) if stopper and stopper.returns else None,
+        'eval_reward': round(eval_reward, 4),
+        'total_water_mm': round(total_water, 3),
+        'schedule_mm': ' '.join(f'{w:g}' for w in schedule),
+        'final_loss': round(float(losses[-1]), 5) if losses else None,
+        'seconds': round(seconds, 2),
+    }
+
+
+def rank_results(results):
+    """Best first: completed trials before stopped ones, then by evaluation reward."""
+    ranked = sorted(results, key=lambda r: (r['stopped_early'], -r['eval_reward']))
+    for rank, row in enumerate(ranked, 1):
+        row['rank'] = rank
+    return ranked
+
+
+def write_table(results, path):
+    columns = ['rank', 'trial', 'seed', *SWEEP_PARAMS, 'episodes_run', 'stopped_early',
+               'rolling_reward', 'eval_reward', 'total_water_mm', 'final_loss', 'seconds', 'schedule_mm']
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=columns)
+        writer.writeheader()
+        writer.writerows(results)
+
+
+def format_table(results, limit=10):
+    lines = [f"{'rank':>4} {'trial':>5} {'seed':>5} {'lr':>9} {'gamma':>6} {'tau':>7} {'episodes':>8} {'stop':>5} {'eval_R':>9} {'roll_R':>9}"]
+    for r in results[:limit]:
+        lines.append(
+            f"{r['rank']:>4} {r['trial']:>5} {str(r['seed']):>5} {r['lr']:>9.2e} {r['gamma']:>6.3f} {r['tau']:>7.4f} "
+            f"{r['episodes_run']:>8} {'yes' if r['stopped_early'] else 'no':>5} {r['eval_reward']:>9.2f} "
+            f"{'-' if r['rolling_reward'] is None else format(r['rolling_reward'], '.2f'):>9}"
+        )
+    return '\n'.join(lines)
+
+
+def run_sweep(spec, base, workers=None, out_path='sweep_results.csv', log=sys.stderr):
+    """
+    Runs every trial of `spec` and writes the ranked table to out_path.
+
+    Parameters:
+    - base: {'forecast', 'crop_need', 'initial_moisture', 'train': {train_dqn kwargs}}.
+    - workers: processes (default: one per CPU); each gets cpu_count // workers torch threads.
+
+    Returns:
+    - The ranked list of result rows.
+    """
+    trials = expand_spec(spec)
+    cpus = os.cpu_count() or 1
+    workers = max(1, min(workers or cpus, len(trials)))
+    threads = max(1, cpus // workers)
+    early_stop = spec.get('early_stop', EARLY_STOP_DEFAULTS)
+    if early_stop:
+        early_stop = dict(EARLY_STOP_DEFAULTS, **early_stop)
+
+    print(f"Sweep: {len(trials)} trials on {workers} worker(s) x {threads} torch thread(s)", file=log)
+    results = []
+    with Manager() as manager:
+        shared = manager.dict()
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(threads,)) as pool:
+            futures = [pool.submit(_run_trial, trial, base, early_stop, shared) for trial in trials]
+            for future in as_completed(futures):
+                row = future.result()
+                results.append(row)
+                status = f"stopped at {row['episodes_run']}" if row['stopped_early'] else 'done'
+                print(f"  trial {row['trial']:>3}: eval_R={row['eval_reward']:+.2f} ({status}, {row['seconds']}s)"
+                      f" [{len(results)}/{len(trials)}]", file=log)
+
+    ranked = rank_results(results)
+    write_table(ranked, out_path)
+    print(format_table(ranked), file=log)
+    print(f"Ranked results -> {out_path}", file=log)
+    return ranked
@@ -0,0 +1,51 @@
+import numpy as np
+
+from mission_four import BatchWateringEnv, WateringEnv
+from series_io import ArrayForecast
+
+MAX_DAYS = 10
+
+
+def forecast(seed=0):
+    rng = np.random.default_rng(seed)
+    rain = np.where(rng.random(MAX_DAYS) < 0.3, rng.uniform(0.0, 12.0, MAX_DAYS), 0.0)
+    return ArrayForecast(et=rng.uniform(2.0, 9.0, MAX_DAYS), rain=rain)
+
+
+def test_batched_envs_step_like_independent_envs():
+    rng = np.random.default_rng(42)
+    n = 16
+    weather = forecast()
+    start = rng.uniform(0.15, 0.85, n)  # Some envs wilt early, some saturate
+    actions = rng.integers(0, 21, size=(MAX_DAYS, n))
+    start[:4] = 0.25
+    actions[:, :4] = 0  # Dry and never watered: these end early by wilting
+
+    envs = [WateringEnv(weather, crop_need=5.0, initial_moisture=m, max_days=MAX_DAYS) for m in start]
+    benv = BatchWateringEnv(weather, crop_need=5.0, num_envs=n, initial_moisture=0.5, max_days=MAX_DAYS)
+    benv.load_state_dict({'moisture': start.tolist(), 'prev_moisture': start.tolist(),
+                          'day': [0] * n, 'returns': [0.0] * n})
+
+    np.testing.assert_array_equal(benv.get_states(), np.stack([env.get_state() for env in envs]))
+
+    finished = np.zeros(n, dtype=bool)
+    returns = np.zeros(n)
+    for day in range(MAX_DAYS):
+        states, rewards, dones, info = benv.step(actions[day])
+        done_index = {i: k for k, i in enumerate(np.flatnonzero(dones))}  # Row in info[...] per finished env
+        for i, env in enumerate(envs):
+            if finished[i]:
+                continue  # The batch has already reset this env into a new episode
+            state, reward, done, _ = env.step(int(actions[day, i]))
+            returns[i] += reward
+            assert dones[i] == done
+            assert rewards[i] == reward
+            if done:
+                np.testing.assert_array_equal(info['terminal_states'][done_index[i]], state)
+                assert info['episode_returns'][done_index[i]] == returns[i]
+            else:
+                np.testing.assert_array_equal(states[i], state)
+            finished[i] = done
+
+    assert finished.all()
+    assert all(env.day < MAX_DAYS for env in envs[:4])  # The wilting case was exercised
@@ -0,0 +1,46 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from dp_planner import ACTION_MM, ACTION_SIZE, _interp_uniform, plan_schedule
+from mission_four import WateringEnv, replay_schedule
+from series_io import ArrayForecast
+
+DAYS = 3
+TOLERANCE = 1e-3  # Grid interpolation of the continuation value
+
+
+def brute_force(env, start_moisture):
+    """Best episode reward over all ACTION_SIZE ** DAYS schedules, replayed in WateringEnv itself."""
+    best = -np.inf
+    for actions in itertools.product(range(ACTION_SIZE), repeat=DAYS):
+        reward, _ = replay_schedule(env, [a * ACTION_MM for a in actions], start_moisture)
+        best = max(best, reward)
+    return best
+
+
+@pytest.mark.parametrize('et, rain, start', [
+    ([9.0, 9.0, 8.0], [0.0, 0.0, 0.0], 0.36),    # Hot and dry: watering pays off
+    ([8.0, 9.0, 9.0], [0.0, 0.0, 0.0], 0.22),    # Starts next to wilting
+    ([3.0, 2.0, 4.0], [12.0, 0.0, 9.0], 0.78),   # Wet: above saturation, no water is best
+    ([5.5, 3.0, 6.5], [0.0, 4.0, 0.0], 0.31),
+])
+def test_dp_return_matches_brute_force(et, rain, start):
+    env = WateringEnv(ArrayForecast(et=et, rain=rain), crop_need=5.0, max_days=DAYS)
+    best = brute_force(env, start)
+
+    plan = plan_schedule(env, start_moisture=start)
+    assert len(plan.schedule_mm) <= DAYS
+    assert plan.total_reward <= best + 1e-9  # Replayed in the same env: cannot beat the optimum
+    assert plan.total_reward == pytest.approx(best, abs=TOLERANCE)
+    assert float(_interp_uniform(np.array([start]), plan.values[0])[0]) == pytest.approx(best, abs=TOLERANCE)
+
+
+def test_wilting_is_terminal_in_the_plan():
+    # Nothing can save the plant: it wilts on day one whatever the schedule
+    env = WateringEnv(ArrayForecast(et=[40.0, 1.0, 1.0], rain=[0.0, 0.0, 0.0]), crop_need=5.0, max_days=DAYS)
+    plan = plan_schedule(env, start_moisture=0.25)
+
+    assert plan.total_reward == pytest.approx(brute_force(env, 0.25))
+    assert len(plan.schedule_mm) == 1 and plan.schedule_mm[0] == 0.0  # Water would only add cost
@@ -0,0 +1,132 @@
+import threading
+
+import numpy as np
+import pytest
+import torch
+
+import app as policy_app
+from dqn_model import DQN
+from mission_four import WateringEnv, run_policy
+from policy_inference import MicroBatcher
+from series_io import ArrayForecast
+
+
+def save_stub_model(path, seed=0):
+    """A small untrained network in the `mission_four.py --save-model` format."""
+    torch.manual_seed(seed)
+    net = DQN(17, 21)
+    torch.save({'state_dict': net.state_dict(), 'state_size': 17, 'action_size': 21}, str(path))
+    return net.eval()
+
+
+def make_fields(n=12, seed=0):
+    rng = np.random.default_rng(seed)
+    fields = []
+    for i in range(n):
+        days = int(rng.integers(1, 15))  # Several horizons, more than the 7-day state window
+        fields.append({
+            'fieldId': f'field-{i}',
+            'et': rng.uniform(2.0, 12.0, days).round(2).tolist(),
+            'rain': np.where(rng.random(days) < 0.3, rng.uniform(0.0, 10.0, days), 0.0).round(2).tolist(),
+            'cropNeed': float(rng.uniform(3.0, 7.0)),
+            'initialMoisture': 0.21 if i % 4 == 0 else float(rng.uniform(0.3, 0.8)),  # Some wilt early
+        })
+    return fields
+
+
+def expected_row(net, field):
+    env = WateringEnv(ArrayForecast(et=field['et'], rain=field['rain']), field['cropNeed'], max_days=len(field['et']))
+    schedule, total_water, moistures = run_policy(env, net, start_moisture=field['initialMoisture'])
+    return schedule, round(float(total_water), 3), [round(float(m), 4) for m in moistures]
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(policy_app, 'POLICY_MODEL_PATH', str(tmp_path / 'policy.pt'))
+    monkeypatch.setattr(policy_app, '_policy_batcher', None)
+    yield policy_app.app.test_client()
+    if policy_app._policy_batcher is not None:
+        policy_app._policy_batcher.close()
+
+
+def test_batched_inference_matches_run_policy(client, monkeypatch):
+    net = save_stub_model(policy_app.POLICY_MODEL_PATH)
+    monkeypatch.setattr(policy_app, 'POLICY_MAX_WAIT_MS', 200.0)  # Let the concurrent requests share batches
+    requests = [make_fields(seed=s) for s in range(4)]
+    responses = [None] * len(requests)
+
+    def post(i):
+        responses[i] = policy_app.app.test_client().post('/api/v1/policy-schedule', json={'fields': requests[i]})
+
+    threads = [threading.Thread(target=post, args=(i,)) for i in range(len(requests))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    for fields, resp in zip(requests, responses):
+        assert resp.status_code == 200
+        assert resp.get_json()['model'] == 'policy.pt'
+        rows = resp.get_json()['fields']
+        assert [row['fieldId'] for row in rows] == [f['fieldId'] for f in fields]
+        for field, row in zip(fields, rows):
+            schedule, total_water, moistures = expected_row(net, field)
+            assert row['schedule_mm'] == schedule
+            assert row['total_water_mm'] == total_water
+            assert row['moisture'] == moistures
+            assert row['final_moisture'] == moistures[-1]
+            assert row['wilted'] == (len(schedule) < len(field['et']) or moistures[-1] < 0.20)
+    assert any(row['wilted'] for resp in responses for row in resp.get_json()['fields'])
+
+    stats = policy_app._policy_batcher.stats
+    assert stats['requests'] == len(requests) and stats['fields'] == sum(map(len, requests))
+
+
+def test_policy_timeout_returns_504(client, monkeypatch):
+    save_stub_model(policy_app.POLICY_MODEL_PATH)
+    release = threading.Event()
+
+    def stuck_model():
+        release.wait(5)
+        raise RuntimeError('never finishes in time')
+
+    batcher = MicroBatcher(stuck_model, max_wait=0)
+    monkeypatch.setattr(policy_app, '_policy_batcher', batcher)
+    monkeypatch.setattr(policy_app, 'POLICY_TIMEOUT', 0.05)
+    try:
+        resp = client.post('/api/v1/policy-schedule', json={'fields': make_fields(2)})
+    finally:
+        release.set()
+
+    assert resp.status_code == 504
+    assert resp.get_json() == {'error': 'Policy inference did not finish within 0.05 s, try again later.'}
+
+
+def test_missing_model_returns_503(client):
+    resp = client.post('/api/v1/policy-schedule', json={'fields': make_fields(2)})
+
+    assert resp.status_code == 503
+    assert 'No trained policy at' in resp.get_json()['error']
+    assert policy_app._policy_batcher is None  # Nothing was loaded
+
+
+def test_unloadable_model_returns_503(client):
+    with open(policy_app.POLICY_MODEL_PATH, 'wb') as f:
+        f.write(b'not a torch checkpoint')
+
+    resp = client.post('/api/v1/policy-schedule', json={'fields': make_fields(2)})
+
+    assert resp.status_code == 503
+    assert resp.get_json() == {
+        'error': f'Policy model at {policy_app.POLICY_MODEL_PATH} could not be loaded or run (see server log).'}
+
+
+def test_et_length_is_limited_by_the_policy_horizon(client):
+    save_stub_model(policy_app.POLICY_MODEL_PATH)
+    field = {'et': [5.0] * (policy_app.MAX_POLICY_DAYS + 1), 'cropNeed': 5.0}
+
+    resp = client.post('/api/v1/policy-schedule', json={'fields': [field]})
+
+    assert resp.status_code == 400
+    assert resp.get_json() == {
+        'error': f'fields[0].et must be a list of 1..{policy_app.MAX_POLICY_DAYS} numbers (mm/day).'}
@@ -0,0 +1,142 @@
+import numpy as np
+import pytest
+
+from replay_memory import FIELDS, ArrayReplayMemory, PrioritizedReplayMemory, SumTree
+
+STATE_SIZE = 3
+
+
+def transitions(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.random((n, STATE_SIZE), dtype=np.float32), rng.integers(0, 21, n),
+            rng.random(n, dtype=np.float32), rng.random((n, STATE_SIZE), dtype=np.float32),
+            (rng.random(n) < 0.2).astype(np.float32))
+
+
+def assert_tree_consistent(tree):
+    """Every internal node holds the sum of its two children."""
+    internal = np.arange(1, tree.leaves)
+    np.testing.assert_allclose(tree.tree[internal], tree.tree[2 * internal] + tree.tree[2 * internal + 1])
+    assert tree.total == pytest.approx(tree.tree[tree.leaves:].sum())
+
+
+@pytest.mark.parametrize('batched', [False, True])
+def test_ring_buffer_keeps_the_newest_transitions_after_wrapping(batched):
+    capacity, n = 5, 13
+    memory = ArrayReplayMemory(capacity, STATE_SIZE)
+    data = transitions(n)
+    if batched:
+        memory.push_batch(*(x[:4] for x in data))  # Partial fill, then a batch that wraps twice
+        memory.push_batch(*(x[4:] for x in data))
+    else:
+        for row in zip(*data):
+            memory.push(*row)
+
+    assert len(memory) == capacity
+    order = (memory.pos + np.arange(capacity)) % capacity  # Oldest to newest, starting at the next slot to write
+    for name, array in zip(FIELDS, data):
+        np.testing.assert_array_equal(getattr(memory, name)[order], array[-capacity:])
+
+
+def test_push_batch_larger_than_capacity_keeps_the_tail():
+    memory = ArrayReplayMemory(4, STATE_SIZE)
+    memory.push(*(x[0] for x in transitions(1, seed=1)))
+    data = transitions(10)
+    memory.push_batch(*data)
+
+    assert (len(memory), memory.pos) == (4, 1)
+    order = (memory.pos + np.arange(4)) % 4  # Oldest to newest
+    np.testing.assert_array_equal(memory.actions[order], data[1][-4:])
+
+
+def test_sum_tree_totals_follow_updates():
+    rng = np.random.default_rng(3)
+    tree = SumTree(5)  # Not a power of two: padded to 8 leaves
+    assert tree.leaves == 8
+    priorities = np.zeros(5)
+
+    tree.update(np.arange(5), rng.uniform(0.1, 2.0, 5))
+    priorities[:] = tree.get(np.arange(5))
+    for _ in range(20):
+        idx = rng.choice(5, size=rng.integers(1, 4), replace=False)
+        new = rng.uniform(0.0, 3.0, len(idx))
+        tree.update(idx, new)
+        priorities[idx] = new
+        i = int(rng.integers(0, 5))
+        priorities[i] = rng.uniform(0.0, 3.0)
+        tree.update_one(i, priorities[i])
+
+        assert_tree_consistent(tree)
+        assert tree.total == pytest.approx(priorities.sum())
+        np.testing.assert_array_equal(tree.get(np.arange(5)), priorities)
+
+
+def test_sum_tree_find_maps_prefix_sums_to_leaves():
+    tree = SumTree(4)
+    tree.update(np.arange(4), [1.0, 0.0, 2.0, 3.0])
+    # Cumulative ranges: [0, 1) -> 0, [1, 3) -> 2, [3, 6) -> 3; the empty leaf 1 is never hit
+    np.testing.assert_array_equal(tree.find([0.0, 0.99, 1.0, 2.99, 3.0, 5.99]), [0, 0, 2, 2, 3, 3])
+
+
+def test_prioritized_memory_tree_tracks_pushes_and_priority_updates():
+    memory = PrioritizedReplayMemory(6, STATE_SIZE, alpha=0.5)
+    data = transitions(9)
+    memory.push_batch(*(x[:4] for x in data))
+    for row in zip(*(x[4:] for x in data)):
+        memory.push(*row)
+    assert memory.tree.total == pytest.approx(6.0)  # Every slot at max_priority ** alpha == 1
+
+    memory.update_priorities(np.array([0, 3]), np.array([-3.0, 15.0]))
+    assert memory.max_priority == pytest.approx(15.0 + memory.eps)
+    assert_tree_consistent(memory.tree)
+    expected = [(3.0 + memory.eps) ** 0.5, 1.0, 1.0, (15.0 + memory.eps) ** 0.5, 1.0, 1.0]
+    np.testing.assert_allclose(memory.tree.get(np.arange(6)), expected)
+
+    memory.push(*(x[0] for x in data))  # Overwrites slot 3 with the new max priority
+    assert memory.tree.get([3])[0] == pytest.approx((15.0 + memory.eps) ** 0.5)
+    assert_tree_consistent(memory.tree)
+
+
+@pytest.mark.parametrize('cls', [ArrayReplayMemory, PrioritizedReplayMemory])
+@pytest.mark.parametrize('mmap', [False, True])
+def test_save_load_round_trip(tmp_path, cls, mmap):
+    memory = cls(8, STATE_SIZE)
+    memory.push_batch(*transitions(11))
+    if cls is PrioritizedReplayMemory:
+        memory.update_priorities(np.arange(4), np.linspace(0.5, 4.0, 4))
+    memory.save(str(tmp_path))
+
+    loaded = cls.load(str(tmp_path), mmap=mmap)
+    assert (loaded.capacity, loaded.state_size, loaded.pos, loaded.size) == (8, STATE_SIZE, memory.pos, memory.size)
+    for name in FIELDS:
+        restored = getattr(loaded, name)
+        assert isinstance(restored, np.memmap) == mmap
+        assert restored.dtype == getattr(memory, name).dtype
+        np.testing.assert_array_equal(restored, getattr(memory, name))
+    if cls is PrioritizedReplayMemory:
+        assert (loaded.alpha, loaded.beta, loaded.eps, loaded.max_priority) == \
+            (memory.alpha, memory.beta, memory.eps, memory.max_priority)
+        np.testing.assert_array_equal(loaded.tree.tree, memory.tree.tree)
+
+
+def test_memory_mapped_buffer_writes_through_to_disk(tmp_path):
+    memory = PrioritizedReplayMemory(4, STATE_SIZE)
+    memory.push_batch(*transitions(2))
+    memory.save(str(tmp_path))
+
+    mapped = PrioritizedReplayMemory.load(str(tmp_path), mmap=True)
+    row = tuple(x[0] for x in transitions(1, seed=7))
+    mapped.push(*row)
+    mapped.update_priorities(np.array([0]), np.array([2.0]))
+    for array in (mapped.states, mapped.tree.tree):
+        array.flush()
+
+    on_disk = np.load(str(tmp_path / 'states.npy'))
+    np.testing.assert_array_equal(on_disk[2], row[0])
+    np.testing.assert_array_equal(np.load(str(tmp_path / 'tree.npy')), mapped.tree.tree)
+
+
+def test_load_rejects_another_kind_of_buffer(tmp_path):
+    ArrayReplayMemory(4, STATE_SIZE).save(str(tmp_path))
+    with pytest.raises(ValueError, match='ArrayReplayMemory'):
+        PrioritizedReplayMemory.load(str(tmp_path))
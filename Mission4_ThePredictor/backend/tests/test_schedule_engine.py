@@ -0,0 +1,59 @@
+import json
+import random
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app import INITIAL_PLANT_CONFIGS, calculate_schedules, calculate_weekly_schedule
+from schedule_engine import round1
+
+
+def mixed_catalog(n=500, seed=0):
+    """Random plants plus values landing on .x5 rounding ties and zero-need days."""
+    rng = random.Random(seed)
+    configs = [
+        {
+            'plantId': f'plant-{i}',
+            'plantName': f'Plant {i}',
+            'soilDeficit': round(rng.uniform(0.0, 0.5), 2),
+            'color': '#16a34a',
+            'baseETc': round(rng.uniform(0.0, 8.0), rng.choice([1, 2, 3])),
+        }
+        for i in range(n)
+    ]
+    for base_etc in (0.0, 0.05, 0.25, 1.45, 2.35, 4.5, 10.25):
+        for deficit in (0.0, 0.05, 0.35):
+            configs.append({'plantId': f'edge-{base_etc}-{deficit}', 'plantName': 'Edge',
+                            'soilDeficit': deficit, 'color': '#000000', 'baseETc': base_etc})
+    return [*INITIAL_PLANT_CONFIGS, *configs]
+
+
+@pytest.mark.parametrize('today', [datetime(2024, 1, 29), datetime(2024, 2, 27), datetime(2024, 12, 28)])
+def test_engine_matches_the_per_plant_loop(today):
+    configs = mixed_catalog()
+
+    engine = calculate_schedules(configs, today)
+    loop = [calculate_weekly_schedule(c, today) for c in configs]
+
+    # JSON comparison also catches int/float differences (0 vs 0.0) that == ignores
+    assert json.dumps(engine, ensure_ascii=False) == json.dumps(loop, ensure_ascii=False)
+
+
+def test_longer_horizons_repeat_the_weekly_pattern():
+    today = datetime(2024, 6, 3)
+    configs = mixed_catalog(50)
+
+    two_weeks = calculate_schedules(configs, today, horizon=14)
+    week = calculate_schedules(configs, today)
+
+    for long, short in zip(two_weeks, week):
+        for first, second in zip(long['schedule'][:7], long['schedule'][7:]):
+            assert {k: first[k] for k in ('rain_mm', 'etc_mm', 'needed_mm')} == \
+                   {k: second[k] for k in ('rain_mm', 'etc_mm', 'needed_mm')}
+        assert long['schedule'][:7] == short['schedule']
+
+
+def test_round1_matches_python_round_on_ties():
+    values = np.array([0.05, 0.15, 0.25, 0.35, 1.45, 2.675, 4.0 * 1.05, 2.5 * 1.15, 3.0 * 1.1])
+    assert round1(values).tolist() == [round(v, 1) for v in values.tolist()]
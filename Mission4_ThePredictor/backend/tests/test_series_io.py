@@ -0,0 +1,76 @@
+import json
+
+import numpy as np
+import pytest
+
+from series_io import iter_csv_chunks, iter_ndjson_chunks, read_series
+
+N = 103
+CHUNK = 10
+WINDOWS = [  # (start, length) around the CHUNK-sized chunk boundaries
+    (0, None), (0, 10), (0, 11), (9, 1), (9, 2), (10, 10), (10, None), (19, 12),
+    (25, 0), (99, 4), (95, 20), (102, None), (103, 5), (150, None),
+]
+
+
+@pytest.fixture(scope='module')
+def full():
+    return np.random.default_rng(0).uniform(0.0, 12.0, N)
+
+
+@pytest.fixture(scope='module')
+def files(full, tmp_path_factory):
+    root = tmp_path_factory.mktemp('series')
+    paths = {ext: str(root / f'series.{ext}') for ext in ('csv', 'ndjson', 'npy', 'npz', 'json')}
+    with open(paths['csv'], 'w', encoding='utf-8') as f:
+        f.write('et_mm\n')
+        f.writelines(f'{v!r}\n' if i % 7 else f'{v!r},ignored\n\n' for i, v in enumerate(full.tolist()))
+    with open(paths['ndjson'], 'w', encoding='utf-8') as f:
+        f.writelines(json.dumps(v if i % 2 else {'et': v}) + '\n' for i, v in enumerate(full.tolist()))
+    np.save(paths['npy'], full)
+    np.savez(paths['npz'], rain=full[::-1], et=full)
+    with open(paths['json'], 'w', encoding='utf-8') as f:
+        json.dump({'et': full.tolist()}, f)
+    paths['compressed.npz'] = str(root / 'compressed.npz')
+    np.savez_compressed(paths['compressed.npz'], et=full)
+    return paths
+
+
+def expected(full, start, length):
+    return full[start:None if length is None else start + length]
+
+
+@pytest.mark.parametrize('ext', ['csv', 'ndjson', 'npy', 'npz', 'compressed.npz', 'json'])
+@pytest.mark.parametrize('start, length', WINDOWS)
+def test_windowed_read_matches_the_whole_array(files, full, ext, start, length):
+    values = read_series(files[ext], key='et', start=start, length=length, chunk_size=CHUNK)
+
+    assert values.dtype == np.float64
+    np.testing.assert_array_equal(values, expected(full, start, length))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, CHUNK, N - 1, N, N + 1])
+def test_streaming_chunks_concatenate_to_the_whole_array(files, full, chunk_size):
+    for chunks in (iter_csv_chunks(files['csv'], chunk_size), iter_ndjson_chunks(files['ndjson'], chunk_size=chunk_size)):
+        chunks = list(chunks)
+        assert [len(c) for c in chunks[:-1]] == [chunk_size] * (len(chunks) - 1)
+        assert 0 < len(chunks[-1]) <= chunk_size
+        np.testing.assert_array_equal(np.concatenate(chunks), full)
+
+
+def test_streaming_read_stops_at_the_end_of_the_window(tmp_path, full):
+    path = str(tmp_path / 'truncated.csv')
+    with open(path, 'w', encoding='utf-8') as f:
+        f.writelines(f'{v!r}\n' for v in full[:30].tolist())
+        f.write('corrupt\n')  # In the fourth chunk: only read if the window reaches it
+
+    np.testing.assert_array_equal(read_series(path, start=5, length=25, chunk_size=CHUNK), full[5:30])
+    with pytest.raises(ValueError, match='line 31'):
+        read_series(path, start=25, length=6, chunk_size=CHUNK)
+
+
+def test_memory_mapped_window_is_a_view(files, full):
+    for ext in ('npy', 'npz'):
+        values = read_series(files[ext], key='et', start=CHUNK, length=CHUNK)
+        assert not values.flags.owndata  # A slice of the file mapping, not a copy
+        np.testing.assert_array_equal(values, full[CHUNK:2 * CHUNK])
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+import torch
+
+import training_checkpoint
+from mission_four import WateringEnv, train_dqn
+from series_io import ArrayForecast
+
+MAX_DAYS = 5
+EPISODES = 8
+
+
+def make_env():
+    rng = np.random.default_rng(0)
+    return WateringEnv(ArrayForecast(et=rng.uniform(2.0, 9.0, MAX_DAYS), rain=np.zeros(MAX_DAYS)),
+                       crop_need=5.0, max_days=MAX_DAYS)
+
+
+def train(checkpoint_dir, episodes, resume=False, seed=0, **kwargs):
+    policy, losses = train_dqn(make_env(), episodes=episodes, batch_size=8, seed=seed, use_tqdm=False,
+                               checkpoint_dir=str(checkpoint_dir), checkpoint_every=EPISODES // 2,
+                               resume=resume, **kwargs)
+    return policy, losses, training_checkpoint.load_state(training_checkpoint.latest_checkpoint(str(checkpoint_dir)))
+
+
+def assert_state_dicts_equal(a, b):
+    assert a.keys() == b.keys()
+    for key in a:
+        assert torch.equal(a[key], b[key]), key
+
+
+@pytest.mark.parametrize('options', [{}, {'num_envs': 3}, {'prioritized': True, 'fused_step': True}],
+                         ids=['single', 'vectorized', 'prioritized'])
+def test_resumed_run_matches_an_uninterrupted_run(tmp_path, options):
+    policy, losses, final = train(tmp_path / 'straight', EPISODES, **options)
+
+    _, _, middle = train(tmp_path / 'resumed', EPISODES // 2, **options)  # Stops at the mid-run checkpoint
+    assert 0 < middle['episode'] < final['episode']
+    # Another seed: only the RNG states restored from the checkpoint can make the runs agree
+    policy_r, losses_r, final_r = train(tmp_path / 'resumed', EPISODES, resume=True, seed=1, **options)
+
+    assert final_r['episode'] == final['episode']
+    assert losses_r == losses  # Every gradient step, bit for bit
+    assert_state_dicts_equal(policy_r.state_dict(), policy.state_dict())
+    assert_state_dicts_equal(final_r['target'], final['target'])
+    for group, group_r in zip(final['optimizer']['state'].values(), final_r['optimizer']['state'].values()):
+        assert_state_dicts_equal(group_r, group)
+    assert final_r['eps'] == final['eps'] and final_r['grad_steps'] == final['grad_steps']
+
+    rng, rng_r = final['rng'], final_r['rng']
+    assert rng_r['python'] == rng['python']
+    assert torch.equal(rng_r['numpy'][1], rng['numpy'][1]) and rng_r['numpy'][2:] == rng['numpy'][2:]
+    assert torch.equal(rng_r['torch'], rng['torch'])
+
+
+def test_resume_rejects_a_changed_configuration(tmp_path):
+    train(tmp_path, EPISODES // 2)
+    with pytest.raises(ValueError, match='lr=0.0003'):
+        train(tmp_path, EPISODES, resume=True, lr=1e-3)
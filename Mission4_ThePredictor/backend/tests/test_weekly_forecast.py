@@ -0,0 +1,105 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+from werkzeug.http import http_date
+
+import app as forecast_app
+from forecast_cache import ForecastCache
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock(datetime(2025, 3, 10, 8, 30, 15))
+
+
+@pytest.fixture
+def client(clock, monkeypatch):
+    cache = ForecastCache(forecast_app.build_weekly_forecasts,
+                          serialize=lambda data: forecast_app.app.json.response(data).get_data(), clock=clock)
+    monkeypatch.setattr(forecast_app, 'forecast_cache', cache)
+    return forecast_app.app.test_client()
+
+
+def get(client, **headers):
+    return client.get('/api/v1/weekly-forecast', headers=headers)
+
+
+def test_forecast_carries_validators(client, clock):
+    resp = get(client)
+
+    assert resp.status_code == 200
+    assert resp.headers['Cache-Control'] == 'no-cache'
+    assert resp.headers['ETag'].startswith('"') and resp.headers['ETag'].endswith('"')
+    assert resp.headers['Last-Modified'] == http_date(clock.now.timestamp() // 1)
+    assert resp.get_json() == json.loads(json.dumps(forecast_app.calculate_schedules(
+        forecast_app.INITIAL_PLANT_CONFIGS, clock.now)))
+
+
+def test_if_none_match_returns_304(client, clock):
+    etag = get(client).headers['ETag']
+    clock.now += timedelta(hours=3)  # Same day: same forecast
+
+    resp = get(client, **{'If-None-Match': etag})
+    assert resp.status_code == 304
+    assert resp.data == b''
+    assert resp.headers['ETag'] == etag
+
+    assert get(client, **{'If-None-Match': 'W/' + etag}).status_code == 304  # Weak comparison
+    assert get(client, **{'If-None-Match': '"something-else", ' + etag}).status_code == 304
+    assert get(client, **{'If-None-Match': '"something-else"'}).status_code == 200
+    assert forecast_app.forecast_cache.stats['builds'] == 1
+
+
+def test_if_modified_since_uses_last_modified(client, clock):
+    last_modified = get(client).headers['Last-Modified']
+    clock.now += timedelta(minutes=5)
+
+    assert get(client, **{'If-Modified-Since': last_modified}).status_code == 304
+    assert get(client, **{'If-Modified-Since': http_date(clock.now.timestamp())}).status_code == 304
+    earlier = http_date((clock.now - timedelta(days=1)).timestamp())
+    assert get(client, **{'If-Modified-Since': earlier}).status_code == 200
+
+
+def test_if_none_match_takes_precedence_over_if_modified_since(client, clock):
+    last_modified = get(client).headers['Last-Modified']
+
+    resp = get(client, **{'If-None-Match': '"stale"', 'If-Modified-Since': last_modified})
+    assert resp.status_code == 200
+
+
+def test_forecast_rolls_over_at_local_midnight(client, clock):
+    first = get(client)
+    clock.now = clock.now.replace(hour=23, minute=59, second=59)
+    assert get(client).headers['ETag'] == first.headers['ETag']
+
+    clock.now += timedelta(seconds=2)  # 00:00:01 the next day
+    resp = get(client, **{'If-None-Match': first.headers['ETag'],
+                          'If-Modified-Since': first.headers['Last-Modified']})
+
+    assert resp.status_code == 200
+    assert resp.headers['ETag'] != first.headers['ETag']
+    assert resp.headers['Last-Modified'] == http_date(clock.now.timestamp() // 1)
+    assert resp.get_json()[0]['schedule'][0]['date'] == first.get_json()[0]['schedule'][1]['date']  # Starts a day later
+    assert forecast_app.forecast_cache.stats == {'hits': 1, 'builds': 2}
+
+    assert get(client, **{'If-None-Match': resp.headers['ETag']}).status_code == 304
+
+
+def test_config_change_and_horizon_get_their_own_validators(client, monkeypatch):
+    week = get(client).headers['ETag']
+    assert client.get('/api/v1/weekly-forecast?days=14').headers['ETag'] != week
+
+    monkeypatch.setattr(forecast_app, 'INITIAL_PLANT_CONFIGS', forecast_app.INITIAL_PLANT_CONFIGS[:1])
+    monkeypatch.setattr(forecast_app, 'CONFIG_VERSION', forecast_app.CONFIG_VERSION + 1)
+    resp = get(client, **{'If-None-Match': week})
+    assert resp.status_code == 200
+    assert len(resp.get_json()) == 1
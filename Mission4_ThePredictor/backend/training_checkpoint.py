@@ -0,0 +1,137 @@
+"""
+Checkpoints of a train_dqn run, for resuming long trainings.
+
+A checkpoint is a directory <checkpoint_dir>/ckpt-<episodes>/ holding
+  - state.pt: policy and target networks, optimizer, epsilon, episode and
+    gradient-step counters, loss history, the Python / NumPy / torch RNG
+    states and, for vectorized runs, the BatchWateringEnv arrays,
+  - replay/: the replay memory, written with its own save().
+
+The file LATEST names the newest complete checkpoint. It is replaced
+atomically only once the checkpoint directory is fully written and synced, so
+a run killed while saving resumes from the previous checkpoint. Only the
+newest `keep` checkpoints are kept.
+"""
+
+import os
+import random
+import re
+import shutil
+
+import numpy as np
+import torch
+
+LATEST_FILE = 'LATEST'
+STATE_FILE = 'state.pt'
+REPLAY_DIR = 'replay'
+CHECKPOINT_NAME = re.compile(r'^ckpt-(\d+)$')
+
+
+def rng_state():
+    """Python, NumPy and torch RNG states, as types torch.load(weights_only=True) accepts."""
+    kind, key, pos, has_gauss, cached = np.random.get_state()
+    state = {
+        'python': random.getstate(),
+        'numpy': (kind, torch.from_numpy(key.astype(np.int64)), int(pos), int(has_gauss), float(cached)),
+        'torch': torch.get_rng_state(),
+    }
+    if torch.cuda.is_available():
+        state['cuda'] = torch.cuda.get_rng_state_all()
+    return state
+
+
+def set_rng_state(state):
+    random.setstate(state['python'])
+    kind, key, pos, has_gauss, cached = state['numpy']
+    np.random.set_state((kind, key.numpy().astype(np.uint32), pos, has_gauss, cached))
+    torch.set_rng_state(state['torch'])
+    if 'cuda' in state and torch.cuda.is_available():
+        torch.cuda.set_rng_state_all(state['cuda'])
+
+
+def _fsync_dir(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _checkpoints(directory):
+    """{episodes: path} of the checkpoint directories in `directory` (complete or not)."""
+    found = {}
+    for name in os.listdir(directory):
+        match = CHECKPOINT_NAME.match(name)
+        if match:
+            found[int(match.group(1))] = os.path.join(directory, name)
+    return found
+
+
+def save_checkpoint(directory, episode, state, memory, keep=2):
+    """
+    Writes `state` (a dict for torch.save) and `memory` as checkpoint `episode`,
+    then points LATEST at it and removes older (and stale, unfinished) ones.
+
+    Returns:
+    - The checkpoint directory.
+    """
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'ckpt-{episode:08d}')
+    if os.path.exists(path):  # Left over from a run killed while saving
+        shutil.rmtree(path)
+    os.makedirs(path)
+
+    with open(os.path.join(path, STATE_FILE), 'wb') as f:
+        torch.save(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    memory.save(os.path.join(path, REPLAY_DIR))
+    _fsync_dir(path)
+
+    tmp = os.path.join(directory, LATEST_FILE + '.tmp')
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(os.path.basename(path))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(directory, LATEST_FILE))
+    _fsync_dir(directory)
+
+    kept = sorted(e for e in _checkpoints(directory) if e <= episode)[-keep:]
+    for e, old in _checkpoints(directory).items():
+        if e not in kept:
+            shutil.rmtree(old, ignore_errors=True)
+    return path
+
+
+def latest_checkpoint(directory):
+    """Path of the newest complete checkpoint in `directory`, or None."""
+    try:
+        with open(os.path.join(directory, LATEST_FILE), encoding='utf-8') as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(directory, name)
+
+
+def load_state(path):
+    """The state dict saved in checkpoint directory `path`."""
+    return torch.load(os.path.join(path, STATE_FILE), map_location='cpu', weights_only=True)
+
+
+def load_memory(path, memory_cls):
+    """The replay memory saved in checkpoint directory `path` (copied into RAM)."""
+    return memory_cls.load(os.path.join(path, REPLAY_DIR))
+
+
+def load_policy_weights(path):
+    """
+    Policy network state_dict for warm-starting a new training.
+
+    Parameters:
+    - path: a checkpoint written by `mission_four.py --save-model` (.pt), or a
+      checkpoint directory (its latest checkpoint's policy is used).
+    """
+    if os.path.isdir(path):
+        latest = latest_checkpoint(path) or path  # The run's directory, or one ckpt-* inside it
+        return load_state(latest)['policy']
+    return torch.load(path, map_location='cpu', weights_only=True)['state_dict']
@@ -0,0 +1,208 @@
+"""
+Opt-in instrumentation for train_dqn.
+
+TrainingProfiler times named phases of the training loop (env.step, buffer
+push/sample, tensor conversion, forward, backward, optimizer, target update),
+counts environment and gradient steps, and every `log_every` episodes appends
+one JSON line with the per-phase breakdown and throughput since the previous
+line; close() appends a cumulative summary. Optionally the same phases are
+recorded as torch.profiler ranges and exported as traces.
+
+When profiling is off train_dqn uses NULL_PROFILER, whose phase() hands back
+one shared no-op context manager, so the loop pays a method call per phase
+and nothing else.
+"""
+
+import json
+import time
+from collections import defaultdict
+
+_clock = time.perf_counter
+
+
+class _NullPhase:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_PHASE = _NullPhase()
+
+
+class NullProfiler:
+    """Same surface as TrainingProfiler; does nothing."""
+
+    enabled = False
+
+    def phase(self, name):
+        return _NULL_PHASE
+
+    def count(self, env_steps=0, grad_steps=0):
+        pass
+
+    def end_episodes(self, n=1):
+        pass
+
+    def postfix(self):
+        return {}
+
+    def close(self):
+        return None
+
+
+NULL_PROFILER = NullProfiler()
+
+
+class _Phase:
+    __slots__ = ('profiler', 'name', 'start', 'range')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+        self.range = None
+
+    def __enter__(self):
+        if self.profiler._record_function is not None:
+            self.range = self.profiler._record_function(self.name)
+            self.range.__enter__()
+        self.start = _clock()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = _clock() - self.start
+        totals = self.profiler._interval[self.name]
+        totals[0] += elapsed
+        totals[1] += 1
+        if self.range is not None:
+            self.range.__exit__(*exc)
+            self.range = None
+        return False
+
+
+class TrainingProfiler:
+    """
+    Parameters:
+    - jsonl_path: file the JSON lines are appended to (None keeps them in `records` only).
+    - log_every: episodes between two interval records.
+    - torch_trace_dir: if set, also run torch.profiler over a few gradient steps
+      (wait/warmup/active schedule) and write TensorBoard traces there.
+    """
+
+    enabled = True
+
+    def __init__(self, jsonl_path=None, log_every=100, torch_trace_dir=None):
+        self.jsonl_path = jsonl_path
+        self.log_every = log_every
+        self.records = []
+        self._file = open(jsonl_path, 'a', encoding='utf-8') if jsonl_path else None
+
+        self._phases = {}
+        self._interval = defaultdict(lambda: [0.0, 0])  # name -> [seconds, calls] since last record
+        self._totals = defaultdict(lambda: [0.0, 0])
+        self.episodes = 0
+        self.env_steps = 0
+        self.grad_steps = 0
+        self._mark = (_clock(), 0, 0, 0)  # (time, episodes, env_steps, grad_steps) at the last record
+        self._start = self._mark[0]
+        self._last_rates = {}
+
+        self._torch_profiler = None
+        self._record_function = None
+        if torch_trace_dir:
+            import torch.profiler as tp
+            self._torch_profiler = tp.profile(
+                activities=[tp.ProfilerActivity.CPU],
+                schedule=tp.schedule(wait=5, warmup=5, active=20, repeat=1),
+                on_trace_ready=tp.tensorboard_trace_handler(torch_trace_dir),
+                record_shapes=True,
+            )
+            self._torch_profiler.start()
+            self._record_function = tp.record_function
+
+    def phase(self, name):
+        """Context manager timing one occurrence of phase `name`."""
+        phase = self._phases.get(name)
+        if phase is None:
+            phase = self._phases[name] = _Phase(self, name)
+        return phase
+
+    def count(self, env_steps=0, grad_steps=0):
+        self.env_steps += env_steps
+        if grad_steps:
+            self.grad_steps += grad_steps
+            if self._torch_profiler is not None:
+                self._torch_profiler.step()
+
+    def end_episodes(self, n=1):
+        before = self.episodes
+        self.episodes += n
+        if self.episodes // self.log_every != before // self.log_every:
+            self._emit('interval')
+
+    def postfix(self):
+        """Throughput of the last interval, for the tqdm postfix."""
+        if not self._last_rates:
+            return {}
+        return {'sps': f"{self._last_rates['env_steps_per_s']:.0f}",
+                'gps': f"{self._last_rates['grad_steps_per_s']:.0f}"}
+
+    def _emit(self, event):
+        now = _clock()
+        t0, ep0, env0, grad0 = self._mark
+        interval = self._interval
+        for name, (seconds, calls) in interval.items():
+            totals = self._totals[name]
+            totals[0] += seconds
+            totals[1] += calls
+
+        if event == 'summary':
+            t0, ep0, env0, grad0 = self._start, 0, 0, 0
+            interval = self._totals
+        elapsed = max(now - t0, 1e-9)
+        timed = sum(seconds for seconds, _ in interval.values())
+
+        record = {
+            'event': event,
+            'episode': self.episodes,
+            'episodes': self.episodes - ep0,
+            'env_steps': self.env_steps - env0,
+            'grad_steps': self.grad_steps - grad0,
+            'elapsed_s': round(elapsed, 6),
+            'env_steps_per_s': round((self.env_steps - env0) / elapsed, 2),
+            'grad_steps_per_s': round((self.grad_steps - grad0) / elapsed, 2),
+            'untimed_s': round(max(elapsed - timed, 0.0), 6),
+            'phases': {
+                name: {
+                    'total_s': round(seconds, 6),
+                    'calls': calls,
+                    'mean_us': round(seconds / calls * 1e6, 2) if calls else 0.0,
+                    'share': round(seconds / elapsed, 4),
+                }
+                for name, (seconds, calls) in sorted(interval.items(), key=lambda kv: -kv[1][0])
+            },
+        }
+        self.records.append(record)
+        if self._file:
+            self._file.write(json.dumps(record) + '\n')
+            self._file.flush()
+
+        self._last_rates = record
+        self._interval = defaultdict(lambda: [0.0, 0])
+        self._mark = (now, self.episodes, self.env_steps, self.grad_steps)
+        return record
+
+    def close(self):
+        """Writes the cumulative summary record, stops torch.profiler and returns the summary."""
+        summary = self._emit('summary')
+        if self._torch_profiler is not None:
+            self._torch_profiler.stop()
+            self._torch_profiler = None
+            self._record_function = None
+        if self._file:
+            self._file.close()
+            self._file = None
+        return summary